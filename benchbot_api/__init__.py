@@ -1,9 +1,51 @@
-from . import agent
-from . import api_callbacks
-from . import benchbot
-from . import tools
+import importlib
 
-from .agent import Agent
-from .benchbot import ActionResult, BenchBot, RESULT_LOCATION
+# Submodules & exported names are loaded lazily on first access (PEP 562), so
+# importing BenchBot doesn't pay for Matplotlib, SciPy, or OpenCV unless they
+# are used
 
-__all__ = ['agent', 'api_callbacks', 'benchbot', 'tools']
+# Names exported from the package, & the submodule each is loaded from
+_EXPORTS = {
+    'Agent': 'agent',
+    'AsyncBenchBot': 'async_benchbot',
+    'ActionResult': 'benchbot',
+    'BenchBot': 'benchbot',
+    'RESULT_LOCATION': 'benchbot',
+    'ObjectMap': 'mapping',
+    'VoxelMap': 'mapping',
+    'LaserScan': 'observations',
+    'LazyObservations': 'observations',
+    'Pose': 'observations',
+    'PoseSet': 'observations',
+    'StepPipeline': 'pipeline',
+    'Recorder': 'replay',
+    'ReplayBenchBot': 'replay',
+    'ResultsBatch': 'results',
+    'ResultsWriter': 'results',
+    'run_parallel': 'runner',
+    'ObservationFrame': 'subscription',
+    'Subscription': 'subscription',
+    'FrameTree': 'transforms'
+}
+
+__all__ = [
+    'agent', 'api_callbacks', 'async_benchbot', 'benchbot', 'geometry',
+    'instrumentation', 'mapping', 'observations', 'pipeline', 'replay',
+    'results', 'runner', 'subscription', 'tools', 'transforms', 'wire'
+]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_EXPORTS))
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module('.' + name, __name__)
+    elif name in _EXPORTS:
+        module = importlib.import_module('.' + _EXPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module '%s' has no attribute '%s'" %
+                         (__name__, name))
@@ -58,3 +58,23 @@ class Agent(ABCMeta('ABC', (object, ), {})):
         in scene understanding object maps).
         """
         return
+
+    def save_result_chunk(self, results_writer, scene, results_format_fns):
+        """
+        Optional method for writing results incrementally, called by
+        'BenchBot.run()' at the end of every scene when it is streaming
+        results ('stream_results=True'). In that case 'save_result' is not
+        called; the results are finalised from the written chunks instead.
+
+        Results for the scene should be written with
+        'results_writer.write_chunk(scene, ...)', e.g. appending the scene's
+        objects:
+            results_writer.write_chunk(scene, append={'objects': objects})
+
+        The 'results_writer' is a 'benchbot_api.results.ResultsWriter',
+        already holding the empty results (see 'save_result'). When a run
+        resumes, scenes already written are skipped entirely.
+
+        The 'results_format_fns' are as described for 'save_result'.
+        """
+        return
@@ -1,29 +1,42 @@
 import base64
 import cv2
+import jsonpickle
 import numpy as np
 
 ENCODING_TO_CONVERSION = {'bgr8': cv2.COLOR_BGR2RGB}
 
 
-def convert_to_rgb(data):
+def _convert_color(img, cvt, out=None):
+    # Converts into 'out' if provided, otherwise in place where the data
+    # allows it (the received arrays are fresh, so nothing else holds them)
+    if out is None and img.flags.writeable:
+        out = img
+    return cv2.cvtColor(img, cvt, dst=out)
+
+
+def convert_to_rgb(data, out=None):
     cvt = ENCODING_TO_CONVERSION.get(data['encoding'], None)
-    return data['data'] if cvt is None else cv2.cvtColor(data['data'], cvt)
-
-
-def decode_color_image(data):
-    if data['encoding'] == 'bgr8':
-        return cv2.cvtColor(
-            cv2.imdecode(
-                np.fromstring(base64.b64decode(data['data']), np.uint8),
-                cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
-    elif data['encoding'] == 'rgb8':
-        return cv2.imdecode(
-            np.fromstring(base64.b64decode(data['data']), np.uint8),
-            cv2.IMREAD_COLOR)
-    else:
+    if cvt is None:
+        if out is None:
+            return data['data']
+        np.copyto(out, data['data'])
+        return out
+    return _convert_color(data['data'], cvt, out)
+
+
+def decode_color_image(data, out=None):
+    if data['encoding'] not in ('bgr8', 'rgb8'):
         raise ValueError(
             "decode_ros_image: received image data with unsupported encoding: %s"
             % data['encoding'])
+    return convert_to_rgb(
+        {
+            'encoding':
+            data['encoding'],
+            'data':
+            cv2.imdecode(np.frombuffer(base64.b64decode(data['data']),
+                                       np.uint8), cv2.IMREAD_COLOR)
+        }, out)
 
 
 def decode_jsonpickle(data):
@@ -0,0 +1,171 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+from .benchbot import BenchBot, DEFAULT_ADDRESS, DEFAULT_PORT, DEFAULT_POOL_SIZE
+
+
+class AsyncBenchBot(object):
+    """Asyncio version of BenchBot, where communication with a BenchBot
+    Supervisor never blocks the event loop. Blocking queries run on a worker
+    executor, and all observation channels are fetched concurrently.
+
+    The coroutines 'start()', 'step()', 'reset()', 'next_scene()', 'run()',
+    and 'results_functions()' mirror their BenchBot equivalents. Anything
+    else is available synchronously through the wrapped 'benchbot' instance.
+    Note that the connection is not started on construction; 'await
+    AsyncBenchBot.start()' before use.
+
+    Parameters
+    ----------
+    agent :
+        An instance of an 'Agent' to be used by 'AsyncBenchBot.run()'
+
+    supervisor_address :
+        Address of the running BenchBot Supervisor
+
+    executor :
+        The executor used to run blocking queries (a thread pool the size of
+        the connection pool is created if none is provided)
+
+    **benchbot_kwargs
+        Any other arguments supported by BenchBot (e.g. 'pool_size')
+    """
+    def __init__(self,
+                 agent=None,
+                 supervisor_address='http://' + DEFAULT_ADDRESS + ':' +
+                 str(DEFAULT_PORT) + '/',
+                 executor=None,
+                 **benchbot_kwargs):
+        self.benchbot = BenchBot(agent=agent,
+                                 supervisor_address=supervisor_address,
+                                 auto_start=False,
+                                 **benchbot_kwargs)
+        self._own_executor = executor is None
+        self._executor = (ThreadPoolExecutor(max_workers=benchbot_kwargs.get(
+            'pool_size', DEFAULT_POOL_SIZE)) if executor is None else executor)
+
+    def _run_blocking(self, fn, *args, **kwargs):
+        """Runs a blocking function on the worker executor, returning an
+        awaitable for its result
+        """
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def _fetch_observation(self, name):
+        # Fetching & decoding both happen in the worker, so decoding a heavy
+        # channel doesn't stall the event loop either
+        return await self._run_blocking(
+            lambda: self.benchbot._decode_observation(
+                name,
+                self.benchbot._query(name, BenchBot.RouteType.CONNECTION)))
+
+    @property
+    def agent(self):
+        return self.benchbot.agent
+
+    def close(self):
+        """Closes all connections to the Supervisor, & the worker executor if
+        it was created by this instance
+        """
+        self.benchbot.close()
+        if self._own_executor:
+            self._executor.shutdown()
+
+    async def empty_results(self):
+        """Coroutine version of 'BenchBot.empty_results()'"""
+        return await self._run_blocking(self.benchbot.empty_results)
+
+    async def next_scene(self):
+        """Coroutine version of 'BenchBot.next_scene()'"""
+        return await self._run_blocking(self.benchbot.next_scene)
+
+    async def reset(self):
+        """Coroutine version of 'BenchBot.reset()'"""
+        await self._run_blocking(self.benchbot._reset_if_dirty)
+        return await self.step(None)
+
+    async def results_functions(self):
+        """Coroutine version of 'BenchBot.results_functions()'. Each of the
+        returned functions is also a coroutine.
+        """
+        fns = await self._run_blocking(self.benchbot.results_functions)
+        return {
+            k: (lambda *args, _fn=v, **kwargs: self._run_blocking(
+                _fn, *args, **kwargs))
+            for k, v in fns.items()
+        }
+
+    async def run(self, agent=None):
+        """Coroutine version of 'BenchBot.run()'. The agent's 'pick_action()'
+        & 'save_result()' methods are run on the worker executor, so they may
+        block without stalling other tasks on the event loop.
+        """
+        if agent is not None:
+            self.benchbot.set_agent(agent)
+        if self.agent is None:
+            raise RuntimeError(
+                "Can't call AsyncBenchBot.run() without an agent attached. "
+                "Either create your AsyncBenchBot instance with an agent "
+                "argument, or create your own run logic instead of using "
+                "AsyncBenchBot.run()")
+
+        async def scene_fn():
+            observations, action_result = await self.reset()
+            while not self.agent.is_done(action_result):
+                action, action_args = await self._run_blocking(
+                    self.agent.pick_action, observations,
+                    self.benchbot._step_actions)
+                observations, action_result = await self.step(
+                    action, **action_args)
+
+        # Run through the scenes until done
+        await scene_fn()
+        while await self.next_scene():
+            await scene_fn()
+
+        # We've made it to the end, we should save our results! (the agent
+        # gets the synchronous results functions, as it is run in a worker)
+        empty_results, results_fns = await asyncio.gather(
+            self.empty_results(),
+            self._run_blocking(self.benchbot.results_functions))
+        await self._run_blocking(self.agent.save_result,
+                                 self.benchbot.result_filename, empty_results,
+                                 results_fns)
+
+    async def start(self):
+        """Coroutine version of 'BenchBot.start()'"""
+        await self._run_blocking(self.benchbot.start)
+
+    async def step(self, action, **action_kwargs):
+        """Coroutine version of 'BenchBot.step()', where all observation
+        channels are fetched & decoded concurrently
+        """
+        # Perform the requested action if possible
+        if action is not None:
+            await self._run_blocking(self.benchbot._perform_action, action,
+                                     action_kwargs)
+
+        # Retrieve the updated robot state alongside all observations
+        observations = await self._run_blocking(
+            lambda: self.benchbot.observations)
+        resps = await asyncio.gather(
+            self._run_blocking(self.benchbot._query_batch,
+                               BenchBot._STATE_QUERIES),
+            *[self._fetch_observation(o) for o in observations])
+        action_result, scene_number = self.benchbot._process_state(resps[0])
+
+        observations = dict(zip(observations, resps[1:]))
+        observations.update({'scene_number': scene_number})
+        if self.benchbot.recorder is None:
+            return observations, action_result
+        return await self._run_blocking(self.benchbot._record_step, action,
+                                        action_kwargs, observations,
+                                        action_result)
+
+    async def subscribe(self, channels, **subscribe_kwargs):
+        """Coroutine version of 'BenchBot.subscribe()'. The returned
+        subscription is consumed with 'async for'.
+        """
+        return await self._run_blocking(self.benchbot.subscribe, channels,
+                                        **subscribe_kwargs)
@@ -1,15 +1,27 @@
 from __future__ import print_function
 
 from enum import Enum, unique
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import functools
 import importlib
+import json
 import jsonpickle
 import jsonpickle.ext.numpy as jet
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import sys
 import time
+import warnings
 
+from . import wire
 from .agent import Agent
+from .instrumentation import Instrumentation
+from .observations import LazyObservations, compact_observation
+from .pipeline import StepPipeline
+from .results import ResultsBatch, ResultsWriter
+from .subscription import DEFAULT_MAX_QUEUE, Subscription
 
 jet.register_handlers()
 
@@ -20,6 +32,18 @@ RESULT_LOCATION = '/tmp/benchbot_result'
 
 TIMEOUT_SUPERVISOR = 60
 
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 0
+
+BATCH_ROUTE = 'batch'
+BATCH_UNSUPPORTED_STATUS_CODES = (404, 405, 501)
+
+STREAM_ROUTE = 'stream'
+
+CACHED_CONFIG_ROUTES = [
+    '', 'environments', 'robot', 'task', 'task/actions', 'task/observations'
+]
+
 
 class _UnexpectedResponseError(requests.RequestException):
     """Consistent error messaging for when the Supervisor rejects a query"""
@@ -27,6 +51,7 @@ class _UnexpectedResponseError(requests.RequestException):
         super(_UnexpectedResponseError, self).__init__(
             "Received an unexpected response from BenchBot supervisor "
             "(HTTP status code: %d)" % http_status_code, *args, **kwargs)
+        self.http_status_code = http_status_code
 
 
 @unique
@@ -51,6 +76,89 @@ class BenchBot(object):
     """BenchBot handles communication between the client and server systems,
     and abstracts away hardware and simulation, such that code written to be
     run by BenchBot will run with either a real or simulated robot
+
+    Parameters
+    ----------
+    agent :
+        An instance of an 'Agent' to be used by 'BenchBot.run()'
+
+    supervisor_address :
+        Address of the running BenchBot Supervisor
+
+    auto_start :
+        Whether to call 'BenchBot.start()' on construction
+
+    pool_size :
+        Maximum number of keep-alive connections kept open to the Supervisor
+
+    retries :
+        Number of times a failed connection to the Supervisor is retried
+        before a query fails
+
+    timeout :
+        Default timeout in seconds for a query (None waits forever)
+
+    route_timeouts :
+        A dict of timeouts overriding 'timeout' for specific routes, keyed
+        by route relative to the Supervisor address (e.g. {'robot/reset':
+        120})
+
+    batch_queries :
+        Whether state & observation queries should be sent to the
+        Supervisor's batch route in a single request (queries are sent
+        concurrently instead if the Supervisor has no batch route)
+
+    cache_config :
+        Whether static configuration (e.g. the 'config', 'observations' &
+        'actions' lists) should be cached client-side. The cache is filled
+        by 'start()', and invalidated whenever the robot is reset, restarted,
+        or moved to the next scene
+
+    binary_transport :
+        Whether to request observations in the binary wire format (see
+        'benchbot_api.wire'), where arrays are decoded as views of the
+        received data rather than through jsonpickle. Supervisors without
+        support for the format fall back to jsonpickle
+
+    lazy_observations :
+        Whether 'step()' should return a 'LazyObservations' dict, where each
+        observation channel is only fetched & decoded when it is first
+        accessed (see 'step()')
+
+    compact_observations :
+        Whether observations with a compact type (e.g. 'poses' as a
+        'PoseSet', see 'benchbot_api.observations.COMPACT_TYPES') should be
+        returned in that form, which costs far less memory for agents keeping
+        long histories of observations
+
+    result_location :
+        The file 'BenchBot.run()' tells the agent to write results to
+        (defaults to 'RESULT_LOCATION')
+
+    local_results_functions :
+        List of modules (or packages) results format functions may be
+        imported from to run in-process (see 'results_functions()'), rather
+        than each call being a round trip to the Supervisor. Functions named
+        anywhere else are always called remotely.
+
+    stream_results :
+        Whether 'BenchBot.run()' should have the agent write results a scene
+        at a time (see 'Agent.save_result_chunk()') to a
+        'benchbot_api.results.ResultsWriter', resuming from any partial
+        results left at 'result_location' by an interrupted run
+
+    recorder :
+        A 'benchbot_api.replay.Recorder' which every step is recorded with
+        (see 'benchbot_api.replay.ReplayBenchBot' for replaying recordings)
+
+    instrument :
+        Whether to collect statistics about queries & connection callbacks
+        in 'BenchBot.stats' (see 'benchbot_api.instrumentation')
+
+    stats_location :
+        File the statistics are written to at the end of 'BenchBot.run()'
+        when instrumentation is enabled (CSV for a '.csv' filename, JSON
+        otherwise)
     """
     @unique
     class RouteType(Enum):
@@ -71,19 +179,112 @@ class BenchBot(object):
         RouteType.EXPLICIT: ''
     }
 
+    # Queries describing the robot state after a step (see '_process_state()')
+    _STATE_QUERIES = [('is_collided', RouteType.ROBOT),
+                      ('is_finished', RouteType.ROBOT),
+                      ('task/actions', RouteType.CONFIG),
+                      ('selected_environment', RouteType.ROBOT)]
+
     def __init__(self,
                  agent=None,
                  supervisor_address='http://' + DEFAULT_ADDRESS + ':' +
                  str(DEFAULT_PORT) + '/',
-                 auto_start=True):
+                 auto_start=True,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 retries=DEFAULT_RETRIES,
+                 timeout=None,
+                 route_timeouts=None,
+                 batch_queries=True,
+                 cache_config=True,
+                 binary_transport=True,
+                 lazy_observations=False,
+                 compact_observations=False,
+                 result_location=RESULT_LOCATION,
+                 local_results_functions=None,
+                 stream_results=False,
+                 recorder=None,
+                 instrument=False,
+                 stats_location=None):
         self.agent = None
         self.supervisor_address = supervisor_address
+        self.result_location = result_location
+        self.stream_results = stream_results
+        self.recorder = recorder
+        self.stats = Instrumentation() if instrument else None
+        self.stats_location = stats_location
+        self.compact_observations = compact_observations
         self._connection_callbacks = {}
 
+        # All queries go through a single pooled keep-alive session, rather
+        # than opening a new connection to the supervisor for every route
+        self.timeout = timeout
+        self.route_timeouts = ({} if route_timeouts is None else
+                               dict(route_timeouts))
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=pool_size,
+                              max_retries=retries)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self.binary_transport = binary_transport
+        if binary_transport:
+            self._session.headers['Accept'] = (
+                '%s, application/json;q=0.9' % wire.CONTENT_TYPE)
+        self._pool_size = pool_size
+        self._executor = None
+
+        # Support for batched queries is detected on first use
+        self.batch_queries = batch_queries
+        self._batch_supported = None
+        self._step_actions = None
+
+        # Lazy observations are only valid until the robot state next changes
+        self.lazy_observations = lazy_observations
+        self._state_version = 0
+
+        # Static configuration is cached client-side between resets
+        self.cache_config = cache_config
+        self._config_cache = {}
+
+        # Results format functions are listed once per start(), & optionally
+        # imported to run locally
+        self.local_results_functions = ([] if local_results_functions is None
+                                        else list(local_results_functions))
+        self._local_results_functions = None
+        self._results_functions = None
+        self._config_cache_hits = 0
+        self._config_cache_misses = 0
+
         if auto_start:
             self.start()
         self.set_agent(agent)
 
+    @staticmethod
+    def _build_route(route_name, route_type=RouteType.CONNECTION):
+        """Builds the route of a query, relative to the address of the
+        BenchBot Supervisor
+
+        Parameters
+        ----------
+        route_name :
+            The name of the route within the subdirectory (e.g. 'is_finished')
+
+        route_type :
+            The type of route which maps to the URL's subdirectory (e.g.
+            RouteType.ROBOT = 'robot')
+
+        Returns
+        -------
+        string
+            The route string (e.g. 'robot/is_finished')
+        """
+        if route_type not in BenchBot.ROUTE_MAP:
+            raise ValueError(
+                "Cannot build address from invalid route type: %s" %
+                route_type)
+        return (BenchBot.ROUTE_MAP[route_type] +
+                ('/' if BenchBot.ROUTE_MAP[route_type] else '') + route_name)
+
     def _build_address(self, route_name, route_type=RouteType.CONNECTION):
         """Builds an address for communication with a running instance of 
         BenchBot Supervisor
@@ -105,18 +306,122 @@ class BenchBot(object):
         """
         base = self.supervisor_address + (
             '' if self.supervisor_address.endswith('/') else '/')
-        if route_type not in BenchBot.ROUTE_MAP:
-            raise ValueError(
-                "Cannot build address from invalid route type: %s" %
-                route_type)
-        return (base + BenchBot.ROUTE_MAP[route_type] +
-                ('/' if BenchBot.ROUTE_MAP[route_type] else '') + route_name)
+        return base + BenchBot._build_route(route_name, route_type)
+
+    def _request(self, route_name, route_type, data, method):
+        """Sends a request to a running BenchBot Supervisor through the pooled
+        session, and returns the raw response (this method should never need
+        to be called manually; see '_query()')
+
+        Raises
+        ------
+        _UnexpectedResponseError
+            If the Supervisor responded with an unexpected HTTP status code
+        """
+        resp = self._session.request(
+            method if isinstance(method, str) else method.__name__,
+            self._build_address(route_name, route_type),
+            json=data,
+            timeout=self.route_timeouts.get(
+                BenchBot._build_route(route_name, route_type), self.timeout),
+            stream=self.binary_transport)
+        if resp.status_code >= 300:
+            resp.close()
+            raise _UnexpectedResponseError(resp.status_code)
+        return resp
+
+    def _fetch(self, route_name, route_type, data, method):
+        """Sends a request to a running BenchBot Supervisor, & returns the
+        decoded data from the response (recording statistics if
+        instrumentation is enabled). Errors are raised as is; see '_query()'
+        for consistent error handling.
+        """
+        if self.stats is None:
+            return BenchBot._decode_content(*BenchBot._read_response(
+                self._request(route_name, route_type, data, method)))
+        t = time.perf_counter()
+        content, binary = BenchBot._read_response(
+            self._request(route_name, route_type, data, method))
+        t_received = time.perf_counter()
+        result = BenchBot._decode_content(content, binary)
+        self.stats.record_query(BenchBot._build_route(route_name, route_type),
+                                t_received - t, len(content),
+                                time.perf_counter() - t_received)
+        return result
+
+    def _fetch_batch(self, queries):
+        """Sends a list of (route_name, route_type, data) queries through the
+        Supervisor's batch route, & returns the decoded data for each (this
+        method should never need to be called manually; see
+        '_send_batch()').
+
+        If instrumentation is enabled, each query is decoded separately so
+        it can be recorded under its own route (with the latency of the
+        whole batch, & its own bytes & decode time), as well as the batch
+        as a whole being recorded under the batch route.
+        """
+        data = {
+            'queries': [{
+                'route': BenchBot._build_route(n, t),
+                'data': {} if d is None else d
+            } for n, t, d in queries]
+        }
+        if self.stats is None:
+            return self._fetch(BATCH_ROUTE, BenchBot.RouteType.EXPLICIT, data,
+                               'POST')
+        t = time.perf_counter()
+        content, binary = BenchBot._read_response(
+            self._request(BATCH_ROUTE, BenchBot.RouteType.EXPLICIT, data,
+                          'POST'))
+        t_received = time.perf_counter()
+        latency = t_received - t
+        items, buffers = (wire.split(content) if binary else
+                          (json.loads(content), None))
+        self.stats.record_query(
+            BenchBot._build_route(BATCH_ROUTE, BenchBot.RouteType.EXPLICIT),
+            latency, len(content),
+            time.perf_counter() - t_received)
+
+        # Items share a single unpickler, so references between them still
+        # resolve (the list holding them is the first object referenced)
+        unpickler = jsonpickle.Unpickler()
+        unpickler.restore([])
+        results = []
+        for (n, rt, _), item in zip(queries, items):
+            nbytes = len(json.dumps(item)) + (wire.buffer_size(item)
+                                              if binary else 0)
+            t = time.perf_counter()
+            r = unpickler.restore(item, reset=False)
+            results.append(wire.restore_arrays(r, buffers) if binary else r)
+            self.stats.record_query(BenchBot._build_route(n, rt), latency,
+                                    nbytes,
+                                    time.perf_counter() - t)
+        return results
+
+    @staticmethod
+    def _read_response(resp):
+        """Reads the entire content of a response from the Supervisor
+
+        Returns
+        -------
+        tuple
+            The content, & whether the Supervisor chose to respond in the
+            binary wire format
+        """
+        if (resp.headers.get('Content-Type', '').split(';')[0].strip() ==
+                wire.CONTENT_TYPE):
+            return wire.read_response(resp), True
+        return resp.content, False
+
+    @staticmethod
+    def _decode_content(content, binary):
+        return wire.decode(content) if binary else jsonpickle.decode(content)
 
     def _query(self,
                route_name=None,
                route_type=RouteType.CONNECTION,
                data=None,
-               method=requests.get):
+               method='GET'):
         """Sends a request to a running BenchBot Supervisor, and returns the
         response
 
@@ -133,7 +438,10 @@ class BenchBot(object):
             A dict of data to attach to the request
 
         method :
-            HTTP method to use for the request (should generally always be GET)
+            HTTP method to use for the request (should generally always be
+            GET). Either a method name (e.g. 'POST'), or one of the
+            equivalent functions from the requests module (e.g.
+            requests.post)
 
         Returns
         -------
@@ -141,16 +449,181 @@ class BenchBot(object):
             The JSON data returned by the request's response
         """
         data = {} if data is None else data
-        addr = self._build_address(route_name, route_type)
         try:
-            resp = requests.get(addr, json=data)
-            if resp.status_code >= 300:
-                raise _UnexpectedResponseError(resp.status_code)
-            return jsonpickle.decode(resp.content)
+            return self._fetch(route_name, route_type, data, method)
         except:
             raise requests.ConnectionError(
                 "Communication to BenchBot supervisor "
-                "failed using the route:\n\t%s" % addr)
+                "failed using the route:\n\t%s" %
+                self._build_address(route_name, route_type))
+
+    def _query_batch(self, queries):
+        """Sends a list of queries to a running BenchBot Supervisor in a single
+        request, and returns the list of responses in the same order. If the
+        Supervisor has no batch route, the queries are instead sent
+        concurrently through the connection pool. Queries for static
+        configuration are answered from the config cache where possible.
+
+        Parameters
+        ----------
+        queries :
+            A list of (route_name, route_type) or (route_name, route_type,
+            data) tuples, with the same meaning as in '_query()'
+
+        Returns
+        -------
+        list
+            The JSON data returned for each query
+        """
+        queries = [q if len(q) == 3 else (q[0], q[1], None) for q in queries]
+
+        # Answer what we can from the config cache, & only send the rest
+        results = [None] * len(queries)
+        remote = []
+        for i, (n, t, d) in enumerate(queries):
+            if not self.cache_config or t != BenchBot.RouteType.CONFIG:
+                remote.append(i)
+            elif n in self._config_cache:
+                self._config_cache_hits += 1
+                results[i] = copy.deepcopy(self._config_cache[n])
+            else:
+                self._config_cache_misses += 1
+                remote.append(i)
+        for i, r in zip(remote, self._send_batch([queries[i]
+                                                  for i in remote])):
+            n, t, _ = queries[i]
+            if self.cache_config and t == BenchBot.RouteType.CONFIG:
+                self._config_cache[n] = r
+                r = copy.deepcopy(r)
+            results[i] = r
+        return results
+
+    def _send_batch(self, queries):
+        """Sends a list of (route_name, route_type, data) queries to the
+        Supervisor, using the batch route if it is available (this method
+        should never need to be called manually; see '_query_batch()')
+        """
+        if len(queries) < 2:
+            return [self._query(*q) for q in queries]
+        if self.batch_queries and self._batch_supported is not False:
+            try:
+                resps = self._fetch_batch(queries)
+                self._batch_supported = True
+                return resps
+            except _UnexpectedResponseError as e:
+                if (self._batch_supported or e.http_status_code
+                        not in BATCH_UNSUPPORTED_STATUS_CODES):
+                    raise self._batch_error()
+                self._batch_supported = False
+            except (requests.RequestException, IOError, ValueError):
+                # Failed connections, truncated responses, & responses that
+                # can't be decoded are reported the same way as in '_query()'
+                raise self._batch_error()
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._pool_size)
+        return list(self._executor.map(lambda q: self._query(*q), queries))
+
+    def _batch_error(self):
+        return requests.ConnectionError(
+            "Communication to BenchBot supervisor failed using the route:"
+            "\n\t%s" %
+            self._build_address(BATCH_ROUTE, BenchBot.RouteType.EXPLICIT))
+
+    def _open_stream(self, channels):
+        """Opens a long-lived Server-Sent Events stream of observations for
+        'channels' from the Supervisor's stream route, returning the streaming
+        response (see 'subscribe()')
+        """
+        try:
+            resp = self._session.get(
+                self._build_address(STREAM_ROUTE, BenchBot.RouteType.EXPLICIT),
+                json={'channels': channels},
+                headers={'Accept': 'text/event-stream'},
+                timeout=(self.timeout, None),
+                stream=True)
+        except requests.RequestException:
+            resp = None
+        if resp is None or resp.status_code >= 300:
+            if resp is not None:
+                resp.close()
+            raise requests.ConnectionError(
+                "Communication to BenchBot supervisor failed using the "
+                "route:\n\t%s" %
+                self._build_address(STREAM_ROUTE, BenchBot.RouteType.EXPLICIT))
+        return resp
+
+    def _fetch_observation(self, name, state_version):
+        """Fetches & decodes a single observation channel on behalf of a
+        lazy observations dict, provided the robot state has not changed
+        since 'state_version'
+        """
+        if state_version != self._state_version:
+            raise RuntimeError(
+                "Observation '%s' was not accessed before the robot state "
+                "changed, so is no longer available. Access (or 'prefetch()') "
+                "lazy observations before taking the next step." % name)
+        return self._decode_observation(
+            name, self._query(name, BenchBot.RouteType.CONNECTION))
+
+    def _decode_observation(self, name, data):
+        """Decodes the raw data received from an observation channel, using
+        the channel's API-side callback if it has one
+        """
+        cb = self._connection_callbacks.get(name, None)
+        if cb is not None:
+            if self.stats is None:
+                data = cb(data)
+            else:
+                t = time.perf_counter()
+                data = cb(data)
+                self.stats.record_callback(name, time.perf_counter() - t)
+        return (compact_observation(name, data)
+                if self.compact_observations else data)
+
+    def _perform_action(self, action, action_kwargs):
+        """Sends 'action' to the robot if it is currently available, raising a
+        ValueError otherwise (see 'step()')
+        """
+        # Detect actions unavailable due to robot state (reusing the actions
+        # queried with the state at the end of the last step, if there was
+        # one since the state last changed)
+        if action not in (self.actions if self._step_actions is None else
+                          self._step_actions):
+            raise ValueError(
+                "Action '%s' is unavailable due to: %s" %
+                (action, ('COLLISION' if self._query(
+                    'is_collided', BenchBot.RouteType.ROBOT)['is_collided']
+                          else 'FINISHED' if self._query(
+                              'is_finished', BenchBot.RouteType.ROBOT)
+                          ['is_finished'] else 'WRONG_ACTUATION_MODE?')))
+
+        # Made it through checks, actually perform the action (the available
+        # actions are unknown until the resulting state is queried)
+        print("Sending action '%s' with args: %s" % (action, action_kwargs))
+        self._step_actions = None
+        self._query(action, BenchBot.RouteType.CONNECTION, action_kwargs)
+
+    def _process_state(self, state):
+        """Derives the action result & scene number from the responses to the
+        '_STATE_QUERIES', & records the actions available after a step
+
+        Returns
+        -------
+        tuple
+            The action result & the selected scene number
+        """
+        is_collided, is_finished, actions, scene = state
+        self._step_actions = BenchBot._available_actions(
+            is_collided, is_finished, actions)
+
+        # Derive action_result (TODO should probably not be this flimsy...)
+        action_result = ActionResult.SUCCESS
+        if is_collided['is_collided']:
+            action_result = ActionResult.COLLISION
+        elif is_finished['is_finished']:
+            action_result = ActionResult.FINISHED
+        return action_result, scene['number']
 
     @staticmethod
     def _attempt_connection_imports(connection_data):
@@ -173,6 +646,41 @@ class BenchBot(object):
                            x[1])
         return None
 
+    @staticmethod
+    def _attempt_results_imports(results_data, modules):
+        """Attempts to dynamically import the functions of a results format,
+        as named in its definition, so they can run locally (this method
+        should never need to be called manually)
+
+        Parameters
+        ----------
+        results_data :
+            A dict containing the data defining the results format
+
+        modules :
+            List of the modules (or packages) functions may be imported from
+
+        Returns
+        -------
+        dict
+            The functions that could be imported, by name
+        """
+        fns = {}
+        for name, fn in (results_data or {}).get('functions', {}).items():
+            x = fn.rsplit('.', 1)
+            if len(x) < 2 or not any(
+                    x[0] == m or x[0].startswith(m + '.') for m in modules):
+                reason = "it is not in an allowed module"
+            else:
+                try:
+                    fns[name] = getattr(importlib.import_module(x[0]), x[1])
+                    continue
+                except (ImportError, AttributeError) as e:
+                    reason = "it failed to import (%s)" % e
+            warnings.warn("Results function '%s' ('%s') will be called "
+                          "remotely, as %s" % (name, fn, reason))
+        return fns
+
     @property
     def actions(self):
         """The list of actions the robot is able to take.
@@ -183,11 +691,16 @@ class BenchBot(object):
             A list of actions the robot can take. If the robot has collided
             with an obstacle or finished its task, this list will be empty.
         """
-        return ([] if self._query('is_collided',
-                                  BenchBot.RouteType.ROBOT)['is_collided']
-                or self._query('is_finished',
-                               BenchBot.RouteType.ROBOT)['is_finished'] else
-                self._query('task/actions', BenchBot.RouteType.CONFIG))
+        return BenchBot._available_actions(*self._query_batch([
+            ('is_collided', BenchBot.RouteType.ROBOT),
+            ('is_finished', BenchBot.RouteType.ROBOT),
+            ('task/actions', BenchBot.RouteType.CONFIG)
+        ]))
+
+    @staticmethod
+    def _available_actions(is_collided, is_finished, actions):
+        return ([] if is_collided['is_collided']
+                or is_finished['is_finished'] else actions)
 
     @property
     def config(self):
@@ -199,7 +712,7 @@ class BenchBot(object):
             A dict of all configuration parameters as retrieved from the
             running BenchBot supervisor
         """
-        return self._query('', BenchBot.RouteType.CONFIG)
+        return self._query_config('')
 
     @property
     def observations(self):
@@ -210,7 +723,7 @@ class BenchBot(object):
         list
             A list of observations.
         """
-        return self._query('task/observations', BenchBot.RouteType.CONFIG)
+        return self._query_config('task/observations')
 
     @property
     def result_filename(self):
@@ -222,9 +735,51 @@ class BenchBot(object):
         str
             The filename that the results will be written to.
         """
-        if not os.path.exists(os.path.dirname(RESULT_LOCATION)):
-            os.makedirs(os.path.dirname(RESULT_LOCATION))
-        return os.path.join(RESULT_LOCATION)
+        d = os.path.dirname(self.result_location)
+        if d and not os.path.exists(d):
+            os.makedirs(d)
+        return os.path.join(self.result_location)
+
+    @property
+    def config_cache_stats(self):
+        """Statistics describing the use of the client-side config cache
+
+        Returns
+        -------
+        dict
+            A dict with the number of cache 'hits' & 'misses', and the
+            number of config routes currently 'cached'
+        """
+        return {
+            'hits': self._config_cache_hits,
+            'misses': self._config_cache_misses,
+            'cached': len(self._config_cache)
+        }
+
+    def _query_config(self, route_name):
+        """Queries a config route, using the config cache if enabled (see
+        '_query_batch()')
+        """
+        return self._query_batch([(route_name, BenchBot.RouteType.CONFIG)])[0]
+
+    def _fill_config_cache(self):
+        """Invalidates the config cache, then refills it with all of the
+        static config routes used by the API in a single round trip
+        """
+        self._config_cache.clear()
+        if self.cache_config:
+            self._query_batch([(r, BenchBot.RouteType.CONFIG)
+                               for r in CACHED_CONFIG_ROUTES])
+
+    def close(self):
+        """Closes all pooled connections to the BenchBot Supervisor. The
+        instance reconnects automatically if it is used again afterwards.
+        """
+        self._flush_recorder()
+        self._session.close()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
 
     def empty_results(self):
         """Helper method for getting an empty results dict, pre-populated with
@@ -237,13 +792,18 @@ class BenchBot(object):
             A dict with the fields 'task_details' (populated),
             'environment_details' (populated), and 'results' (empty)
         """
+        task, environments, config = self._query_batch([
+            ('task', BenchBot.RouteType.CONFIG),
+            ('environments', BenchBot.RouteType.CONFIG),
+            ('', BenchBot.RouteType.CONFIG)
+        ])
         return {
             'task_details':
-            self._query('task', BenchBot.RouteType.CONFIG),
+            task,
             'environment_details':
-            self._query('environments', BenchBot.RouteType.CONFIG),
+            environments,
             'results': (self._query('create', BenchBot.RouteType.RESULTS)
-                        if self.config['results'] else {})
+                        if config['results'] else {})
         }
 
     def next_scene(self):
@@ -264,7 +824,11 @@ class BenchBot(object):
         # Move to the next scene
         print("Moving to next scene ... ", end='')
         sys.stdout.flush()
+        self._flush_recorder()
         resp = self._query('next', BenchBot.RouteType.ROBOT)
+        self._config_cache.clear()
+        self._state_version += 1
+        self._step_actions = None
         print("Done." if resp['next_success'] else "Failed.")
 
         # Return the result of moving to next (a failure means we are already
@@ -282,29 +846,145 @@ class BenchBot(object):
             Observations and action result at the start of the task (should
             always be SUCCESS).
         """
-        # Only restart the supervisor if it is in a dirty state
+        self._reset_if_dirty()
+        return self.step(None)
+
+    def _flush_recorder(self):
+        """Waits for the attached recorder (if there is one) to finish
+        recording previous steps, which must happen before the robot state
+        changes as lazy observations are only available until then
+        """
+        if self.recorder is not None:
+            self.recorder.flush()
+
+    def _record_step(self, action, action_kwargs, observations,
+                     action_result):
+        """Records a step with the attached recorder (if there is one), and
+        returns the step's observations and action result
+        """
+        if self.recorder is not None:
+            self.recorder.record_step(self, action, action_kwargs,
+                                      observations, action_result)
+        return observations, action_result
+
+    def _reset_if_dirty(self):
+        """Resets the robot state, but only if it is in a dirty state (see
+        'reset()')
+        """
         if self._query('is_dirty', BenchBot.RouteType.ROBOT)['is_dirty']:
             print("Dirty robot state detected. Performing reset ... ", end='')
             sys.stdout.flush()
+            self._flush_recorder()
             self._query('reset',
                         BenchBot.RouteType.ROBOT)  # This should be a send...
+            self._config_cache.clear()
+            self._state_version += 1
+            self._step_actions = None
             print("Complete.")
-        return self.step(None)
+
+    def _local_results(self):
+        """Returns the results format functions which run locally (none
+        unless modules are given in 'local_results_functions')
+        """
+        if not self.local_results_functions:
+            return {}
+        if self._local_results_functions is None:
+            self._local_results_functions = (
+                BenchBot._attempt_results_imports(
+                    self._query_config('').get('results', None),
+                    self.local_results_functions))
+        return self._local_results_functions
+
+    def call_results_functions(self, calls):
+        """Calls many results format functions at once, in a single batched
+        request (or concurrently if the Supervisor has no batch route),
+        rather than a round trip per call. Functions running locally (see
+        'results_functions()') are called directly.
+
+        Parameters
+        ----------
+        calls :
+            A list of (function_name, args, kwargs) tuples, where 'args' &
+            'kwargs' can be omitted
+
+        Returns
+        -------
+        list
+            The return of each call, in the same order as 'calls'
+        """
+        calls = [(c[0], c[1] if len(c) > 1 else [], c[2] if len(c) > 2 else {})
+                 for c in calls]
+        local = self._local_results()
+        results = [None] * len(calls)
+        remote = []
+        for i, (n, a, k) in enumerate(calls):
+            if n in local:
+                results[i] = local[n](*a, **k)
+            else:
+                remote.append(i)
+        for i, r in zip(
+                remote,
+                self._query_batch([('/%s' % calls[i][0],
+                                    BenchBot.RouteType.RESULTS, {
+                                        'args': calls[i][1],
+                                        'kwargs': calls[i][2]
+                                    }) for i in remote])):
+            results[i] = r
+        return results
+
+    def results_batch(self):
+        """Returns a 'benchbot_api.results.ResultsBatch', which queues calls
+        to results format functions & sends them all at once (see
+        'call_results_functions()')
+        """
+        return ResultsBatch(self)
 
     def results_functions(self):
+        """Returns the functions defined by the current results format. The
+        list of functions is cached (when 'cache_config' is enabled) until
+        'start()' is next called. See 'results_batch()' for making many
+        calls at once.
+
+        Functions are called remotely by the Supervisor, unless modules are
+        given in 'local_results_functions'. Then the format's definition is
+        fetched once, & each function it names from one of those modules is
+        imported to run in-process (in the same way as API-side connection
+        callbacks). Any other function, or one that can't be imported, is
+        called remotely (with a warning).
+
+        Returns
+        -------
+        dict
+            A dict from each function's name to a callable running it
+        """
+        if self._results_functions is None or not self.cache_config:
+            self._results_functions = self._query('/',
+                                                  BenchBot.RouteType.RESULTS)
+        local = self._local_results()
         return {
-            r: lambda *args, _fn=r, **kwargs: self._query(
+            r: local[r] if r in local else
+            lambda *args, _fn=r, **kwargs: self._query(
                 '/%s' % _fn, BenchBot.RouteType.RESULTS, {
                     'args': args,
                     'kwargs': kwargs
                 })
-            for r in self._query('/', BenchBot.RouteType.RESULTS)
+            for r in self._results_functions
         }
 
-    def run(self, agent=None):
+    def run(self, agent=None, pipelined=False):
         """Helper function that runs the robot according to the agent given.
         Generally, you should use this function and implement your object in
         your own custom agent class. 
+
+        Parameters
+        ----------
+        agent :
+            The agent to run (defaults to the currently attached agent)
+
+        pipelined :
+            Whether steps should be performed through a 'StepPipeline', so
+            observation channels are decoded in the background while the
+            agent is already working with the rest of the observations
         """
         if agent is not None:
             self.set_agent(agent)
@@ -314,22 +994,57 @@ class BenchBot(object):
                 "create your BenchBot instance with an agent argument, "
                 "or create your own run logic instead of using Benchbot.run()")
 
+        pipeline = StepPipeline(self) if pipelined else None
+        step_fn = (self.step if pipeline is None else
+                   lambda *args, **kwargs: pipeline.submit(*args, **kwargs).
+                   result())
+
+        # Streamed results are written a scene at a time, & scenes already
+        # written by an interrupted run are skipped
+        writer = None
+        if self.stream_results:
+            writer = ResultsWriter(self.result_filename,
+                                   self.empty_results(),
+                                   resume=True)
+            results_fns = self.results_functions()
+
         # Copy & pasting the same code twice just doesn't feel right...
-        def scene_fn():
-            observations, action_result = self.reset()
+        def scene_fn(scene):
+            if writer is not None and writer.is_complete(scene):
+                return
+            self._reset_if_dirty()
+            observations, action_result = step_fn(None)
             while not self.agent.is_done(action_result):
                 action, action_args = self.agent.pick_action(
-                    observations, self.actions)
-                observations, action_result = self.step(action, **action_args)
+                    observations, self._step_actions)
+                observations, action_result = step_fn(action, **action_args)
+            if writer is not None:
+                self.agent.save_result_chunk(writer, scene, results_fns)
+                if not writer.is_complete(scene):
+                    writer.write_chunk(scene)
 
         # Run through the scenes until done
-        scene_fn()
-        while self.next_scene():
-            scene_fn()
+        scene = 0
+        try:
+            scene_fn(scene)
+            while self.next_scene():
+                scene += 1
+                scene_fn(scene)
+        finally:
+            if pipeline is not None:
+                pipeline.close()
+            if writer is not None:
+                writer.close()
 
         # We've made it to the end, we should save our results!
-        self.agent.save_result(self.result_filename, self.empty_results(),
-                               self.results_functions())
+        self._flush_recorder()
+        if writer is not None:
+            writer.finalise()
+        else:
+            self.agent.save_result(self.result_filename, self.empty_results(),
+                                   self.results_functions())
+        if self.stats is not None and self.stats_location is not None:
+            self.stats.dump(self.stats_location)
 
     def set_agent(self, agent):
         """Updates the current agent, and starts its connection with a BenchBot
@@ -378,10 +1093,12 @@ class BenchBot(object):
         print("Connected!")
 
         # Get references to all of the API callbacks in robot config
+        self._fill_config_cache()
+        self._local_results_functions = None
+        self._results_functions = None
         self._connection_callbacks = {
             k: BenchBot._attempt_connection_imports(v)
-            for k, v in self._query('robot', BenchBot.RouteType.CONFIG)
-            ['connections'].items()
+            for k, v in self._query_config('robot')['connections'].items()
         }
 
         # Ensure we are starting in a clean robot state
@@ -392,7 +1109,11 @@ class BenchBot(object):
                 "Performing restart ... ",
                 end='')
             sys.stdout.flush()
+            self._flush_recorder()
             self._query('restart', BenchBot.RouteType.ROBOT)
+            self._config_cache.clear()
+            self._state_version += 1
+            self._step_actions = None
             print("Done.")
         else:
             self.reset()
@@ -417,46 +1138,76 @@ class BenchBot(object):
         -------
         tuple
             Observations and action result after the action has finished.
+            With 'lazy_observations' enabled, the observations are a
+            'LazyObservations' dict which only fetches each channel when it
+            is first accessed. Lazy observations must be accessed (or
+            fetched up front with 'prefetch()') before the next step, as
+            they describe the state directly after this action.
 
         """
         # Perform the requested action if possible
+        self._flush_recorder()
+        self._state_version += 1
         if action is not None:
-            # Detect actions unavailable due to robot state
-            if action not in self.actions:
-                raise ValueError(
-                    "Action '%s' is unavailable due to: %s" %
-                    (action, ('COLLISION' if self._query(
-                        'is_collided', BenchBot.RouteType.ROBOT)['is_collided']
-                              else 'FINISHED' if self._query(
-                                  'is_finished', BenchBot.RouteType.ROBOT)
-                              ['is_finished'] else 'WRONG_ACTUATION_MODE?')))
-
-            # Made it through checks, actually perform the action
-            print("Sending action '%s' with args: %s" %
-                  (action, action_kwargs))
-            self._query(action, BenchBot.RouteType.CONNECTION, action_kwargs)
+            self._perform_action(action, action_kwargs)
+
+        # Only the robot state is needed up front for lazy observations
+        observations = self.observations
+        if self.lazy_observations:
+            action_result, scene_number = self._process_state(
+                self._query_batch(BenchBot._STATE_QUERIES))
+            lazy_os = LazyObservations({
+                o: LazyObservations.loader(
+                    functools.partial(self._fetch_observation, o,
+                                      self._state_version))
+                for o in observations
+            })
+            lazy_os.update({'scene_number': scene_number})
+            return self._record_step(action, action_kwargs, lazy_os,
+                                     action_result)
+
+        # Retrieve the updated robot state, action list & set of observations
+        # in a single round trip
+        resps = self._query_batch(
+            BenchBot._STATE_QUERIES +
+            [(o, BenchBot.RouteType.CONNECTION) for o in observations])
+        action_result, scene_number = self._process_state(
+            resps[:len(BenchBot._STATE_QUERIES)])
+
+        # Decode and return the updated set of observations
+        raw_os = dict(zip(observations, resps[len(BenchBot._STATE_QUERIES):]))
+        raw_os.update({'scene_number': scene_number})
+        return self._record_step(
+            action, action_kwargs,
+            {k: self._decode_observation(k, v)
+             for k, v in raw_os.items()}, action_result)
+
+    def subscribe(self, channels, max_queue=DEFAULT_MAX_QUEUE):
+        """Subscribes to observations pushed by the Supervisor over a single
+        long-lived streaming connection, rather than querying each channel
+        every step. This suits agents which consume observations at their own
+        rate while the robot moves, & only want the freshest data.
 
-        # Derive action_result (TODO should probably not be this flimsy...)
-        action_result = ActionResult.SUCCESS
-        if self._query('is_collided', BenchBot.RouteType.ROBOT)['is_collided']:
-            action_result = ActionResult.COLLISION
-        elif self._query('is_finished',
-                         BenchBot.RouteType.ROBOT)['is_finished']:
-            action_result = ActionResult.FINISHED
+        Parameters
+        ----------
+        channels :
+            List of observation channels to subscribe to (e.g.
+            ['image_rgb', 'poses'])
 
-        # Retrieve and return an updated set of observations
-        raw_os = {
-            o: self._query(o, BenchBot.RouteType.CONNECTION)
-            for o in self.observations
-        }
-        raw_os.update({
-            'scene_number':
-            self._query('selected_environment',
-                        BenchBot.RouteType.ROBOT)['number']
-        })
-        return ({
-            k: (self._connection_callbacks[k](v) if
-                (k in self._connection_callbacks
-                 and self._connection_callbacks[k] is not None) else v)
-            for k, v in raw_os.items()
-        }, action_result)
+        max_queue :
+            Maximum number of frames waiting to be consumed, beyond which the
+            oldest are dropped
+
+        Returns
+        -------
+        Subscription
+            An iterable (& async iterable) of 'ObservationFrame' tuples, each
+            with a 'sequence' number & decoded 'observations' dict (see
+            'benchbot_api.subscription.Subscription')
+        """
+        unknown = [c for c in channels if c not in self.observations]
+        if unknown:
+            raise ValueError(
+                "Cannot subscribe to unavailable observation channels: %s" %
+                unknown)
+        return Subscription(self, channels, max_queue)
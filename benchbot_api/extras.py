@@ -1,3 +1,5 @@
+from matplotlib.colors import to_rgba_array
+from matplotlib.patches import Patch
 import numpy as np
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 
@@ -38,51 +40,66 @@ CLASS_TO_COLOR_MAP = {
 }
 
 
+# Corners of a unit cube centred on the origin, in the order returned by
+# get_bbox3d()
+BBOX_CORNERS = 0.5 * np.array([
+    [-1,  1, -1],
+    [-1, -1, -1],
+    [ 1, -1, -1],
+    [ 1,  1, -1],
+    [-1,  1,  1],
+    [-1, -1,  1],
+    [ 1, -1,  1],
+    [ 1,  1,  1],
+])
+
+# Indices into the corners of each of a box's sides
+BBOX_FACES = np.array([
+    [0, 1, 2, 3],
+    [4, 5, 6, 7],
+    [0, 1, 5, 4],
+    [2, 3, 7, 6],
+    [1, 2, 6, 5],
+    [4, 7, 3, 0],
+])
+
+
 def get_bbox3d(extent, centroid):
-    """ Calculate 3D bounding box corners from its parameterization.
+    """ Calculate 3D bounding box corners from their parameterization, for
+    a single box or a batch of N boxes in one operation.
     Input:
-        extent: (length, width, height)
-        centroid: (x, y, z)
+        extent: (length, width, height), or (N, 3) array of them
+        centroid: (x, y, z), or (N, 3) array of them
     Output:
-        corners3d:  3D box corners
+        corners3d:  3D box corners, with shape (8, 3) or (N, 8, 3)
     """
-
-    l, w, h = extent
-
-    corners3d = 0.5 * np.array([
-        [-l, -l,  l,  l, -l, -l,  l, l],
-        [ w, -w, -w,  w,  w, -w, -w, w],
-        [-h, -h, -h, -h,  h,  h,  h, h],
-    ])
-
-    corners3d[0, :] = corners3d[0, :] + centroid[0]
-    corners3d[1, :] = corners3d[1, :] + centroid[1]
-    corners3d[2, :] = corners3d[2, :] + centroid[2]
-
-    return corners3d.T
+    extent = np.asarray(extent, dtype=float)
+    centroid = np.asarray(centroid, dtype=float)
+    return (centroid[..., None, :] +
+            extent[..., None, :] * BBOX_CORNERS)
 
 
 def vis_bbox3d(ax, bbox3d, facecolor, edgecolor, label):
-    """ Visualise 3D bounding box.
+    """ Visualise 3D bounding boxes, with all boxes drawn by a single
+    Poly3DCollection & a single scatter.
     Input:
         ax: matplotlib axes 3D
-        facecolor: bounding box facecolor
+        bbox3d: box corners with shape (8, 3), or (N, 8, 3) for N boxes
+        facecolor: bounding box facecolor, or list of one per box
         edgecolor: bounding box edgecolor
-        label: bounding box object class
+        label: bounding box object class (or None for no legend entry)
     """
-    # Cuboid sides
-    surf_verts = [
-        [bbox3d[0], bbox3d[1], bbox3d[2], bbox3d[3]],
-        [bbox3d[4], bbox3d[5], bbox3d[6], bbox3d[7]],
-        [bbox3d[0], bbox3d[1], bbox3d[5], bbox3d[4]],
-        [bbox3d[2], bbox3d[3], bbox3d[7], bbox3d[6]],
-        [bbox3d[1], bbox3d[2], bbox3d[6], bbox3d[5]],
-        [bbox3d[4], bbox3d[7], bbox3d[3], bbox3d[0]]
-    ]
+    corners = np.asarray(bbox3d).reshape(-1, 8, 3)
+
+    # Cuboid sides (with each box's facecolor repeated for all of its sides)
+    surf_verts = corners[:, BBOX_FACES].reshape(-1, 4, 3)
+    facecolors = to_rgba_array(facecolor)
+    if len(facecolors) > 1:
+        facecolors = np.repeat(facecolors, len(BBOX_FACES), axis=0)
 
     cuboid = Poly3DCollection(
         surf_verts,
-        facecolors=facecolor,
+        facecolors=facecolors,
         linewidths=1,
         edgecolors=edgecolor,
         alpha=.25,
@@ -93,15 +110,29 @@ def vis_bbox3d(ax, bbox3d, facecolor, edgecolor, label):
     cuboid._edgecolors2d = cuboid._edgecolor3d
 
     ax.add_collection3d(cuboid)
-    ax.scatter3D(bbox3d[:, 0], bbox3d[:, 1], bbox3d[:, 2], s=1, color=edgecolor)
+    corners = corners.reshape(-1, 3)
+    ax.scatter3D(corners[:, 0], corners[:, 1], corners[:, 2], s=1,
+                 color=edgecolor)
 
 
 def vis_semantic_map3d(ax, scene_objects, class_to_color_map, edgecolor):
-    for obj in scene_objects:
-        label = obj['class']
-        facecolor = class_to_color_map[label]
-        bbox3d = get_bbox3d(obj['extent'], obj['centroid'])
-
-        vis_bbox3d(ax, bbox3d, facecolor, edgecolor, label)
+    # Boxes are all drawn by a single collection (coloured per box), with a
+    # legend entry per class given by proxy patches
+    if scene_objects:
+        classes = [obj['class'] for obj in scene_objects]
+        extents = np.array([obj['extent'] for obj in scene_objects],
+                           dtype=float)
+        centroids = np.array([obj['centroid'] for obj in scene_objects],
+                             dtype=float)
+        bboxes = get_bbox3d(extents, centroids).reshape(-1, 8, 3)
+
+        vis_bbox3d(ax, bboxes, [class_to_color_map[c] for c in classes],
+                   edgecolor, None)
+        ax.legend(handles=[
+            Patch(facecolor=class_to_color_map[c],
+                  edgecolor=edgecolor,
+                  alpha=.25,
+                  label=c) for c in dict.fromkeys(classes)
+        ])
 
     _set_axes_equal(ax)
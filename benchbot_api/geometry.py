@@ -0,0 +1,229 @@
+import numpy as np
+
+from .transforms import FrameTree, transform_points
+
+# Maximum number of pixel ray grids cached (one per resolution, intrinsics, &
+# convention)
+_MAX_CACHED_RAYS = 8
+
+_RAYS = {}
+
+
+def _intrinsics_matrix(intrinsics):
+    # Accepts either a 3x3 matrix, or an 'image_*_info' observation (the
+    # Supervisor spells the key 'matrix_instrinsics')
+    if isinstance(intrinsics, dict):
+        intrinsics = intrinsics.get('matrix_instrinsics',
+                                    intrinsics.get('matrix_intrinsics'))
+    return np.asarray(intrinsics, dtype=float)
+
+
+def _to_frame_tree(poses):
+    return poses if isinstance(poses, FrameTree) else FrameTree(poses)
+
+
+def pixel_rays(height, width, intrinsics, optical=True, dtype=np.float32):
+    """Returns the ray through every pixel of an image, scaled so each ray
+    has unit depth. Ray grids are cached per resolution, intrinsics,
+    convention, & dtype, so repeated calls cost nothing.
+
+    Parameters
+    ----------
+    height :
+        Height of the image in pixels
+
+    width :
+        Width of the image in pixels
+
+    intrinsics :
+        The 3x3 camera intrinsics matrix, or an 'image_depth_info' /
+        'image_rgb_info' observation containing it
+
+    optical :
+        Whether rays are in the optical convention (x right, y down, z
+        forward), or otherwise the body convention (x forward, y left, z up)
+
+    dtype :
+        The dtype of the returned rays
+
+    Returns
+    -------
+    ndarray
+        Read-only array of rays with shape (height, width, 3)
+    """
+    k = _intrinsics_matrix(intrinsics)
+    fx, fy, cx, cy = k[0, 0], k[1, 1], k[0, 2], k[1, 2]
+    key = (height, width, fx, fy, cx, cy, optical, np.dtype(dtype))
+    rays = _RAYS.get(key, None)
+    if rays is None:
+        x = (np.arange(width) - cx) / fx
+        y = (np.arange(height) - cy) / fy
+        rays = np.empty((height, width, 3), dtype=dtype)
+        if optical:
+            rays[..., 0] = x[None, :]
+            rays[..., 1] = y[:, None]
+            rays[..., 2] = 1
+        else:
+            rays[..., 0] = 1
+            rays[..., 1] = -x[None, :]
+            rays[..., 2] = -y[:, None]
+        rays.flags.writeable = False
+        if len(_RAYS) >= _MAX_CACHED_RAYS:
+            _RAYS.clear()
+        _RAYS[key] = rays
+    return rays
+
+
+def depth_to_points(depth, intrinsics, optical=True, out=None):
+    """Back-projects a depth image into a point cloud in the camera's frame
+
+    Parameters
+    ----------
+    depth :
+        The depth image with shape (H, W), with depths in metres
+
+    intrinsics :
+        The 3x3 camera intrinsics matrix, or an 'image_depth_info'
+        observation containing it
+
+    optical :
+        Whether points are in the optical convention (x right, y down, z
+        forward), or otherwise the body convention (x forward, y left, z up)
+
+    out :
+        Optional array of shape (H, W, 3) to write the points into, which is
+        reused rather than allocating a new array every call
+
+    Returns
+    -------
+    ndarray
+        The point for every pixel with shape (H, W, 3) (pixels without a
+        valid depth give points of NaN or zero, as the depth does)
+    """
+    depth = np.asarray(depth)
+    dtype = depth.dtype if depth.dtype.kind == 'f' else np.float64
+    rays = pixel_rays(depth.shape[0], depth.shape[1], intrinsics, optical,
+                      dtype if out is None else out.dtype)
+    return np.multiply(depth[..., None], rays, out=out)
+
+
+def depth_to_map_points(depth,
+                        intrinsics,
+                        poses,
+                        frame,
+                        relative_to='map',
+                        optical=True,
+                        out=None):
+    """Back-projects a depth image into a point cloud in the map frame (or
+    any other frame of the 'poses' observation)
+
+    Parameters
+    ----------
+    depth :
+        The depth image with shape (H, W), with depths in metres
+
+    intrinsics :
+        The 3x3 camera intrinsics matrix, or an 'image_depth_info'
+        observation containing it
+
+    poses :
+        A 'poses' observation (dict or 'PoseSet'), or a 'FrameTree' built
+        from one
+
+    frame :
+        The name of the camera's frame in 'poses' (e.g. the 'frame_id' of
+        the 'image_depth_info' observation)
+
+    relative_to :
+        The frame the points are returned in
+
+    optical :
+        Whether 'frame' follows the optical convention (x right, y down, z
+        forward), or otherwise the body convention (x forward, y left, z up)
+
+    out :
+        Optional array of shape (H, W, 3) to write the points into
+
+    Returns
+    -------
+    ndarray
+        The point for every pixel with shape (H, W, 3)
+    """
+    points = depth_to_points(depth, intrinsics, optical, out)
+    flat = points.reshape(-1, 3)
+    transform_points(_to_frame_tree(poses).matrix(frame, relative_to), flat,
+                     flat)
+    return points
+
+
+def laser_to_points(laser, valid_only=False, out=None):
+    """Converts the scans of a 'laser' observation to Cartesian points in the
+    laser's (i.e. the robot's) frame
+
+    Parameters
+    ----------
+    laser :
+        The 'laser' observation
+
+    valid_only :
+        Whether to drop scans outside of the laser's valid range
+
+    out :
+        Optional array of shape (N, 2) to write the points into (ignored if
+        'valid_only' is set)
+
+    Returns
+    -------
+    ndarray
+        The x & y of each scan with shape (N, 2)
+    """
+    # Empty scans are reshaped too, so they give no points rather than failing
+    scans = np.asarray(laser['scans'], dtype=float).reshape(-1, 2)
+    if valid_only:
+        scans = scans[(scans[:, 0] >= laser['range_min'])
+                      & (scans[:, 0] <= laser['range_max'])]
+        out = None
+    if out is None:
+        out = np.empty((scans.shape[0], 2))
+    np.cos(scans[:, 1], out=out[:, 0])
+    np.sin(scans[:, 1], out=out[:, 1])
+    out *= scans[:, 0:1]
+    return out
+
+
+def laser_to_map_points(laser,
+                        poses,
+                        frame='robot',
+                        relative_to='map',
+                        valid_only=False):
+    """Converts the scans of a 'laser' observation to 3D Cartesian points in
+    the map frame (or any other frame of the 'poses' observation)
+
+    Parameters
+    ----------
+    laser :
+        The 'laser' observation
+
+    poses :
+        A 'poses' observation (dict or 'PoseSet'), or a 'FrameTree' built
+        from one
+
+    frame :
+        The name of the laser's frame in 'poses'
+
+    relative_to :
+        The frame the points are returned in
+
+    valid_only :
+        Whether to drop scans outside of the laser's valid range
+
+    Returns
+    -------
+    ndarray
+        The point for each scan with shape (N, 3)
+    """
+    xy = laser_to_points(laser, valid_only)
+    points = np.zeros((xy.shape[0], 3))
+    points[:, :2] = xy
+    return transform_points(_to_frame_tree(poses).matrix(frame, relative_to),
+                            points, points)
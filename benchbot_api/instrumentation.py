@@ -0,0 +1,173 @@
+import bisect
+import csv
+import json
+import threading
+
+# Upper edges (in seconds) of the latency histogram buckets (the last bucket
+# holds everything slower than the last edge)
+LATENCY_BUCKETS = [
+    0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5
+]
+
+
+class _Timings(object):
+    __slots__ = ['count', 'total', 'min', 'max']
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, t):
+        self.count += 1
+        self.total += t
+        self.min = t if self.min is None else min(self.min, t)
+        self.max = t if self.max is None else max(self.max, t)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max
+        }
+
+
+class _RouteStats(object):
+    __slots__ = ['latency', 'histogram', 'bytes', 'decode']
+
+    def __init__(self):
+        self.latency = _Timings()
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.bytes = 0
+        self.decode = _Timings()
+
+
+class Instrumentation(object):
+    """Collects statistics about where time goes when communicating with a
+    BenchBot Supervisor. Create a BenchBot instance with 'instrument=True'
+    to have statistics collected in 'BenchBot.stats'.
+
+    For every route it records the number of calls, a histogram of latencies
+    (time until the full response is received), the bytes received, & the
+    time spent decoding responses. For every observation channel it records
+    the time spent in API-side connection callbacks. Queries sent together
+    through the batch route are recorded under the batch route, & also each
+    under its own route (with the latency of the whole batch, & its own
+    bytes & decode time).
+
+    Hooks can also be added to receive each event as it happens. A hook is
+    called with a dict describing the event, either:
+
+    - {'type': 'query', 'route': str, 'latency': float, 'bytes': int,
+      'decode': float} for a query; or
+    - {'type': 'callback', 'channel': str, 'time': float} for a connection
+      callback.
+
+    All times are in seconds.
+    """
+    def __init__(self):
+        self.hooks = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def add_hook(self, hook):
+        """Adds a function to be called with every event (see class docs)"""
+        self.hooks.append(hook)
+
+    def dump(self, filename):
+        """Writes the current statistics to 'filename', as CSV if the
+        filename ends with '.csv' & as JSON otherwise
+        """
+        with open(filename, 'w') as f:
+            if filename.lower().endswith('.csv'):
+                self.write_csv(f)
+            else:
+                json.dump(self.summary(), f, indent=2)
+
+    def record_callback(self, channel, t):
+        """Records 't' seconds spent in the callback for 'channel'"""
+        with self._lock:
+            self._callbacks.setdefault(channel, _Timings()).add(t)
+        for h in self.hooks:
+            h({'type': 'callback', 'channel': channel, 'time': t})
+
+    def record_query(self, route, latency, nbytes, decode):
+        """Records a query of 'route' which took 'latency' seconds to receive
+        'nbytes' bytes, & 'decode' seconds to decode
+        """
+        with self._lock:
+            s = self._routes.get(route, None)
+            if s is None:
+                s = self._routes[route] = _RouteStats()
+            s.latency.add(latency)
+            s.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            s.bytes += nbytes
+            s.decode.add(decode)
+        for h in self.hooks:
+            h({
+                'type': 'query',
+                'route': route,
+                'latency': latency,
+                'bytes': nbytes,
+                'decode': decode
+            })
+
+    def reset(self):
+        """Clears all collected statistics"""
+        with self._lock:
+            self._routes = {}
+            self._callbacks = {}
+
+    def summary(self):
+        """Returns all collected statistics
+
+        Returns
+        -------
+        dict
+            A dict with 'routes' (per-route 'latency' & 'decode' timings,
+            'latency_histogram' counts, & received 'bytes'), 'callbacks'
+            (per-channel callback timings), & the 'latency_buckets' edges
+        """
+        with self._lock:
+            return {
+                'latency_buckets': list(LATENCY_BUCKETS),
+                'routes': {
+                    r: {
+                        'latency': s.latency.summary(),
+                        'latency_histogram': list(s.histogram),
+                        'bytes': s.bytes,
+                        'decode': s.decode.summary()
+                    }
+                    for r, s in self._routes.items()
+                },
+                'callbacks':
+                {c: t.summary()
+                 for c, t in self._callbacks.items()}
+            }
+
+    def write_csv(self, f):
+        """Writes the current statistics as CSV to file object 'f', with a
+        row per route & per callback
+        """
+        s = self.summary()
+        w = csv.writer(f)
+        w.writerow([
+            'kind', 'name', 'count', 'total', 'mean', 'min', 'max', 'bytes',
+            'decode_total', 'decode_mean'
+        ] + ['le_%g' % b
+             for b in LATENCY_BUCKETS] + ['gt_%g' % LATENCY_BUCKETS[-1]])
+        for r, v in sorted(s['routes'].items()):
+            l = v['latency']
+            w.writerow([
+                'route', r, l['count'], l['total'], l['mean'], l['min'],
+                l['max'], v['bytes'], v['decode']['total'],
+                v['decode']['mean']
+            ] + v['latency_histogram'])
+        for c, t in sorted(s['callbacks'].items()):
+            w.writerow([
+                'callback', c, t['count'], t['total'], t['mean'], t['min'],
+                t['max']
+            ])
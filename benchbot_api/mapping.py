@@ -0,0 +1,738 @@
+import itertools
+import numpy as np
+
+from . import geometry
+from .transforms import FrameTree
+
+DEFAULT_RESOLUTION = 0.05
+
+# Intersection over union above which a detection is merged into an existing
+# object of an ObjectMap
+DEFAULT_MERGE_IOU = 0.25
+
+# Log-odds updates for voxels containing a point (hit), & voxels a ray passed
+# through (miss), with the limits log-odds are clamped to
+LOG_ODDS_HIT = 0.85
+LOG_ODDS_MISS = -0.4
+LOG_ODDS_LIMITS = (-2.0, 3.5)
+
+# Voxel coordinates are packed into a single int64 key with this many bits
+# per axis (i.e. +/- 2^20 voxels from the origin along each axis)
+_KEY_BITS = 21
+_KEY_BIAS = 1 << (_KEY_BITS - 1)
+_KEY_MASK = (1 << _KEY_BITS) - 1
+_EMPTY = np.iinfo(np.int64).min
+
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_INITIAL_CAPACITY = 1 << 12
+_MAX_LOAD = 0.5
+
+# Eviction shrinks the map to this fraction of 'max_voxels', so it is not
+# needed again for a while
+_EVICT_FRACTION = 0.9
+
+# Maximum number of ray samples generated at once when raycasting
+_MAX_RAY_SAMPLES = 1 << 22
+
+
+def _bincount_rows(indices, values, n):
+    # Sums rows of 'values' (with shape (M, 3)) into 'n' bins by 'indices'
+    return np.stack([
+        np.bincount(indices, values[:, i], minlength=n)
+        for i in range(values.shape[1])
+    ],
+                    axis=1)
+
+
+def _pack(coords):
+    c = coords + _KEY_BIAS
+    return (c[:, 0] << (2 * _KEY_BITS)) | (c[:, 1] << _KEY_BITS) | c[:, 2]
+
+
+def _unique(keys, return_inverse=False):
+    # Sort based, as it is much faster than 'np.unique()' for large arrays of
+    # int64 keys
+    order = np.argsort(keys, kind='stable') if return_inverse else None
+    s = keys[order] if return_inverse else np.sort(keys)
+    first = np.empty(len(s), dtype=bool)
+    first[:1] = True
+    np.not_equal(s[1:], s[:-1], out=first[1:])
+    if not return_inverse:
+        return s[first]
+    inverse = np.empty(len(s), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return s[first], inverse
+
+
+def _unpack(keys):
+    return np.stack([(keys >> (2 * _KEY_BITS)) & _KEY_MASK,
+                     (keys >> _KEY_BITS) & _KEY_MASK, keys & _KEY_MASK],
+                    axis=1) - _KEY_BIAS
+
+
+class _VoxelIndex(object):
+    """Open addressing hash table from packed voxel keys to slots, where
+    lookups & insertions are vectorised over arrays of keys
+    """
+    def __init__(self, capacity=_INITIAL_CAPACITY):
+        self.keys = np.full(capacity, _EMPTY, dtype=np.int64)
+        self.count = 0
+        self._shift = np.uint64(64 - (capacity.bit_length() - 1))
+
+    def _hash(self, keys):
+        return (keys.view(np.uint64) * _HASH_MULTIPLIER >> self._shift).astype(
+            np.int64)
+
+    def lookup(self, keys, insert=False):
+        """Returns the slot for each of the unique 'keys' (-1 if a key is
+        not present & 'insert' is False). The index must have room for any
+        inserted keys.
+        """
+        slots = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        probe = self._hash(keys)
+        mask = len(self.keys) - 1
+        while len(pending):
+            s = probe[pending]
+            k = self.keys[s]
+            found = k == keys[pending]
+            slots[pending[found]] = s[found]
+            empty = k == _EMPTY
+            if insert and np.any(empty):
+                # Several keys can land on the same empty slot; the first
+                # claims it & the rest keep probing
+                e = np.flatnonzero(empty)
+                _, first = np.unique(s[e], return_index=True)
+                won = e[first]
+                self.keys[s[won]] = keys[pending[won]]
+                slots[pending[won]] = s[won]
+                self.count += len(won)
+                empty[:] = False
+                empty[won] = True
+            done = found | empty
+            pending = pending[~done]
+            probe[pending] = (probe[pending] + 1) & mask
+        return slots
+
+
+def box_iou(extents_a, centroids_a, extents_b, centroids_b):
+    """Returns the intersection over union of axis-aligned 3D boxes,
+    broadcasting across any leading dimensions of the arguments
+
+    Parameters
+    ----------
+    extents_a :
+        Extents (length, width, height) of the first boxes, with shape
+        (..., 3)
+
+    centroids_a :
+        Centroids of the first boxes, with shape (..., 3)
+
+    extents_b :
+        Extents of the second boxes, with shape (..., 3)
+
+    centroids_b :
+        Centroids of the second boxes, with shape (..., 3)
+
+    Returns
+    -------
+    ndarray
+        The intersection over union of each pair of boxes
+    """
+    ea, ca, eb, cb = (np.asarray(x, dtype=float)
+                      for x in (extents_a, centroids_a, extents_b,
+                                centroids_b))
+    overlap = (np.minimum(ca + ea / 2, cb + eb / 2) -
+               np.maximum(ca - ea / 2, cb - eb / 2))
+    intersection = np.prod(np.maximum(overlap, 0), axis=-1)
+    union = np.prod(ea, axis=-1) + np.prod(eb, axis=-1) - intersection
+    return np.divide(intersection,
+                     union,
+                     out=np.zeros(np.shape(union)),
+                     where=union > 0)
+
+
+class ObjectMap(object):
+    """Array-backed map of the objects detected in a scene (each an
+    axis-aligned 3D box with a class, as in semantic scene understanding
+    results), with a spatial index for fast queries & merging.
+
+    Objects are stored as arrays of centroids, extents, & class indices,
+    with a KD-tree over the centroids (rebuilt lazily on the first query
+    after the map changes). Nearest neighbour, radius, & box overlap queries
+    only examine the objects the tree returns as candidates, so merging a
+    batch of new detections is near linear in the size of the map, rather
+    than comparing every detection against every object.
+
+    'merge()' matches each detection to the existing object it overlaps best
+    (with an IoU of at least 'merge_iou', & the same class if
+    'match_class'). Matched objects become the running mean of every
+    detection merged into them, & unmatched detections become new objects.
+    Detections within a single batch are assumed to be distinct objects (as
+    they are for a single frame of a detector).
+
+    Parameters
+    ----------
+    objects :
+        Optional list of objects (dicts with 'class', 'extent', &
+        'centroid') to start the map with
+
+    merge_iou :
+        Minimum IoU for a detection to be merged into an existing object
+
+    match_class :
+        Whether detections are only merged into objects of the same class
+    """
+    def __init__(self,
+                 objects=None,
+                 merge_iou=DEFAULT_MERGE_IOU,
+                 match_class=True):
+        self.merge_iou = merge_iou
+        self.match_class = match_class
+        self.clear()
+        if objects:
+            self.add(*self._unpack_objects(objects))
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError("Object index %d is out of range" % i)
+        i %= len(self)
+        return {
+            'class': self.class_list[self._classes[i]],
+            'extent': self._extents[i].tolist(),
+            'centroid': self._centroids[i].tolist()
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def centroids(self):
+        """The centroid of each object, with shape (N, 3)"""
+        return self._centroids[:self._count]
+
+    @property
+    def class_ids(self):
+        """The index of each object's class in 'class_list'"""
+        return self._classes[:self._count]
+
+    @property
+    def classes(self):
+        """The class name of each object"""
+        return [self.class_list[c] for c in self.class_ids]
+
+    @property
+    def counts(self):
+        """The number of detections merged into each object"""
+        return self._counts[:self._count]
+
+    @property
+    def extents(self):
+        """The extent of each object, with shape (N, 3)"""
+        return self._extents[:self._count]
+
+    def _append(self, class_ids, extents, centroids, counts=1):
+        n = self._count + len(class_ids)
+        if n > len(self._classes):
+            capacity = max(2 * len(self._classes), n)
+            for a in ('_centroids', '_extents', '_classes', '_counts'):
+                old = getattr(self, a)
+                new = np.zeros((capacity, ) + old.shape[1:], dtype=old.dtype)
+                new[:self._count] = old[:self._count]
+                setattr(self, a, new)
+        self._centroids[self._count:n] = centroids
+        self._extents[self._count:n] = extents
+        self._classes[self._count:n] = class_ids
+        self._counts[self._count:n] = counts
+        self._count = n
+        self._tree = None
+        return np.arange(n - len(class_ids), n)
+
+    def _candidates(self, extents, centroids):
+        # Returns (query, object) index pairs whose boxes may overlap, being
+        # pairs with centroids closer than the sum of their half diagonals
+        tree, reach = self._index()
+        lists = tree.query_ball_point(
+            centroids,
+            np.linalg.norm(extents, axis=1) / 2 + reach)
+        counts = np.fromiter(map(len, lists), dtype=np.int64,
+                             count=len(lists))
+        return (np.repeat(np.arange(len(lists)), counts),
+                np.fromiter(itertools.chain.from_iterable(lists),
+                            dtype=np.int64,
+                            count=int(counts.sum())))
+
+    def _class_indices(self, classes):
+        ids = np.empty(len(classes), dtype=np.int32)
+        for i, c in enumerate(classes):
+            j = self._class_ids.get(c, None)
+            if j is None:
+                j = self._class_ids[c] = len(self.class_list)
+                self.class_list.append(c)
+            ids[i] = j
+        return ids
+
+    def _index(self):
+        # SciPy's spatial module is imported here, as it is slow to import
+        if self._tree is None:
+            from scipy.spatial import cKDTree
+            self._tree = cKDTree(self.centroids)
+            self._reach = (np.amax(np.linalg.norm(self.extents, axis=1)) /
+                           2 if len(self) else 0.0)
+        return self._tree, self._reach
+
+    @staticmethod
+    def _unpack_objects(objects):
+        return ([o['class'] for o in objects],
+                np.array([o['extent'] for o in objects],
+                         dtype=float).reshape(-1, 3),
+                np.array([o['centroid'] for o in objects],
+                         dtype=float).reshape(-1, 3))
+
+    def add(self, classes, extents, centroids):
+        """Adds objects to the map without merging them
+
+        Parameters
+        ----------
+        classes :
+            List of the class name of each object
+
+        extents :
+            Array of object extents with shape (M, 3)
+
+        centroids :
+            Array of object centroids with shape (M, 3)
+
+        Returns
+        -------
+        ndarray
+            The index of each added object in the map
+        """
+        return self._append(self._class_indices(classes),
+                            np.asarray(extents, dtype=float).reshape(-1, 3),
+                            np.asarray(centroids, dtype=float).reshape(-1, 3))
+
+    def clear(self):
+        """Removes every object from the map"""
+        self.class_list = []
+        self._class_ids = {}
+        self._centroids = np.zeros((0, 3))
+        self._extents = np.zeros((0, 3))
+        self._classes = np.zeros(0, dtype=np.int32)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._count = 0
+        self._tree = None
+
+    def merge(self, classes, extents, centroids):
+        """Merges a batch of detections into the map (see the class
+        documentation for how detections are matched & merged)
+
+        Parameters
+        ----------
+        classes :
+            List of the class name of each detection
+
+        extents :
+            Array of detection extents with shape (M, 3)
+
+        centroids :
+            Array of detection centroids with shape (M, 3)
+
+        Returns
+        -------
+        ndarray
+            The index of the object each detection was merged into (or added
+            as)
+        """
+        class_ids = self._class_indices(classes)
+        extents = np.asarray(extents, dtype=float).reshape(-1, 3)
+        centroids = np.asarray(centroids, dtype=float).reshape(-1, 3)
+        out = np.full(len(class_ids), -1, dtype=np.int64)
+
+        n = len(self)
+        if n and len(class_ids):
+            q, o = self._candidates(extents, centroids)
+            iou = box_iou(extents[q], centroids[q], self._extents[o],
+                          self._centroids[o])
+            ok = (iou >= self.merge_iou) & (iou > 0)
+            if self.match_class:
+                ok &= class_ids[q] == self._classes[o]
+            q, o, iou = q[ok], o[ok], iou[ok]
+
+            # Keep each detection's best match, & fold every detection into
+            # the running mean of its object
+            order = np.lexsort((-iou, q))
+            q, o = q[order], o[order]
+            first = np.ones(len(q), dtype=bool)
+            np.not_equal(q[1:], q[:-1], out=first[1:])
+            q, o = q[first], o[first]
+            out[q] = o
+            merged = np.bincount(o, minlength=n)
+            m = np.flatnonzero(merged)
+            total = (self._counts[m] + merged[m])[:, None]
+            for a, values in ((self._centroids, centroids),
+                              (self._extents, extents)):
+                a[m] = (a[m] * self._counts[m, None] +
+                        _bincount_rows(o, values[q], n)[m]) / total
+            self._counts[m] += merged[m]
+            if len(m):
+                self._tree = None
+
+        new = out < 0
+        out[new] = self._append(class_ids[new], extents[new], centroids[new])
+        return out
+
+    def merge_objects(self, objects):
+        """Merges a list of detected objects (dicts with 'class', 'extent',
+        & 'centroid') into the map (see 'merge()')
+        """
+        return self.merge(*self._unpack_objects(objects))
+
+    def nearest(self, points, k=1, max_distance=np.inf):
+        """Finds the objects with centroids nearest to each point
+
+        Parameters
+        ----------
+        points :
+            Array of points with shape (M, 3)
+
+        k :
+            Number of nearest objects found for each point
+
+        max_distance :
+            Objects further than this are not returned
+
+        Returns
+        -------
+        tuple
+            The distances & object indices (-1 where no object was found),
+            each with shape (M, k) (or (M, ) if 'k' is 1)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        shape = (len(points), ) + ((k, ) if k > 1 else ())
+        if not len(self):
+            return np.full(shape, np.inf), np.full(shape, -1, dtype=np.int64)
+        d, i = self._index()[0].query(points,
+                                      k=k,
+                                      distance_upper_bound=max_distance)
+        i = np.where(i < len(self), i, -1)
+        return d.reshape(shape), i.reshape(shape)
+
+    def overlapping(self, extent, centroid, min_iou=0.0):
+        """Finds the objects whose boxes overlap a box
+
+        Parameters
+        ----------
+        extent :
+            Extent (length, width, height) of the box
+
+        centroid :
+            Centroid of the box
+
+        min_iou :
+            Minimum IoU with the box (any overlap at all if 0)
+
+        Returns
+        -------
+        ndarray
+            Indices of the overlapping objects, in increasing order
+        """
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        extent = np.asarray(extent, dtype=float).reshape(1, 3)
+        centroid = np.asarray(centroid, dtype=float).reshape(1, 3)
+        o = np.sort(self._candidates(extent, centroid)[1])
+        iou = box_iou(extent, centroid, self._extents[o], self._centroids[o])
+        return o[(iou > 0) & (iou >= min_iou)]
+
+    def remove(self, indices):
+        """Removes objects from the map (indices of the remaining objects
+        shift down to fill the gaps)
+        """
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(indices, dtype=np.int64)] = False
+        n = int(keep.sum())
+        for a in (self._centroids, self._extents, self._classes,
+                  self._counts):
+            a[:n] = a[:len(self)][keep]
+        self._count = n
+        self._tree = None
+
+    def to_list(self):
+        """Returns the objects in the map as a list of dicts with 'class',
+        'extent', & 'centroid' (e.g. for results, or
+        'extras.vis_semantic_map3d()')
+        """
+        return list(self)
+
+    def within_radius(self, point, radius):
+        """Finds the objects with centroids within 'radius' of a point
+
+        Returns
+        -------
+        ndarray
+            Indices of the objects, in increasing order
+        """
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        return np.array(sorted(self._index()[0].query_ball_point(
+            np.asarray(point, dtype=float), radius)),
+                        dtype=np.int64)
+
+
+class VoxelMap(object):
+    """Incremental, sparse 3D occupancy map, which fuses streamed
+    observations in place rather than rebuilding a map every step.
+
+    Voxels are stored in a NumPy-backed hash table keyed by voxel
+    coordinates, so only observed space costs memory. Each voxel holds the
+    log-odds of being occupied: voxels containing observed points are
+    updated as hits, & (with 'raycast' enabled) voxels along each ray from
+    the sensor to the point are updated as misses. Each voxel is updated at
+    most once per integrated frame.
+
+    With 'max_voxels' set, the least recently updated voxels are evicted
+    whenever the map grows beyond the limit (down to 90% of the limit),
+    bounding its memory use.
+
+    Parameters
+    ----------
+    resolution :
+        Edge length of each voxel in metres
+
+    max_voxels :
+        Maximum number of voxels kept in the map (unbounded if None)
+
+    max_range :
+        Points further than this many metres from the sensor are ignored
+        (unbounded if None)
+
+    raycast :
+        Whether free space along each ray is updated
+
+    occupied_threshold :
+        Log-odds above which a voxel is considered occupied
+    """
+    def __init__(self,
+                 resolution=DEFAULT_RESOLUTION,
+                 max_voxels=None,
+                 max_range=None,
+                 raycast=True,
+                 occupied_threshold=0.0):
+        self.resolution = resolution
+        self.max_voxels = max_voxels
+        self.max_range = max_range
+        self.raycast = raycast
+        self.occupied_threshold = occupied_threshold
+        self.clear()
+
+    def __len__(self):
+        return self._index.count
+
+    def _coords(self, points):
+        # Returns the voxel coordinates of each point, & which are within the
+        # range of voxel keys
+        coords = np.floor(points / self.resolution).astype(np.int64)
+        return coords, np.all(np.abs(coords) < _KEY_BIAS, axis=1)
+
+    def _evict(self):
+        # Keeps the most recently updated voxels, then rebuilds the table
+        used = np.flatnonzero(self._index.keys != _EMPTY)
+        keep = used[np.argsort(-self._updated[used], kind='stable')
+                    [:int(self.max_voxels * _EVICT_FRACTION)]]
+        self._rebuild(self._index.keys[keep], self._log_odds[keep],
+                      self._updated[keep], len(self._index.keys))
+
+    def _free_keys(self, origin, points):
+        # Samples every ray from the origin to its point at the voxel
+        # resolution (excluding the point itself), in bounded chunks. The
+        # origin & points must be within the range of voxel keys, so the
+        # samples between them are too.
+        o = origin / self.resolution
+        d = (points - origin) / self.resolution
+        n = np.floor(np.linalg.norm(d, axis=1)).astype(np.int64)
+        inc = d / np.maximum(n, 1)[:, None]
+        keys = []
+        starts = np.concatenate([[0], np.cumsum(n)])
+        i = 0
+        while i < len(points):
+            j = max(np.searchsorted(starts, starts[i] + _MAX_RAY_SAMPLES) - 1,
+                    i + 1)
+            counts = n[i:j]
+            total = int(counts.sum())
+            if total:
+                ray = np.repeat(np.arange(i, j), counts)
+                step = np.arange(total, dtype=float)
+                step -= np.repeat(starts[i:j] - starts[i], counts)
+                samples = inc[ray]
+                samples *= step[:, None]
+                samples += o
+                keys.append(
+                    _unique(_pack(np.floor(samples).astype(np.int64))))
+            i = j
+        return _unique(np.concatenate(keys)) if keys else np.empty(
+            0, dtype=np.int64)
+
+    def _rebuild(self, keys, log_odds, updated, capacity):
+        self._index = _VoxelIndex(capacity)
+        self._log_odds = np.zeros(capacity, dtype=np.float32)
+        self._updated = np.zeros(capacity, dtype=np.int32)
+        slots = self._index.lookup(keys, insert=True)
+        self._log_odds[slots] = log_odds
+        self._updated[slots] = updated
+
+    def _reserve(self, n):
+        capacity = len(self._index.keys)
+        while (self._index.count + n) > capacity * _MAX_LOAD:
+            capacity *= 2
+        if capacity != len(self._index.keys):
+            used = self._index.keys != _EMPTY
+            self._rebuild(self._index.keys[used], self._log_odds[used],
+                          self._updated[used], capacity)
+
+    def _update(self, keys, delta):
+        self._reserve(len(keys))
+        slots = self._index.lookup(keys, insert=True)
+        self._log_odds[slots] = np.clip(self._log_odds[slots] + delta,
+                                        *LOG_ODDS_LIMITS)
+        self._updated[slots] = self.frames
+
+    def clear(self):
+        """Removes every voxel from the map"""
+        self.frames = 0
+        self._rebuild(np.empty(0, dtype=np.int64), 0, 0, _INITIAL_CAPACITY)
+
+    def integrate(self, observations, depth_stride=4):
+        """Integrates a set of observations returned by 'BenchBot.step()',
+        using 'image_depth' (with 'image_depth_info') if available, & the
+        'laser' otherwise
+
+        Parameters
+        ----------
+        observations :
+            The observations, which must include 'poses'
+
+        depth_stride :
+            Only every 'depth_stride'-th pixel along each axis of the depth
+            image is integrated
+        """
+        if 'image_depth' in observations and 'image_depth_info' in observations:
+            info = observations['image_depth_info']
+            self.integrate_depth(observations['image_depth'], info,
+                                 observations['poses'], info['frame_id'],
+                                 stride=depth_stride)
+        elif 'laser' in observations:
+            self.integrate_laser(observations['laser'], observations['poses'])
+        else:
+            raise ValueError(
+                "Observations have no 'image_depth' (with 'image_depth_info') "
+                "or 'laser' to integrate")
+
+    def integrate_depth(self,
+                        depth,
+                        intrinsics,
+                        poses,
+                        frame,
+                        optical=True,
+                        stride=1):
+        """Integrates a depth image, taken from camera frame 'frame' (see
+        'geometry.depth_to_map_points()' for details of the arguments)
+
+        Parameters
+        ----------
+        stride :
+            Only every 'stride'-th pixel along each axis is integrated
+        """
+        tree = poses if isinstance(poses, FrameTree) else FrameTree(poses)
+        depth = np.asarray(depth)[::stride, ::stride]
+        valid = np.isfinite(depth) & (depth > 0)
+        if self.max_range is not None:
+            valid &= depth <= self.max_range
+        k = geometry._intrinsics_matrix(intrinsics).copy()
+        k[:2] /= stride
+        points = geometry.depth_to_map_points(depth, k, tree, frame,
+                                              optical=optical)
+        self.integrate_points(points[valid],
+                              tree.matrix(frame)[:3, 3])
+
+    def integrate_laser(self, laser, poses, frame='robot'):
+        """Integrates the valid scans of a laser, from frame 'frame' (see
+        'geometry.laser_to_map_points()' for details of the arguments)
+        """
+        tree = poses if isinstance(poses, FrameTree) else FrameTree(poses)
+        points = geometry.laser_to_map_points(laser, tree, frame,
+                                              valid_only=True)
+        self.integrate_points(points, tree.matrix(frame)[:3, 3])
+
+    def integrate_points(self, points, origin):
+        """Integrates points (in the map frame) observed by a sensor at
+        'origin'
+
+        Parameters
+        ----------
+        points :
+            Array of points with shape (N, 3)
+
+        origin :
+            Position of the sensor in the map frame
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        origin = np.asarray(origin, dtype=float)
+        if self.max_range is not None:
+            points = points[np.linalg.norm(points - origin, axis=1) <=
+                            self.max_range]
+        coords, inside = self._coords(points)
+        self.frames += 1
+
+        hits = _unique(_pack(coords[inside]))
+        if (self.raycast and len(hits)
+                and np.all(np.abs(origin / self.resolution) < _KEY_BIAS - 1)):
+            misses = self._free_keys(origin, points[inside])
+            i = np.minimum(np.searchsorted(hits, misses), len(hits) - 1)
+            self._update(misses[hits[i] != misses], LOG_ODDS_MISS)
+        self._update(hits, LOG_ODDS_HIT)
+
+        if self.max_voxels is not None and len(self) > self.max_voxels:
+            self._evict()
+
+    def log_odds(self, points):
+        """Returns the log-odds of the voxel containing each point (NaN for
+        voxels that have never been observed)
+
+        Parameters
+        ----------
+        points :
+            Array of points with shape (N, 3)
+        """
+        coords, inside = self._coords(
+            np.asarray(points, dtype=float).reshape(-1, 3))
+        out = np.full(len(coords), np.nan, dtype=np.float32)
+        unique, inverse = _unique(_pack(coords[inside]), return_inverse=True)
+        slots = self._index.lookup(unique)[inverse]
+        out[np.flatnonzero(inside)[slots >= 0]] = self._log_odds[slots[
+            slots >= 0]]
+        return out
+
+    def occupied(self):
+        """Returns the centres of all occupied voxels, as an array with shape
+        (M, 3)
+        """
+        centres, log_odds = self.voxels()
+        return centres[log_odds > self.occupied_threshold]
+
+    def voxels(self):
+        """Returns every voxel in the map
+
+        Returns
+        -------
+        tuple
+            The voxel centres with shape (M, 3), & their log-odds with shape
+            (M,)
+        """
+        used = np.flatnonzero(self._index.keys != _EMPTY)
+        return ((_unpack(self._index.keys[used]) + 0.5) * self.resolution,
+                self._log_odds[used].copy())
@@ -0,0 +1,351 @@
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import threading
+
+# Maximum number of distinct frame layouts shared between PoseSets
+_MAX_POSE_LAYOUTS = 64
+
+
+class _Loader(object):
+    """Memoised, thread-safe wrapper around a function producing the value
+    of an observation
+    """
+    __slots__ = ['_fn', '_lock', '_value']
+
+    _UNSET = object()
+
+    def __init__(self, fn):
+        self._fn = fn
+        self._lock = threading.Lock()
+        self._value = _Loader._UNSET
+
+    def __call__(self):
+        if self._value is _Loader._UNSET:
+            with self._lock:
+                if self._value is _Loader._UNSET:
+                    self._value = self._fn()
+                    self._fn = None
+        return self._value
+
+
+class LazyObservations(dict):
+    """A dict of observations, where the value of each observation is only
+    produced when it is first accessed (& then memoised). Values can be
+    provided directly, or as a loader via 'LazyObservations.loader()'.
+
+    It is a fully functional dict, so existing agents work unchanged: every
+    access (indexing, 'get()', 'items()', 'values()', iteration, copying,
+    comparison, pickling, etc.) sees the loaded values.
+    """
+    def __init__(self, *args, **kwargs):
+        super(LazyObservations, self).__init__()
+        self.update(*args, **kwargs)
+
+    @staticmethod
+    def loader(fn):
+        """Wraps a function taking no arguments, so its return value becomes
+        the value of an observation when the observation is first accessed
+        (e.g. 'LazyObservations(image_rgb=LazyObservations.loader(fn))')
+        """
+        return _Loader(fn)
+
+    def _load(self, key, value):
+        if isinstance(value, _Loader):
+            value = value()
+            super(LazyObservations, self).__setitem__(key, value)
+        return value
+
+    @staticmethod
+    def _resolve(value):
+        return value() if isinstance(value, _Loader) else value
+
+    def is_loaded(self, key):
+        """Returns whether the value of observation 'key' has been produced"""
+        return not isinstance(
+            super(LazyObservations, self).__getitem__(key), _Loader)
+
+    def __getitem__(self, key):
+        return self._load(key,
+                          super(LazyObservations, self).__getitem__(key))
+
+    def __iter__(self):
+        # Overridden so dict(x) & {**x} don't copy raw loaders
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __reduce__(self):
+        return (dict, (dict(self.items()), ))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self.items()))
+
+    def copy(self):
+        return LazyObservations(
+            super(LazyObservations, self).items())
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def pop(self, key, *default):
+        return LazyObservations._resolve(
+            super(LazyObservations, self).pop(key, *default))
+
+    def popitem(self):
+        k, v = super(LazyObservations, self).popitem()
+        return k, LazyObservations._resolve(v)
+
+    def prefetch(self, *keys):
+        """Produces the values of observations 'keys' (or all observations if
+        none are given) now rather than on first access. Values still to be
+        produced are produced concurrently.
+
+        Returns
+        -------
+        LazyObservations
+            This dict, for chaining (e.g. 'observations.prefetch('poses')')
+        """
+        pending = [k for k in (keys if keys else self.keys())
+                   if not self.is_loaded(k)]
+        if len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                list(executor.map(self.__getitem__, pending))
+        elif pending:
+            self[pending[0]]
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+
+class _SlotsMapping(Mapping):
+    """Read-only dict-style access to the fields (i.e. '__slots__') of an
+    observation type, so it can stand in for the dict it replaces
+    """
+    __slots__ = []
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __getstate__(self):
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def __setstate__(self, state):
+        for k, v in zip(self.__slots__, state):
+            setattr(self, k, v)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+            '%s=%r' % (k, getattr(self, k)) for k in self.__slots__))
+
+    def to_dict(self):
+        """Returns the observation as the plain dict it replaces"""
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class LaserScan(_SlotsMapping):
+    """Compact form of a 'laser' observation, with the same keys as the dict
+    it replaces ('range_max', 'range_min', & 'scans')
+    """
+    __slots__ = ['range_max', 'range_min', 'scans']
+
+    def __init__(self, range_max, range_min, scans):
+        self.range_max = range_max
+        self.range_min = range_min
+        self.scans = scans
+
+    @classmethod
+    def from_dict(cls, data):
+        """Creates a LaserScan from a 'laser' observation dict, raising a
+        ValueError if it does not have exactly the expected keys
+        """
+        if not isinstance(data, Mapping) or set(data) != set(cls.__slots__):
+            raise ValueError("Cannot create a %s from: %r" %
+                             (cls.__name__, data))
+        return cls(**data)
+
+
+class Pose(_SlotsMapping):
+    """Compact form of a single frame's pose, with the same keys as the dict
+    it replaces ('parent_frame', 'translation_xyz', 'rotation_rpy', &
+    'rotation_xyzw')
+    """
+    __slots__ = [
+        'parent_frame', 'translation_xyz', 'rotation_rpy', 'rotation_xyzw'
+    ]
+
+    def __init__(self, parent_frame, translation_xyz, rotation_rpy,
+                 rotation_xyzw):
+        self.parent_frame = parent_frame
+        self.translation_xyz = translation_xyz
+        self.rotation_rpy = rotation_rpy
+        self.rotation_xyzw = rotation_xyzw
+
+
+class _PoseLayout(object):
+    """Frame names, their index, & their parents, shared by every PoseSet
+    with the same frames
+    """
+    __slots__ = ['frames', 'index', 'parent_frames']
+
+    _cache = {}
+
+    def __init__(self, frames, parent_frames):
+        self.frames = frames
+        self.index = {f: i for i, f in enumerate(frames)}
+        self.parent_frames = parent_frames
+
+    @classmethod
+    def get(cls, frames, parent_frames):
+        key = (frames, parent_frames)
+        layout = cls._cache.get(key, None)
+        if layout is None:
+            layout = cls(frames, parent_frames)
+            if len(cls._cache) < _MAX_POSE_LAYOUTS:
+                cls._cache[key] = layout
+        return layout
+
+
+class PoseSet(Mapping):
+    """Compact form of a 'poses' observation, which stores the pose of every
+    frame in a single contiguous array rather than a dict of dicts. Frame
+    names & parents are shared between every PoseSet with the same frames,
+    so storing long histories of poses costs little more than the array.
+
+    It behaves like the read-only dict it replaces: 'poses['robot']' returns
+    a 'Pose' whose arrays are views of the rows of 'translation_xyz'
+    (N, 3), 'rotation_rpy' (N, 3), & 'rotation_xyzw' (N, 4), in the order of
+    'frames'. Use 'to_dict()' for a plain mutable dict.
+    """
+    __slots__ = ['_data', '_layout']
+
+    def __init__(self, frames, parent_frames, translation_xyz, rotation_rpy,
+                 rotation_xyzw):
+        self._layout = _PoseLayout.get(tuple(frames), tuple(parent_frames))
+        self._data = np.empty((len(self._layout.frames), 10))
+        self._data[:, 0:3] = np.reshape(translation_xyz, (-1, 3))
+        self._data[:, 3:6] = np.reshape(rotation_rpy, (-1, 3))
+        self._data[:, 6:10] = np.reshape(rotation_xyzw, (-1, 4))
+
+    @classmethod
+    def from_dict(cls, poses):
+        """Creates a PoseSet from a 'poses' observation dict, raising a
+        ValueError if any frame does not have exactly the keys of a 'Pose'
+        """
+        if not isinstance(poses, Mapping) or not all(
+                isinstance(p, Mapping) and set(p) == set(Pose.__slots__)
+                for p in poses.values()):
+            raise ValueError("Cannot create a %s from: %r" %
+                             (cls.__name__, poses))
+        ps = poses.values()
+        return cls(poses.keys(), [p['parent_frame'] for p in ps],
+                   [p['translation_xyz'] for p in ps],
+                   [p['rotation_rpy'] for p in ps],
+                   [p['rotation_xyzw'] for p in ps])
+
+    @property
+    def frames(self):
+        """The tuple of frame names, in the order of the array rows"""
+        return self._layout.frames
+
+    @property
+    def parent_frames(self):
+        """The tuple of each frame's parent frame name"""
+        return self._layout.parent_frames
+
+    @property
+    def rotation_rpy(self):
+        """The (N, 3) array of each frame's roll, pitch, & yaw"""
+        return self._data[:, 3:6]
+
+    @property
+    def rotation_xyzw(self):
+        """The (N, 4) array of each frame's rotation quaternion"""
+        return self._data[:, 6:10]
+
+    @property
+    def translation_xyz(self):
+        """The (N, 3) array of each frame's translation"""
+        return self._data[:, 0:3]
+
+    def __getitem__(self, frame):
+        i = self._layout.index[frame]
+        row = self._data[i]
+        return Pose(self._layout.parent_frames[i], row[0:3], row[3:6],
+                    row[6:10])
+
+    def __iter__(self):
+        return iter(self._layout.frames)
+
+    def __len__(self):
+        return len(self._layout.frames)
+
+    def __contains__(self, frame):
+        return frame in self._layout.index
+
+    def __getstate__(self):
+        return (self.frames, self.parent_frames, self.translation_xyz,
+                self.rotation_rpy, self.rotation_xyzw)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.to_dict())
+
+    def to_dict(self):
+        """Returns the poses as the plain dict of dicts it replaces"""
+        return {f: self[f].to_dict() for f in self._layout.frames}
+
+
+# Compact observation types, by the observation channel they replace
+COMPACT_TYPES = {'laser': LaserScan, 'poses': PoseSet}
+
+
+def compact_observation(name, data):
+    """Returns the compact form of the data for observation channel 'name'
+    (see 'COMPACT_TYPES'), or the data unchanged if there is none
+
+    Parameters
+    ----------
+    name :
+        The name of the observation channel (e.g. 'poses')
+
+    data :
+        The decoded data from the observation channel
+    """
+    t = COMPACT_TYPES.get(name, None)
+    if t is None:
+        return data
+    try:
+        return t.from_dict(data)
+    except ValueError:
+        return data
@@ -0,0 +1,126 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import queue
+import threading
+
+from .observations import LazyObservations
+
+
+class StepPipeline(object):
+    """Runs 'BenchBot.step()' calls on a background worker, overlapping
+    communication with the Supervisor & observation decoding with the
+    agent's own computation.
+
+    Steps are submitted with 'submit()', which returns a Future resolving to
+    the usual (observations, action_result) tuple. The pipeline guarantees:
+
+    - steps are performed strictly in the order they were submitted, by a
+      single worker;
+    - all raw observation data for a step is fetched as soon as its action
+      completes, & before the next submitted action is sent, so observations
+      always describe the state directly after their own action;
+    - at most 'max_pending' steps are queued at once ('submit()' blocks
+      until there is room);
+    - if a step fails, every step queued behind it is cancelled rather than
+      acting on a state the agent never observed.
+
+    Decoding (the API-side connection callbacks) runs in a separate pool, one
+    task per channel, & starts as soon as the raw data arrives. The returned
+    observations are a 'LazyObservations' dict, so accessing a channel only
+    waits on that channel's decoding while the rest continue in the
+    background.
+
+    Parameters
+    ----------
+    benchbot :
+        The started BenchBot instance to perform steps with
+
+    max_pending :
+        Maximum number of submitted steps waiting to be performed
+
+    decode_workers :
+        Number of threads used for decoding observations (defaults to one
+        per observation channel)
+    """
+    def __init__(self, benchbot, max_pending=1, decode_workers=None):
+        self.benchbot = benchbot
+        self._requests = queue.Queue(maxsize=max_pending)
+        if decode_workers is None:
+            decode_workers = max(len(benchbot.observations), 1)
+        self._decoder = ThreadPoolExecutor(max_workers=decode_workers)
+        self._worker = threading.Thread(target=self._work)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _cancel_pending(self):
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request[0].cancel()
+            else:
+                self._requests.put(None)
+                return
+
+    def _step(self, action, action_kwargs):
+        bb = self.benchbot
+        if action is not None:
+            bb._perform_action(action, action_kwargs)
+
+        # Grab all of the raw data straight away, then hand decoding off
+        observations = bb.observations
+        n = len(bb._STATE_QUERIES)
+        resps = bb._query_batch(
+            bb._STATE_QUERIES +
+            [(o, bb.RouteType.CONNECTION) for o in observations])
+        action_result, scene_number = bb._process_state(resps[:n])
+        lazy_os = LazyObservations({
+            o: LazyObservations.loader(
+                self._decoder.submit(bb._decode_observation, o, r).result)
+            for o, r in zip(observations, resps[n:])
+        })
+        lazy_os.update({'scene_number': scene_number})
+        return bb._record_step(action, action_kwargs, lazy_os, action_result)
+
+    def _work(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            future, action, action_kwargs = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._step(action, action_kwargs))
+            except BaseException as e:
+                self._cancel_pending()
+                future.set_exception(e)
+
+    def close(self):
+        """Waits for all submitted steps to be performed, then stops the
+        worker & decoding threads
+        """
+        self._requests.put(None)
+        self._worker.join()
+        self._decoder.shutdown()
+
+    def submit(self, action, **action_kwargs):
+        """Submits a step to be performed by the background worker (see
+        'BenchBot.step()' for details of the arguments)
+
+        Returns
+        -------
+        Future
+            Resolves to a tuple of the observations & action result after the
+            action has finished
+        """
+        future = Future()
+        self._requests.put((future, action, action_kwargs))
+        return future
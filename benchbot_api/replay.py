@@ -0,0 +1,301 @@
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import jsonpickle
+import jsonpickle.ext.numpy as jet
+import numpy as np
+import os
+
+from . import wire
+from .benchbot import ActionResult, BenchBot
+from .observations import LazyObservations, compact_observation
+
+jet.register_handlers()
+
+DEFAULT_CHUNK_SIZE = 256 * 1024 * 1024
+
+META_FILENAME = 'meta.json'
+STEPS_FILENAME = 'steps.jsonl'
+CHUNK_FILENAME = 'arrays_%05d.bin'
+CHUNK_GLOB = 'arrays_*.bin'
+
+
+class Recorder(object):
+    """Records every step a BenchBot instance takes to disk, so it can be
+    replayed later with 'ReplayBenchBot'. Pass an instance to BenchBot with
+    its 'recorder' argument.
+
+    A recording is a directory containing:
+
+    - 'meta.json': static configuration captured at the first step;
+    - 'steps.jsonl': one line per step (action, action arguments, action
+      result, available actions, & observations with arrays replaced by
+      placeholders), only ever appended to;
+    - 'arrays_NNNNN.bin': chunks of raw array data, only ever appended to,
+      where a new chunk is started once the current one exceeds
+      'chunk_size' bytes.
+
+    Recording into an existing directory appends to it.
+
+    Steps are written to disk by a background thread, so recording doesn't
+    hold up the agent. Lazy observations are fetched & decoded by that
+    thread too (sharing the result with the agent if it reads the same
+    observation). BenchBot waits for pending steps to be written before the
+    robot state changes; 'flush()' waits for them explicitly. Agents should
+    not modify observation arrays in place before then, as the modified
+    arrays would be recorded.
+
+    Parameters
+    ----------
+    path :
+        Directory to write the recording to
+
+    chunk_size :
+        Size in bytes after which a new array chunk is started
+    """
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self._chunk = max(len(glob.glob(os.path.join(path, CHUNK_GLOB))) - 1,
+                          0)
+        self._chunk_file = None
+        self._steps_file = open(os.path.join(path, STEPS_FILENAME), 'a')
+        self._meta_written = os.path.exists(os.path.join(path, META_FILENAME))
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = []
+
+    def _open_chunk(self):
+        if self._chunk_file is None:
+            self._chunk_file = open(
+                os.path.join(self.path, CHUNK_FILENAME % self._chunk), 'ab')
+        elif self._chunk_file.tell() >= self.chunk_size:
+            self._chunk_file.close()
+            self._chunk += 1
+            self._chunk_file = open(
+                os.path.join(self.path, CHUNK_FILENAME % self._chunk), 'ab')
+        return self._chunk_file
+
+    def _write_step(self, action, action_kwargs, observations, action_result,
+                    actions):
+        if isinstance(observations, LazyObservations):
+            observations.prefetch()
+        f = self._open_chunk()
+        buffers = []
+        stripped, _ = wire.strip_arrays(dict(observations.items()), buffers,
+                                        f.tell())
+        for p in wire.buffer_parts(buffers):
+            f.write(p)
+        f.flush()
+
+        self._steps_file.write(
+            jsonpickle.encode({
+                'action': action,
+                'action_kwargs': action_kwargs,
+                'action_result': action_result.name,
+                'actions': actions,
+                'chunk': self._chunk,
+                'observations': stripped
+            }) + '\n')
+        self._steps_file.flush()
+
+    def close(self):
+        """Writes any pending steps, then closes all files in the recording
+        """
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+            self._steps_file.close()
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+
+    def flush(self):
+        """Waits until every recorded step has been written to disk,
+        raising any error encountered while writing them
+        """
+        pending, self._pending = self._pending, []
+        for p in pending:
+            p.result()
+
+    def record_meta(self, benchbot):
+        """Records the static configuration of a BenchBot instance (called
+        automatically before the first step is recorded)
+        """
+        with open(os.path.join(self.path, META_FILENAME), 'w') as f:
+            f.write(
+                jsonpickle.encode({
+                    'config': benchbot.config,
+                    'empty_results': benchbot.empty_results(),
+                    'observations': benchbot.observations,
+                    'results_functions': list(benchbot.results_functions())
+                }))
+        self._meta_written = True
+
+    def record_step(self, benchbot, action, action_kwargs, observations,
+                    action_result):
+        """Queues a step taken by 'benchbot' to be appended to the
+        recording (observations aren't read until the step is written)
+        """
+        if not self._meta_written:
+            self.record_meta(benchbot)
+        actions = benchbot._step_actions
+        if not isinstance(observations, LazyObservations):
+            observations = dict(observations)
+        self._pending.append(
+            self._executor.submit(self._write_step, action, action_kwargs,
+                                  observations, action_result,
+                                  None if actions is None else list(actions)))
+
+
+class ReplayBenchBot(BenchBot):
+    """Drop-in replacement for BenchBot which replays a recording made with
+    'Recorder', without any Supervisor or robot. Agents can then be profiled
+    & regression tested at full speed.
+
+    Steps are replayed in the order they were recorded, with 'reset()'
+    replaying the next recorded reset, & 'next_scene()' reporting whether
+    any recorded steps remain. Array data is memory-mapped from the
+    recording, so arrays are only read from disk when they are used.
+    Memory maps are copy-on-write: agents can modify replayed arrays without
+    affecting the recording.
+
+    Parameters
+    ----------
+    path :
+        Directory containing the recording
+
+    agent :
+        An instance of an 'Agent' to be used by 'ReplayBenchBot.run()'
+
+    strict :
+        Whether requesting a different action to the one recorded should
+        raise a ValueError (otherwise the recorded step is returned anyway)
+
+    **benchbot_kwargs
+        Any other arguments supported by BenchBot (e.g. 'result_location')
+    """
+    def __init__(self, path, agent=None, strict=True, **benchbot_kwargs):
+        self.path = path
+        self.strict = strict
+        with open(os.path.join(path, META_FILENAME), 'r') as f:
+            self._meta = jsonpickle.decode(f.read())
+        self._chunks = {}
+        self._cursor = 0
+        self._steps_file = open(os.path.join(path, STEPS_FILENAME), 'rb')
+        self._step_offsets = []
+        super(ReplayBenchBot, self).__init__(agent=agent,
+                                             auto_start=False,
+                                             **benchbot_kwargs)
+        self.start()
+
+    def _chunk_data(self, chunk):
+        if chunk not in self._chunks:
+            f = os.path.join(self.path, CHUNK_FILENAME % chunk)
+            self._chunks[chunk] = (np.memmap(f, mode='c')
+                                   if os.path.getsize(f) else bytearray())
+        return self._chunks[chunk]
+
+    def _next_record(self):
+        # Only the line offsets are kept in memory; records are read on
+        # demand. A partial final line (e.g. after a crash) is ignored.
+        if self._cursor >= len(self._step_offsets):
+            return None
+        self._steps_file.seek(self._step_offsets[self._cursor])
+        self._cursor += 1
+        return jsonpickle.decode(self._steps_file.readline().decode('utf-8'))
+
+    def _peek_record(self):
+        r = self._next_record()
+        if r is not None:
+            self._cursor -= 1
+        return r
+
+    @property
+    def actions(self):
+        return [] if self._step_actions is None else list(self._step_actions)
+
+    @property
+    def config(self):
+        return self._meta['config']
+
+    @property
+    def observations(self):
+        return list(self._meta['observations'])
+
+    def _reset_if_dirty(self):
+        # Resets in a recording are replayed by the step that follows them
+        pass
+
+    def close(self):
+        super(ReplayBenchBot, self).close()
+        self._steps_file.close()
+        self._chunks.clear()
+
+    def empty_results(self):
+        return jsonpickle.decode(
+            jsonpickle.encode(self._meta['empty_results']))
+
+    def next_scene(self):
+        r = self._peek_record()
+        return r is not None and r['action'] is None
+
+    def results_functions(self):
+        def unavailable(name):
+            def fn(*args, **kwargs):
+                raise RuntimeError(
+                    "Results function '%s' requires a running BenchBot "
+                    "supervisor, so is unavailable in a replay" % name)
+
+            return fn
+
+        return {r: unavailable(r) for r in self._meta['results_functions']}
+
+    def run(self, agent=None, pipelined=False):
+        # There is no communication to overlap in a replay, so it is never
+        # pipelined
+        return super(ReplayBenchBot, self).run(agent)
+
+    def start(self):
+        self._steps_file.seek(0)
+        self._step_offsets = []
+        offset = 0
+        for line in iter(self._steps_file.readline, b''):
+            if line.endswith(b'\n'):
+                self._step_offsets.append(offset)
+            offset = self._steps_file.tell()
+        self._cursor = 0
+
+    def step(self, action, **action_kwargs):
+        r = self._next_record()
+
+        # Repeated resets (e.g. by 'start()' then 'run()') are collapsed into
+        # the last one
+        while action is None and r is not None and r['action'] is None:
+            n = self._peek_record()
+            if n is None or n['action'] is not None:
+                break
+            r = self._next_record()
+
+        if r is None:
+            raise RuntimeError("Reached the end of the recording in '%s'" %
+                               self.path)
+        if self.strict and (r['action'] != action
+                            or (action is not None
+                                and r['action_kwargs'] != action_kwargs)):
+            self._cursor -= 1
+            raise ValueError(
+                "Action '%s' with args %s does not match the recorded action "
+                "'%s' with args %s (step %d of '%s')" %
+                (action, action_kwargs, r['action'], r['action_kwargs'],
+                 self._cursor, self.path))
+        self._step_actions = r['actions']
+        observations = wire.restore_arrays(r['observations'],
+                                           self._chunk_data(r['chunk']))
+        if self.compact_observations:
+            observations = {
+                k: compact_observation(k, v)
+                for k, v in observations.items()
+            }
+        return observations, ActionResult[r['action_result']]
@@ -0,0 +1,305 @@
+import json
+import os
+import queue
+import threading
+
+# Maximum number of chunks waiting to be written before 'write_chunk()' blocks
+DEFAULT_MAX_PENDING = 4
+
+# Suffix of the file chunks are streamed to before finalisation
+PARTIAL_SUFFIX = '.partial'
+
+
+def _write_items(f, items, first=True):
+    # Writes a list of JSON items as comma separated list elements (with a
+    # single encoding call), returning whether the next item is still the
+    # first
+    if not items:
+        return first
+    if not first:
+        f.write(', ')
+    f.write(json.dumps(items)[1:-1])
+    return False
+
+
+class ResultsBatch(object):
+    """Queues calls to the functions of the current results format, which
+    are then sent to the Supervisor all at once by 'send()' (see
+    'BenchBot.call_results_functions()'). Create one with
+    'BenchBot.results_batch()'.
+
+    Functions are accessed by name, as in the dict returned by
+    'BenchBot.results_functions()', but calling them only queues the call &
+    returns its position in the batch:
+        batch = benchbot.results_batch()
+        for d in detections:
+            batch['create_object'](centroid=d['centroid'])
+        objects = batch.send()
+
+    Parameters
+    ----------
+    benchbot :
+        The BenchBot instance calls are sent through
+    """
+    def __init__(self, benchbot):
+        self.benchbot = benchbot
+        self.calls = []
+        self._names = set(benchbot.results_functions())
+
+    def __getitem__(self, name):
+        if name not in self._names:
+            raise KeyError("'%s' is not a function of the results format" %
+                           name)
+
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return len(self.calls) - 1
+
+        return queue
+
+    def __len__(self):
+        return len(self.calls)
+
+    def send(self):
+        """Sends every queued call, & clears the queue
+
+        Returns
+        -------
+        list
+            The return of each call, in the order they were queued
+        """
+        calls, self.calls = self.calls, []
+        return self.benchbot.call_results_functions(calls)
+
+
+class ResultsWriter(object):
+    """Writes results incrementally during a run (e.g. one chunk per scene),
+    rather than all at once at the end. Create one directly, or have
+    'BenchBot.run()' create one with 'stream_results=True' (see
+    'Agent.save_result_chunk()').
+
+    Each chunk appends items to lists in the results (e.g. {'objects':
+    [...]}) &/or updates results fields (e.g. {'class_list': [...]}).
+    Chunks are serialised & written by a background thread to a partial file
+    ('filename' + PARTIAL_SUFFIX) with one JSON line per chunk, so nothing
+    needs to be held in memory once written. At most 'max_pending' chunks
+    wait to be written before 'write_chunk()' blocks; chunks are never
+    dropped.
+
+    'finalise()' streams the chunks into the complete results (in the usual
+    format of a single JSON dict) in a temporary file, which then atomically
+    replaces 'filename'. If the process dies before then, the partial file
+    holds every completed chunk, & a writer created with 'resume=True'
+    continues from it (a chunk cut off part way through writing is
+    discarded).
+
+    Parameters
+    ----------
+    filename :
+        The file the final results are written to
+
+    empty_results :
+        The empty results the chunks are added to (see
+        'BenchBot.empty_results()'). When resuming, the empty results saved
+        in the partial file are used instead.
+
+    resume :
+        Whether to continue from an existing partial file, rather than
+        starting again
+
+    max_pending :
+        Maximum number of chunks waiting to be written
+    """
+    def __init__(self,
+                 filename,
+                 empty_results=None,
+                 resume=False,
+                 max_pending=DEFAULT_MAX_PENDING):
+        self.filename = filename
+        self.partial_filename = filename + PARTIAL_SUFFIX
+        self.chunks = []
+
+        d = os.path.dirname(filename)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        header = None
+        if resume and os.path.exists(self.partial_filename):
+            header = self._restore()
+            self._file = open(self.partial_filename, 'a')
+        else:
+            self._file = open(self.partial_filename, 'w')
+        if header is None:
+            self._file.write(
+                json.dumps({'header': {} if empty_results is None else
+                            empty_results}) + '\n')
+            self._file.flush()
+
+        self._error = None
+        self._finished = False
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._run)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        # Results are only finalised if everything succeeded, otherwise the
+        # partial file is kept for resuming
+        if exc_type is None:
+            self.finalise()
+        else:
+            self.close()
+
+    def _check_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _lines(self):
+        # Iterates over the parsed lines of the partial file
+        with open(self.partial_filename, 'r') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _restore(self):
+        # Loads the completed chunks from the partial file, truncating any
+        # chunk that was cut off, & returns the saved header (if any)
+        header, offset = None, 0
+        with open(self.partial_filename, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("Incomplete chunk")
+                    data = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                if 'header' in data:
+                    header = data['header']
+                else:
+                    self.chunks.append(data['chunk'])
+                offset += len(line)
+        with open(self.partial_filename, 'rb+') as f:
+            f.truncate(offset)
+        return header
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            try:
+                if chunk is None:
+                    return
+                if self._error is None:
+                    self._file.write(json.dumps(chunk) + '\n')
+                    self._file.flush()
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _stop(self):
+        if not self._finished:
+            self._finished = True
+            self._queue.put(None)
+            self._writer.join()
+            self._file.close()
+
+    def close(self):
+        """Writes any pending chunks & stops writing, without finalising the
+        results (so they can be resumed later)
+        """
+        self._stop()
+        self._check_error()
+
+    def finalise(self):
+        """Writes any pending chunks, then atomically writes the complete
+        results to 'filename' & removes the partial file
+
+        Returns
+        -------
+        string
+            The filename the results were written to
+        """
+        self._stop()
+        self._check_error()
+
+        # First pass collects everything except the appended items, which are
+        # then streamed a list at a time
+        header, updates, appended = {}, {}, []
+        for data in self._lines():
+            if 'header' in data:
+                header = data['header']
+                continue
+            updates.update(data.get('update', {}))
+            appended.extend(k for k in data.get('append', {})
+                            if k not in appended)
+        results = dict(header.get('results', {}), **updates)
+
+        tmp = self.filename + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write('{')
+            for k, v in header.items():
+                if k != 'results':
+                    f.write('%s: %s, ' % (json.dumps(k), json.dumps(v)))
+            f.write('"results": {')
+            first = True
+            for k, v in results.items():
+                if k not in appended:
+                    f.write('%s%s: %s' % ('' if first else ', ', json.dumps(k),
+                                          json.dumps(v)))
+                    first = False
+            for k in appended:
+                f.write('%s%s: [' % ('' if first else ', ', json.dumps(k)))
+                first = False
+                first_item = _write_items(f, results.get(k, []))
+                for data in self._lines():
+                    first_item = _write_items(
+                        f,
+                        data.get('append', {}).get(k, []), first_item)
+                f.write(']')
+            f.write('}}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.filename)
+        os.remove(self.partial_filename)
+        return self.filename
+
+    def flush(self):
+        """Blocks until every pending chunk has been written"""
+        self._queue.join()
+        self._check_error()
+
+    def is_complete(self, chunk_id):
+        """Returns whether a chunk with 'chunk_id' has been written (including
+        chunks restored when resuming)
+        """
+        return chunk_id in self.chunks
+
+    def write_chunk(self, chunk_id=None, append=None, update=None):
+        """Queues a chunk of results to be written in the background. The
+        chunk's data must not be modified after it is passed in.
+
+        Parameters
+        ----------
+        chunk_id :
+            Identifier of the chunk (e.g. the scene number), added to
+            'chunks' to tell which chunks are complete when resuming
+
+        append :
+            Dict of lists of items to append to each results field (e.g.
+            {'objects': [...]})
+
+        update :
+            Dict of results fields to set (later chunks override earlier
+            ones)
+        """
+        self._check_error()
+        if self._finished:
+            raise RuntimeError("Cannot write chunks with a closed "
+                               "ResultsWriter")
+        self.chunks.append(chunk_id)
+        self._queue.put({
+            'chunk': chunk_id,
+            'append': {} if append is None else append,
+            'update': {} if update is None else update
+        })
@@ -0,0 +1,160 @@
+from __future__ import print_function
+
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import time
+
+from .agent import Agent
+from .benchbot import BenchBot, RESULT_LOCATION
+
+
+class _CountingAgent(Agent):
+    """Wraps an agent, counting the steps & scenes it completes"""
+    def __init__(self, agent):
+        self.agent = agent
+        self.scenes = 0
+        self.steps = 0
+
+    def is_done(self, action_result):
+        done = self.agent.is_done(action_result)
+        self.scenes += 1 if done else 0
+        return done
+
+    def pick_action(self, observations, action_list):
+        self.steps += 1
+        return self.agent.pick_action(observations, action_list)
+
+    def save_result(self, filename, empty_results, results_format_fns):
+        return self.agent.save_result(filename, empty_results,
+                                      results_format_fns)
+
+    def save_result_chunk(self, results_writer, scene, results_format_fns):
+        return self.agent.save_result_chunk(results_writer, scene,
+                                            results_format_fns)
+
+
+def _run_worker(agent, supervisor_address, result_filename, benchbot_kwargs):
+    # Runs in its own process, with its own copy of the agent
+    counter = _CountingAgent(agent)
+    benchbot = BenchBot(agent=counter,
+                        supervisor_address=supervisor_address,
+                        result_location=result_filename,
+                        **benchbot_kwargs)
+
+    # Throughput is measured once connected, so it excludes startup time
+    start_time = time.time()
+    benchbot.run()
+    duration = time.time() - start_time
+    return {
+        'supervisor_address': supervisor_address,
+        'result_filename': result_filename,
+        'scenes': counter.scenes,
+        'steps': counter.steps,
+        'duration': duration,
+        'steps_per_second': counter.steps / duration if duration else 0.0
+    }
+
+
+def merge_json_results(result_filenames):
+    """Default merge for 'run_parallel()', which loads the JSON results
+    written by each worker into a list (in the order of the supervisors)
+
+    Parameters
+    ----------
+    result_filenames :
+        The list of result files written by each worker
+
+    Returns
+    -------
+    list
+        The loaded results
+    """
+    results = []
+    for f in result_filenames:
+        with open(f, 'r') as fh:
+            results.append(json.load(fh))
+    return results
+
+
+def run_parallel(agent,
+                 supervisor_addresses,
+                 result_location=RESULT_LOCATION,
+                 worker_result_dir=None,
+                 merge_fn=merge_json_results,
+                 max_workers=None,
+                 **benchbot_kwargs):
+    """Runs an agent against several BenchBot Supervisors at once, with a
+    process per Supervisor. Each process runs 'BenchBot.run()' with its own
+    copy of the agent, & writes results to its own file. Once all workers
+    are done, their results are merged & written to 'result_location'.
+
+    Parameters
+    ----------
+    agent :
+        The agent to run (it must be picklable, as each worker process
+        receives its own copy)
+
+    supervisor_addresses :
+        List of addresses for the BenchBot Supervisors to run against
+
+    result_location :
+        The file the merged results are written to (as JSON)
+
+    worker_result_dir :
+        The directory each worker's result file is written to (defaults to
+        '<result_location>_workers')
+
+    merge_fn :
+        Function merging the list of worker result files into a single
+        JSON-serialisable result (skips merging if None)
+
+    max_workers :
+        Maximum number of worker processes (defaults to one per Supervisor)
+
+    **benchbot_kwargs
+        Any other arguments for each worker's BenchBot instance
+
+    Returns
+    -------
+    list
+        A summary for each worker, with its 'supervisor_address',
+        'result_filename', number of 'scenes' & 'steps', 'duration' in
+        seconds of 'BenchBot.run()' (excluding connecting to the
+        Supervisor), & throughput in 'steps_per_second'
+    """
+    if not isinstance(agent, Agent):
+        raise ValueError("run_parallel() received an agent of type '%s' "
+                         "which is not an instance of '%s'." %
+                         (agent.__class__.__name__, Agent.__name__))
+    if worker_result_dir is None:
+        worker_result_dir = result_location + '_workers'
+    result_filenames = [
+        os.path.join(worker_result_dir, 'result_%d' % i)
+        for i in range(len(supervisor_addresses))
+    ]
+
+    with ProcessPoolExecutor(max_workers=max_workers or
+                             len(supervisor_addresses)) as executor:
+        summaries = list(
+            executor.map(_run_worker, [agent] * len(supervisor_addresses),
+                         supervisor_addresses, result_filenames,
+                         [benchbot_kwargs] * len(supervisor_addresses)))
+
+    if merge_fn is not None:
+        if (os.path.dirname(result_location)
+                and not os.path.exists(os.path.dirname(result_location))):
+            os.makedirs(os.path.dirname(result_location))
+        with open(result_location, 'w') as f:
+            json.dump(merge_fn(result_filenames), f)
+
+    print("Finished running %d workers:" % len(summaries))
+    for s in summaries:
+        print("\t%s: %d scenes, %d steps in %.1fs (%.2f steps/s)" %
+              (s['supervisor_address'], s['scenes'], s['steps'],
+               s['duration'], s['steps_per_second']))
+    print("\tTotal: %d scenes, %d steps (%.2f steps/s)" %
+          (sum(s['scenes'] for s in summaries),
+           sum(s['steps'] for s in summaries),
+           sum(s['steps_per_second'] for s in summaries)))
+    return summaries
@@ -0,0 +1,148 @@
+from collections import deque, namedtuple
+import jsonpickle
+import jsonpickle.ext.numpy as jet
+import threading
+
+jet.register_handlers()
+
+DEFAULT_MAX_QUEUE = 4
+
+ObservationFrame = namedtuple('ObservationFrame',
+                              ['sequence', 'observations'])
+ObservationFrame.__doc__ = """A set of observations pushed by the Supervisor,
+with the 'sequence' number the Supervisor gave it (gaps in the sequence
+numbers mean frames were dropped)"""
+
+
+class Subscription(object):
+    """A long-lived streaming subscription to observation channels, where the
+    Supervisor pushes observations as Server-Sent Events rather than the API
+    polling each channel. Create one with 'BenchBot.subscribe()'.
+
+    Each event is a set of observations for the subscribed channels, with
+    the event 'id' as its sequence number, & jsonpickle encoded 'data'. A
+    background thread receives events into a queue of at most 'max_queue'
+    frames. When consumers fall behind, the oldest frames are dropped (&
+    counted in 'dropped'), so consumers always see the freshest data.
+    Frames are only decoded (including connection callbacks) when consumed.
+
+    Frames are consumed by iterating, either synchronously ('for f in sub')
+    or asynchronously ('async for f in sub'), or with 'get()'. Iteration
+    ends when the Supervisor closes the stream or 'close()' is called.
+
+    Parameters
+    ----------
+    benchbot :
+        The BenchBot instance to subscribe through
+
+    channels :
+        List of observation channels to subscribe to
+
+    max_queue :
+        Maximum number of frames waiting to be consumed
+    """
+    def __init__(self, benchbot, channels, max_queue=DEFAULT_MAX_QUEUE):
+        self.benchbot = benchbot
+        self.channels = list(channels)
+        self.dropped = 0
+
+        self._cond = threading.Condition()
+        self._error = None
+        self._finished = False
+        self._frames = deque(maxlen=max_queue)
+
+        self._resp = benchbot._open_stream(self.channels)
+        self._reader = threading.Thread(target=self._read)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # asyncio is imported here, as it is always already loaded when this
+        # runs (& otherwise isn't needed)
+        import asyncio
+        f = await asyncio.get_running_loop().run_in_executor(None, self.get)
+        if f is None:
+            raise StopAsyncIteration
+        return f
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            f = self.get()
+            if f is None:
+                return
+            yield f
+
+    def _push(self, sequence, data):
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append((sequence, data))
+            self._cond.notify_all()
+
+    def _read(self):
+        # Parses the event stream (see the Server-Sent Events spec), pushing
+        # the raw data of each complete event
+        sequence, data, count = None, [], 0
+        try:
+            for line in self._resp.iter_lines(decode_unicode=True):
+                if line is None:
+                    continue
+                if not line:
+                    if data:
+                        self._push(count if sequence is None else sequence,
+                                   '\n'.join(data))
+                        count += 1
+                    sequence, data = None, []
+                elif line.startswith('data:'):
+                    data.append(line[5:].lstrip(' '))
+                elif line.startswith('id:'):
+                    sequence = int(line[3:].strip())
+        except Exception as e:
+            if not self._finished:
+                self._error = e
+        finally:
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def close(self):
+        """Closes the streaming connection, ending iteration once any queued
+        frames are consumed
+        """
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+        self._resp.close()
+        self._reader.join()
+
+    def get(self, timeout=None):
+        """Returns the oldest queued frame, waiting up to 'timeout' seconds
+        (or forever if None) for one to arrive
+
+        Returns
+        -------
+        ObservationFrame
+            The frame, or None if the stream has ended or the timeout expired
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._frames or self._finished,
+                                timeout)
+            if not self._frames:
+                if self._error is not None:
+                    raise self._error
+                return None
+            sequence, data = self._frames.popleft()
+        return ObservationFrame(
+            sequence, {
+                k: self.benchbot._decode_observation(k, v)
+                for k, v in jsonpickle.decode(data).items()
+            })
@@ -1,8 +1,21 @@
+from collections import deque
+import cv2
 import matplotlib as mpl
+import os
+import sys
+import threading
 
-mpl.use(
-    'TkAgg'
-)  # Default renderer Gtk3Agg had all sorts of stalling issues in matplotlib>=3.2
+
+def _has_display():
+    return sys.platform in ('darwin', 'win32') or bool(
+        os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+# Default renderer Gtk3Agg had all sorts of stalling issues in matplotlib>=3.2.
+# Without a display (e.g. headless nodes), the offscreen Agg renderer is used
+# instead, & an explicitly requested backend is always respected.
+if 'MPLBACKEND' not in os.environ:
+    mpl.use('TkAgg' if _has_display() else 'Agg')
 
 try:
     import matplotlib.pyplot as plt
@@ -18,9 +31,56 @@ except ImportError as e:
         RuntimeWarning)
     plt = None
 
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
 import numpy as np
-from scipy.spatial.transform import Rotation as Rot
+import time
+
+from .geometry import laser_to_points
+from .transforms import FrameTree
+
+# Largest range of label values used directly as indices when creating
+# diagonal masks
+_MAX_LABEL_RANGE = 1 << 20
+
+# Defaults for offscreen rendering: size (height, width) in pixels of each
+# panel, frame rate of written videos, & maximum number of observations
+# waiting to be rendered
+DEFAULT_TILE_SIZE = (240, 320)
+DEFAULT_FPS = 10
+DEFAULT_MAX_QUEUE = 2
+
+# Output file extensions written as videos (with the codec used), rather than
+# as image sequences
+VIDEO_CODECS = {'.avi': 'MJPG', '.mp4': 'mp4v'}
+
+_LUTS = {}
+
+# Length of the arrows drawn along the axes of each pose frame, & of their
+# heads relative to the arrow (with the head's lines 15 degrees either side
+# of the shaft)
+FRAME_AXIS_LENGTH = 0.25
+FRAME_HEAD_RATIO = 0.3
+
+
+def _frame_arrows():
+    # Segments of the arrow along each axis of a frame, in the frame itself
+    # (shape (3 axes, 3 segments, 2 points, 3))
+    c, s = np.cos(np.radians(15)), np.sin(np.radians(15))
+    h = FRAME_AXIS_LENGTH * FRAME_HEAD_RATIO
+    arrows = np.zeros((3, 3, 2, 3))
+    for a in range(3):
+        b = (a + 1) % 3
+        arrows[a, :, 0, a] = FRAME_AXIS_LENGTH
+        arrows[a, 1:, 1, a] = FRAME_AXIS_LENGTH - h * c
+        arrows[a, 1, 1, b] = h * s
+        arrows[a, 2, 1, b] = -h * s
+    return arrows
+
+
+_ARROWS = _frame_arrows()
 
 SUPPORTED_OBSERVATIONS = [
     'image_rgb', 'image_depth', 'laser', 'poses', 'image_class',
@@ -28,49 +88,28 @@ SUPPORTED_OBSERVATIONS = [
 ]
 
 
-def __plot_frame(ax, frame_name, frame_data):
-    # NOTE currently assume that everything has parent frame 'map'
-    L = 0.25
-    # TODO BUG: map has no rotation aspect, handling it here but it should
-    # have a rotation.
-    origin = frame_data['translation_xyz']
-    if 'rotation_rpy' in frame_data.keys():
-        orientation = frame_data['rotation_rpy']
-    else:
-        orientation = [0, 0, 0]
-    rot_obj = Rot.from_euler('xyz', orientation)
-    x_vector = rot_obj.apply([1, 0, 0])
-    y_vector = rot_obj.apply([0, 1, 0])
-    z_vector = rot_obj.apply([0, 0, 1])
-    origin = frame_data['translation_xyz']
-    ax.quiver(origin[0],
-              origin[1],
-              origin[2],
-              x_vector[0],
-              x_vector[1],
-              x_vector[2],
-              length=L,
-              normalize=True,
-              color='r')
-    ax.quiver(origin[0],
-              origin[1],
-              origin[2],
-              y_vector[0],
-              y_vector[1],
-              y_vector[2],
-              length=L,
-              normalize=True,
-              color='g')
-    ax.quiver(origin[0],
-              origin[1],
-              origin[2],
-              z_vector[0],
-              z_vector[1],
-              z_vector[2],
-              length=L,
-              normalize=True,
-              color='b')
-    ax.text(origin[0], origin[1], origin[2], frame_name)
+def _frame_segments(transforms):
+    # Line segments of the arrow drawn along each axis of every frame (given
+    # as (N, 4, 4) transforms into the plot's frame), with shape
+    # (3, N * 3, 2, 3): a shaft & two head lines per frame, for each axis
+    segments = np.einsum('nij,aspj->naspi', transforms[:, :3, :3],
+                         _ARROWS) + transforms[:, None, None, None, :3, 3]
+    return segments.swapaxes(0, 1).reshape(3, -1, 2, 3)
+
+
+def __plot_frames(ax, frame_names, transforms):
+    # Plots the axes of every frame with a single collection per axis colour
+    # (which can then be moved with 'set_segments()')
+    artists = []
+    for segments, colour in zip(_frame_segments(transforms), 'rgb'):
+        points = segments.reshape(-1, 3)
+        had_data = ax.has_data()
+        artists.append(Line3DCollection(segments, colors=colour))
+        ax.add_collection3d(artists[-1])
+        ax.auto_scale_xyz(points[:, 0], points[:, 1], points[:, 2], had_data)
+    for n, o in zip(frame_names, transforms[:, :3, 3]):
+        artists.append(ax.text(o[0], o[1], o[2], n))
+    return artists
 
 
 def _set_axes_radius(ax, origin, radius):
@@ -94,202 +133,760 @@ def _set_axes_equal(ax):
     _set_axes_radius(ax, origin, radius)
 
 
-def _create_diag_mask(mask_img, num_lines=7):
-    diag_mask = np.zeros(mask_img.shape, bool)
-    img_width = diag_mask.shape[1]
-    # Note that minimum line width is 1
-    line_width = max([np.min(diag_mask.shape) // num_lines, 1])
-    # TODO Magic numbers in here ... don't do that
-    bool_line = np.tile(
-        np.append(np.ones(line_width, bool), np.zeros(line_width, bool)),
-        (img_width * 2 // (line_width * 2)) + 2)
-    for row_id in np.arange(diag_mask.shape[0]):
-        start_idx = img_width - row_id % img_width
-        # TODO there must be a better way to do this
-        if (row_id // img_width) > 0 and (row_id // img_width) % 2 == 1:
-            start_idx += line_width
-        diag_mask[row_id, :] = bool_line[start_idx:(start_idx + img_width)]
-    return np.logical_and(mask_img, diag_mask)
+def _create_diag_masks(label_img, num_lines=7):
+    # Creates a diagonal stripe pattern within every labelled region at once,
+    # with each region's stripes aligned to its own bounding box & scaled to
+    # its size. Stripes are 'line_width' wide with equal gaps, where
+    # 'line_width' is 1/'num_lines' of the box's smallest side (at least 1),
+    # & the pattern shifts by one each row (jumping by 'line_width' every
+    # 'box width' rows).
+    #
+    # Labels are used directly as indices when their range is small (as
+    # 'np.unique()' is slow on whole images), otherwise they are compacted.
+    # SciPy's ndimage is imported here, as it is slow to import & only needed
+    # for instance segmentation.
+    from scipy.ndimage import find_objects
+    lo = int(label_img.min()) if label_img.size else 0
+    if label_img.size and int(label_img.max()) - lo < _MAX_LABEL_RANGE:
+        # Indices can't be computed in the label dtype, where they may wrap
+        index_img = label_img.astype(np.intp) - lo
+    else:
+        index_img = np.unique(label_img,
+                              return_inverse=True)[1].reshape(label_img.shape)
+    rois = np.array([(0, 1, 0, 1) if r is None else
+                     (r[0].start, r[0].stop, r[1].start, r[1].stop)
+                     for r in find_objects(index_img + 1)],
+                    dtype=np.int32).reshape(-1, 4)
+    y0, x0 = rois[:, 0], rois[:, 2]
+    widths = rois[:, 3] - x0
+    line_widths = np.maximum(
+        np.minimum(rois[:, 1] - y0, widths) // num_lines, 1)
+
+    # Row & column of every pixel within its region's bounding box
+    img_h, img_w = label_img.shape
+    rows = np.arange(img_h, dtype=np.int32)[:, None] - y0[index_img]
+    cols = np.arange(img_w, dtype=np.int32)[None, :] - x0[index_img]
+    w = line_widths[index_img]
+    width = widths[index_img]
+    wraps, rows = np.divmod(rows, width)
+    shift = width - rows
+    shift += cols
+    shift += w * (wraps & 1)
+    return shift % (2 * w) < w
+
+
+def _class_segment_layer(segment_data):
+    # Doing a little filtering to ignore unlabelled pixels
+    class_segment_img = segment_data['class_segment_img']
+    return (np.ma.masked_where(class_segment_img == 0, class_segment_img),
+            (1, len(segment_data['class_ids']) + 1))
 
 
-def _get_roi(img_mask):
-    a = np.where(img_mask != 0)
-    bbox = np.min(a[0]), np.max(a[0]) + 1, np.min(a[1]), np.max(a[1]) + 1
-    return bbox
+def _inst_segment_layers(segment_data):
+    # Add two images to the image that should not overlap
+    # Images will contain class ID and instance ID adjacent with diagonals
+    inst_segment_img = segment_data['instance_segment_img']
+
+    # Make diagonal pattern mask
+    # Each instance will have its own diagonal mask proportional
+    # to object size to help visualization
+    diagonal_mask_img = _create_diag_masks(inst_segment_img)
+
+    # First image is the class id with stripes
+    class_segment_img = segment_data['class_segment_img']
+    num_class_colours = len(segment_data['class_ids']) + 1
+    masked_inst_class = np.ma.masked_where(
+        np.logical_or(class_segment_img == 0,
+                      np.logical_not(diagonal_mask_img)), class_segment_img)
+
+    # Second image is the instance id with stripes adjacent to
+    # class id stripes
+    # NOTE Instance IDs and corresponding colours will change
+    # between images and depends on format CCIII (C class id, I inst id)
+    inst_id_img = inst_segment_img % 1000
+    masked_inst_segment = np.ma.masked_where(
+        np.logical_or(inst_id_img == 0, diagonal_mask_img), inst_id_img)
+    return ((masked_inst_class, (1, num_class_colours)),
+            (masked_inst_segment, (1, max(np.amax(inst_id_img), 1))))
+
+
+def _in_limits(ax, points):
+    # Whether 2D / 3D points are all within the current limits of an axis
+    # (ignoring non-finite points, which are never drawn)
+    points = points[np.all(np.isfinite(points), axis=1)]
+    limits = [ax.get_xlim(), ax.get_ylim()] + ([ax.get_zlim()] if hasattr(
+        ax, 'get_zlim') else [])
+    return all(
+        np.all((points[:, i] >= min(l)) & (points[:, i] <= max(l)))
+        for i, l in enumerate(limits))
 
 
 def _vis_rgb(ax, rgb_data):
     ax.clear()
-    ax.imshow(rgb_data)
+    im = ax.imshow(rgb_data)
     ax.get_xaxis().set_visible(False)
     ax.get_yaxis().set_visible(False)
     ax.set_title("image_rgb")
+    return [im]
+
+
+def _update_rgb(artists, rgb_data):
+    if artists[0].get_array().shape != rgb_data.shape:
+        return False
+    artists[0].set_data(rgb_data)
+    return True
 
 
 def _vis_depth(ax, depth_data):
     ax.clear()
-    ax.imshow(depth_data,
-              cmap="hot",
-              clim=(np.amin(depth_data), np.amax(depth_data)))
+    im = ax.imshow(depth_data,
+                   cmap="hot",
+                   clim=(np.amin(depth_data), np.amax(depth_data)))
     ax.get_xaxis().set_visible(False)
     ax.get_yaxis().set_visible(False)
     ax.set_title("image_depth")
+    return [im]
+
+
+def _update_depth(artists, depth_data):
+    if artists[0].get_array().shape != depth_data.shape:
+        return False
+    artists[0].set_data(depth_data)
+    artists[0].set_clim(np.amin(depth_data), np.amax(depth_data))
+    return True
 
 
 def _vis_class_segment(ax, segment_data):
-    # Doing a little filtering to ignore unlabelled pixels
     ax.clear()
-    class_segment_img = segment_data['class_segment_img']
-    masked_class_segment = np.ma.masked_where(class_segment_img == 0,
-                                              class_segment_img)
     # make background black
     ax.set_facecolor((0, 0, 0))
-    num_class_colours = len(segment_data['class_ids']) + 1
-    ax.imshow(masked_class_segment,
-              cmap='gist_rainbow',
-              clim=(1, num_class_colours),
-              interpolation='nearest')
+    img, clim = _class_segment_layer(segment_data)
+    im = ax.imshow(img,
+                   cmap='gist_rainbow',
+                   clim=clim,
+                   interpolation='nearest')
     ax.get_xaxis().set_visible(False)
     ax.get_yaxis().set_visible(False)
     ax.set_title("image_class")
+    return [im]
+
+
+def _update_class_segment(artists, segment_data):
+    img, clim = _class_segment_layer(segment_data)
+    if artists[0].get_array().shape != img.shape:
+        return False
+    artists[0].set_data(img)
+    artists[0].set_clim(*clim)
+    return True
 
 
 def _vis_inst_segment(ax, segment_data):
     # Setup instance segmentation image for visualization
     ax.clear()
     ax.set_facecolor((0, 0, 0))
-    inst_segment_img = segment_data['instance_segment_img']
-
-    # Add two images to the image that should not overlap
-    # Images will contain class ID and instance ID adjacent with diagonals
-
-    # Make diagonal pattern mask
-    diagonal_mask_img = np.zeros(inst_segment_img.shape, bool)
-    # Each instance will have its own diagonal mask proportional
-    # to object size to help visualization
-    for inst_id in np.unique(inst_segment_img):
-        inst_mask_img = inst_segment_img == inst_id
-        y0, y1, x0, x1 = _get_roi(inst_mask_img)
-        inst_diag_mask = _create_diag_mask(inst_mask_img[y0:y1, x0:x1])
-        diagonal_mask_img[y0:y1, x0:x1] = np.logical_or(
-            diagonal_mask_img[y0:y1, x0:x1], inst_diag_mask)
-
-    # First image is the class id with stripes
-    class_segment_img = segment_data['class_segment_img']
-    num_class_colours = len(segment_data['class_ids']) + 1
-    masked_inst_class = np.ma.masked_where(
-        np.logical_or(class_segment_img == 0,
-                      np.logical_not(diagonal_mask_img)), class_segment_img)
-    ax.imshow(masked_inst_class,
-              cmap='gist_rainbow',
-              clim=(1, num_class_colours),
-              interpolation='nearest')
-
-    # Second image is the instance id with stripes adjacent to
-    # class id stripes
-    # NOTE Instance IDs and corresponding colours will change
-    # between images and depends on format CCIII (C class id, I inst id)
-    inst_id_img = inst_segment_img % 1000
-    masked_inst_segment = np.ma.masked_where(
-        np.logical_or(inst_id_img == 0, diagonal_mask_img), inst_id_img)
-    ax.imshow(masked_inst_segment,
-              cmap='brg',
-              clim=(1, max(np.amax(inst_id_img), 1)),
-              interpolation='nearest')
+    (class_img, class_clim), (inst_img,
+                              inst_clim) = _inst_segment_layers(segment_data)
+    ims = [
+        ax.imshow(class_img,
+                  cmap='gist_rainbow',
+                  clim=class_clim,
+                  interpolation='nearest'),
+        ax.imshow(inst_img, cmap='brg', clim=inst_clim,
+                  interpolation='nearest')
+    ]
     ax.get_xaxis().set_visible(False)
     ax.get_yaxis().set_visible(False)
     ax.set_title("image_instance")
+    return ims
+
+
+def _update_inst_segment(artists, segment_data):
+    layers = _inst_segment_layers(segment_data)
+    if artists[0].get_array().shape != layers[0][0].shape:
+        return False
+    for im, (img, clim) in zip(artists, layers):
+        im.set_data(img)
+        im.set_clim(*clim)
+    return True
 
 
 def _vis_laser(ax, laser_data):
     ax.clear()
     ax.plot(0, 0, c='r', marker=">")
-    ax.scatter([x[0] * np.cos(x[1]) for x in laser_data['scans']],
-               [x[0] * np.sin(x[1]) for x in laser_data['scans']],
-               c='k',
-               s=4,
-               marker='s')
+    points = laser_to_points(laser_data)
+    sc = ax.scatter(points[:, 0], points[:, 1], c='k', s=4, marker='s')
     ax.axis('equal')
     ax.set_title("laser (robot frame)")
+    return [sc]
+
+
+def _update_laser(artists, laser_data):
+    points = laser_to_points(laser_data)
+    if not _in_limits(artists[0].axes, points):
+        return False
+    artists[0].set_offsets(points)
+    return True
+
+
+def _pose_frames(pose_data):
+    # Frames are plotted relative to the map, or relative to their own root
+    # where they aren't connected to it (e.g. no 'parent_frame', or an
+    # 'odom' root)
+    tree = FrameTree(pose_data)
+    frames = [f for f in tree.frames if f != 'map']
+    transforms = [np.eye(4)]
+    for i, f in enumerate(tree.frames):
+        if f != 'map':
+            try:
+                transforms.append(tree.matrix(f))
+            except ValueError:
+                transforms.append(tree.root_matrices[i])
+    return ['map'] + frames, np.stack(transforms)
 
 
 def _vis_poses(ax, pose_data):
     ax.clear()
-    __plot_frame(ax, 'map', {'translation_xyz': [0, 0, 0]})
-    for k, v in pose_data.items():
-        __plot_frame(ax, k, v)
+    artists = __plot_frames(ax, *_pose_frames(pose_data))
     # ax.axis('equal') Unimplemented for 3d plots... wow...
     _set_axes_equal(ax)
     ax.set_title("poses (world frame)")
+    return artists
+
+
+def _update_poses(artists, pose_data):
+    # Frame axes & labels are moved in place (unless the set of frames has
+    # changed, or a frame has moved out of view)
+    names, transforms = _pose_frames(pose_data)
+    if (names != [a.get_text() for a in artists[3:]]
+            or not _in_limits(artists[0].axes, transforms[:, :3, 3])):
+        return False
+    for a, segments in zip(artists, _frame_segments(transforms)):
+        a.set_segments(segments)
+    for a, o in zip(artists[3:], transforms[:, :3, 3]):
+        a.set_position_3d(o)
+    return True
+
+
+# Observation each type of visualisation uses, & the functions which draw it
+# from scratch & update its artists in place
+_VIS_FUNCTIONS = {
+    'image_rgb': ('image_rgb', _vis_rgb, _update_rgb),
+    'image_depth': ('image_depth', _vis_depth, _update_depth),
+    'image_class': ('image_segment', _vis_class_segment,
+                    _update_class_segment),
+    'image_instance': ('image_segment', _vis_inst_segment,
+                       _update_inst_segment),
+    'laser': ('laser', _vis_laser, _update_laser),
+    'poses': ('poses', _vis_poses, _update_poses)
+}
 
 
 class ObservationVisualiser(object):
-
+    """Visualises observations in a grid of Matplotlib plots, one per
+    observation type in 'vis_list'.
+
+    By default every call to 'visualise()' clears & redraws every plot. With
+    'blit=True', plot artists are instead created once & only have their
+    data updated on later calls (e.g. with 'set_data()' & 'set_offsets()'),
+    with the canvas blitting just the changed artists over a cached
+    background. Plots are only redrawn from scratch when the new data no
+    longer fits (e.g. an image changes resolution, or the robot leaves the
+    current plot limits), or the figure is resized.
+
+    Parameters
+    ----------
+    vis_list :
+        List of observation types to visualise (see SUPPORTED_OBSERVATIONS)
+
+    blit :
+        Whether to update existing artists & blit them, rather than redraw
+        every plot for every call
+
+    refresh_rate :
+        Maximum number of times per second the figure is rendered, with calls
+        in between skipped (None renders on every call)
+
+    frame_skip :
+        Number of calls skipped after each call that renders (e.g. 2 renders
+        every third call)
+    """
     def __init__(self,
-                 vis_list=['image_rgb', 'image_depth', 'laser', 'poses']):
+                 vis_list=['image_rgb', 'image_depth', 'laser', 'poses'],
+                 blit=False,
+                 refresh_rate=None,
+                 frame_skip=0):
+        for vis_type in vis_list:
+            if vis_type not in _VIS_FUNCTIONS:
+                raise ValueError(
+                    "\'{0}\' is not supported for visualization. Supported: {1}"
+                    .format(vis_type, SUPPORTED_OBSERVATIONS))
         self.fig = None
         self.axs = None
         self.vis_list = vis_list
 
+        self.blit = blit
+        self.frame_skip = frame_skip
+        self.refresh_rate = refresh_rate
+
+        self._artists = None
+        self._backgrounds = None
+        self._calls = 0
+        self._last_render = None
+
+    def _create_figure(self):
+        subplot_shape = (2, (len(self.vis_list) + 1) //
+                         2) if len(self.vis_list) > 1 else (1, 1)
+        self.fig = self._new_figure(subplot_shape)
+        self.axs = self.fig.subplots(*subplot_shape)
+        # Make sure that axis is always a 2D numpy array (reference purposes)
+        if not isinstance(self.axs, np.ndarray):
+            self.axs = np.array(self.axs).reshape(1, 1)
+        if len(self.axs.shape) == 1:
+            self.axs = self.axs[:, np.newaxis]
+
+        # Set things up for poses (3D plot) if desired
+        if 'poses' in self.vis_list:
+            # NOTE currently assume poses can only exist once in the list
+            poses_plt_num = self.vis_list.index('poses')
+            poses_subplt = (poses_plt_num % 2, poses_plt_num // 2)
+            poses_plt_num_h = poses_subplt[0] * self.axs.shape[
+                1] + poses_subplt[1] + 1
+            self.axs[poses_subplt].remove()
+            self.axs[poses_subplt] = self.fig.add_subplot(self.axs.shape[0],
+                                                          self.axs.shape[1],
+                                                          poses_plt_num_h,
+                                                          projection='3d')
+
+        # Cached backgrounds are stale once the figure changes size
+        self.fig.canvas.mpl_connect('resize_event', self._invalidate)
+
+    def _draw_all(self, observations):
+        # Draws every plot from scratch, returning the artists holding data
+        artists = []
+        for plt_num, vis_type in enumerate(self.vis_list):
+            key, vis_fn, _ = _VIS_FUNCTIONS[vis_type]
+            artists.append(
+                vis_fn(self.axs[(plt_num % 2, plt_num // 2)],
+                       observations[key]))
+
+        # Handle empty plot
+        if len(self.vis_list) < self.axs.shape[0] * self.axs.shape[1]:
+            # Currently assume there will only ever be one empty plot
+            subplt = (self.axs.shape[0] - 1, self.axs.shape[1] - 1)
+            self.axs[subplt].axis("off")
+        return artists
+
+    def _invalidate(self, *args):
+        self._artists = None
+        self._backgrounds = None
+
+    def _new_figure(self, subplot_shape):
+        plt.ion()
+        return plt.figure()
+
+    def _render_blit(self, observations):
+        canvas = self.fig.canvas
+        axs = [self.axs[(i % 2, i // 2)] for i in range(len(self.vis_list))]
+
+        # Update artists in place, falling back to a full redraw (with the
+        # artists excluded from the cached background) if any can't be
+        if self._artists is None or not all(
+                _VIS_FUNCTIONS[v][2](a, observations[_VIS_FUNCTIONS[v][0]])
+                for v, a in zip(self.vis_list, self._artists)):
+            self._artists = self._draw_all(observations)
+            # Spines are drawn over the data too (as in a full draw)
+            for a in (a for arts in self._artists for a in arts):
+                a.set_animated(True)
+            for a in (a for ax in axs for a in ax.spines.values()):
+                a.set_animated(True)
+            canvas.draw()
+            self._backgrounds = [canvas.copy_from_bbox(ax.bbox) for ax in axs]
+
+        for ax, artists, bg in zip(axs, self._artists, self._backgrounds):
+            canvas.restore_region(bg)
+            for a in artists:
+                # 3D collections must be projected before being drawn alone
+                if hasattr(a, 'do_3d_projection'):
+                    a.do_3d_projection()
+                ax.draw_artist(a)
+            for a in ax.spines.values():
+                ax.draw_artist(a)
+            canvas.blit(ax.bbox)
+        canvas.flush_events()
+
     def update(self):
         # Performs a non-blocking update of the figure
         plt.draw()
         self.fig.canvas.start_event_loop(0.05)
 
     def visualise(self, observations, step_count=None):
-        subplot_shape = (2, (len(self.vis_list) + 1) //
-                         2) if len(self.vis_list) > 1 else (1, 1)
+        """Visualises a set of observations, unless the call is skipped due
+        to 'frame_skip' or 'refresh_rate'
+
+        Returns
+        -------
+        bool
+            Whether the figure was rendered
+        """
+        self._calls += 1
+        if (self._calls - 1) % (self.frame_skip + 1):
+            return False
+        now = time.time()
+        if (self.refresh_rate and self._last_render is not None
+                and now - self._last_render < 1.0 / self.refresh_rate):
+            return False
+        self._last_render = now
+
         if self.fig is None:
-            plt.ion()
-            self.fig, self.axs = plt.subplots(*subplot_shape)
-            # Make sure that axis is always a 2D numpy array (reference purposes)
-            if not isinstance(self.axs, np.ndarray):
-                self.axs = np.array(self.axs).reshape(1, 1)
-            if len(self.axs.shape) == 1:
-                self.axs = self.axs[:, np.newaxis]
-
-            # Set things up for poses (3D plot) if desired
-            if 'poses' in self.vis_list:
-                # NOTE currently assume poses can only exist once in the list
-                poses_plt_num = int(
-                    np.where(np.array(self.vis_list) == 'poses')[0])
-                poses_subplt = (poses_plt_num % 2, poses_plt_num // 2)
-                poses_plt_num_h = poses_subplt[0] * self.axs.shape[
-                    1] + poses_subplt[1] + 1
-                self.axs[poses_subplt].remove()
-                self.axs[poses_subplt] = self.fig.add_subplot(
-                    self.axs.shape[0],
-                    self.axs.shape[1],
-                    poses_plt_num_h,
-                    projection='3d')
+            self._create_figure()
 
         self.fig.canvas.manager.set_window_title("Agent Observations" + (
             "" if step_count is None else " (step # %d)" % step_count))
 
-        for plt_num, vis_type in enumerate(self.vis_list):
-            subplt = (plt_num % 2, plt_num // 2)
-            ax = self.axs[subplt]
-            if vis_type == 'image_rgb':
-                _vis_rgb(ax, observations['image_rgb'])
-            elif vis_type == 'image_depth':
-                _vis_depth(ax, observations['image_depth'])
-            elif vis_type == 'image_class':
-                _vis_class_segment(ax, observations['image_segment'])
-            elif vis_type == 'image_instance':
-                _vis_inst_segment(ax, observations['image_segment'])
-            elif vis_type == 'laser':
-                _vis_laser(ax, observations['laser'])
-            elif vis_type == 'poses':
-                _vis_poses(ax, observations['poses'])
-            else:
+        if self.blit:
+            self._render_blit(observations)
+        else:
+            self._draw_all(observations)
+            self.update()
+        return True
+
+
+def _lut(cmap):
+    # RGB lookup table (256 entries) for a Matplotlib colour map
+    lut = _LUTS.get(cmap, None)
+    if lut is None:
+        lut = _LUTS[cmap] = (mpl.colormaps[cmap](np.linspace(0, 1, 256))[:, :3]
+                             * 255).astype(np.uint8)
+    return lut
+
+
+def _colour_map(values, cmap, clim):
+    scale = 255.0 / max(clim[1] - clim[0], np.finfo(float).eps)
+    return _lut(cmap)[np.nan_to_num(
+        np.clip((values - clim[0]) * scale, 0, 255)).astype(np.uint8)]
+
+
+def _colour_masked(masked, cmap, clim, out):
+    m = np.logical_not(np.ma.getmaskarray(masked))
+    out[m] = _colour_map(np.ma.getdata(masked)[m], cmap, clim)
+    return out
+
+
+def _nearest(img, tile_size):
+    # Nearest neighbour resize that works for any dtype (unlike cv2.resize)
+    img = np.asarray(img)
+    return img[(np.arange(tile_size[0]) * img.shape[0] //
+                tile_size[0])[:, None],
+               np.arange(tile_size[1]) * img.shape[1] // tile_size[1]]
+
+
+def _nearest_segment(segment_data, tile_size):
+    return {
+        'class_ids': segment_data['class_ids'],
+        'class_segment_img': _nearest(segment_data['class_segment_img'],
+                                      tile_size),
+        'instance_segment_img': _nearest(segment_data['instance_segment_img'],
+                                         tile_size)
+    }
+
+
+def _tile_rgb(rgb_data, tile_size):
+    return cv2.resize(np.ascontiguousarray(rgb_data),
+                      (tile_size[1], tile_size[0]),
+                      interpolation=cv2.INTER_AREA)
+
+
+def _tile_depth(depth_data, tile_size):
+    return _colour_map(_nearest(depth_data, tile_size), 'hot',
+                       (np.nanmin(depth_data), np.nanmax(depth_data)))
+
+
+def _tile_class_segment(segment_data, tile_size):
+    img, clim = _class_segment_layer(_nearest_segment(segment_data,
+                                                      tile_size))
+    return _colour_masked(img, 'gist_rainbow', clim,
+                          np.zeros(tile_size + (3,), np.uint8))
+
+
+def _tile_inst_segment(segment_data, tile_size):
+    out = np.zeros(tile_size + (3,), np.uint8)
+    for (img, clim), cmap in zip(
+            _inst_segment_layers(_nearest_segment(segment_data, tile_size)),
+        ['gist_rainbow', 'brg']):
+        _colour_masked(img, cmap, clim, out)
+    return out
+
+
+def _tile_laser(laser_data, tile_size):
+    h, w = tile_size
+    out = np.full((h, w, 3), 255, np.uint8)
+    scale = 0.5 * min(h, w) / laser_data['range_max']
+    px = np.round(laser_to_points(laser_data) * [scale, -scale] +
+                  [w // 2, h // 2])
+    px = px[np.all(np.isfinite(px), axis=1)].astype(int)
+    px = px[(px[:, 0] >= 0) & (px[:, 0] < w - 1) & (px[:, 1] >= 0) &
+            (px[:, 1] < h - 1)]
+    for dy, dx in [(0, 0), (0, 1), (1, 0), (1, 1)]:
+        out[px[:, 1] + dy, px[:, 0] + dx] = 0
+    cv2.arrowedLine(out, (w // 2 - 4, h // 2), (w // 2 + 4, h // 2),
+                    (255, 0, 0), 2)
+    return out
+
+
+def _tile_poses(pose_data, tile_size):
+    # Top down view of each frame's x (red) & y (green) axes
+    h, w = tile_size
+    out = np.full((h, w, 3), 255, np.uint8)
+    names, transforms = _pose_frames(pose_data)
+    L = 0.25
+    origins = transforms[:, :2, 3]
+    centre = (np.amax(origins, axis=0) + np.amin(origins, axis=0)) / 2
+    scale = 0.5 * min(h, w) / max(
+        np.amax(np.abs(origins - centre)) + 2 * L, 1.0)
+
+    def px(p):
+        return tuple(
+            int(v) for v in np.round((p - centre) * [scale, -scale] +
+                                     [w // 2, h // 2]))
+
+    for n, t in zip(names, transforms):
+        o = px(t[:2, 3])
+        for axis, colour in [(0, (255, 0, 0)), (1, (0, 128, 0))]:
+            cv2.arrowedLine(out, o, px(t[:2, 3] + L * t[:2, axis]), colour,
+                            1, cv2.LINE_AA)
+        cv2.putText(out, n, o, cv2.FONT_HERSHEY_SIMPLEX, 0.35, (0, 0, 0), 1,
+                    cv2.LINE_AA)
+    return out
+
+
+# Title & function rendering each type of visualisation as an RGB panel
+_TILE_FUNCTIONS = {
+    'image_rgb': ("image_rgb", _tile_rgb),
+    'image_depth': ("image_depth", _tile_depth),
+    'image_class': ("image_class", _tile_class_segment),
+    'image_instance': ("image_instance", _tile_inst_segment),
+    'laser': ("laser (robot frame)", _tile_laser),
+    'poses': ("poses (world frame, top down)", _tile_poses)
+}
+
+
+def _put_label(img, text, origin):
+    # Outlined so it is legible on any background
+    for colour, thickness in [((0, 0, 0), 3), ((255, 255, 255), 1)]:
+        cv2.putText(img, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.4, colour,
+                    thickness, cv2.LINE_AA)
+
+
+def render_panels(observations,
+                  vis_list=['image_rgb', 'image_depth', 'laser', 'poses'],
+                  tile_size=DEFAULT_TILE_SIZE):
+    """Renders observations directly to an RGB image with NumPy & OpenCV, in
+    the same grid of panels as 'ObservationVisualiser' (without needing
+    Matplotlib figures or a display)
+
+    Parameters
+    ----------
+    observations :
+        The observations to render
+
+    vis_list :
+        List of observation types to render (see SUPPORTED_OBSERVATIONS)
+
+    tile_size :
+        Size (height, width) in pixels of each panel
+
+    Returns
+    -------
+    ndarray
+        The RGB image with shape (H, W, 3)
+    """
+    h, w = tile_size = tuple(tile_size)
+    shape = (2, (len(vis_list) + 1) // 2) if len(vis_list) > 1 else (1, 1)
+    out = np.zeros((shape[0] * h, shape[1] * w, 3), np.uint8)
+    for plt_num, vis_type in enumerate(vis_list):
+        title, tile_fn = _TILE_FUNCTIONS[vis_type]
+        r, c = plt_num % 2, plt_num // 2
+        tile = out[r * h:(r + 1) * h, c * w:(c + 1) * w]
+        tile[:] = tile_fn(observations[_VIS_FUNCTIONS[vis_type][0]],
+                          tile_size)
+        _put_label(tile, title, (4, 14))
+    return out
+
+
+class _AggRenderer(ObservationVisualiser):
+    # Renders the plots of ObservationVisualiser to an offscreen Agg canvas,
+    # without pyplot (so it is safe to use in a background thread)
+    def __init__(self, vis_list, tile_size, dpi=100):
+        super(_AggRenderer, self).__init__(vis_list, blit=True)
+        self.dpi = dpi
+        self.tile_size = tile_size
+
+    def _new_figure(self, subplot_shape):
+        fig = Figure(figsize=(subplot_shape[1] * self.tile_size[1] / self.dpi,
+                              subplot_shape[0] * self.tile_size[0] /
+                              self.dpi),
+                     dpi=self.dpi)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def render(self, observations):
+        if self.fig is None:
+            self._create_figure()
+        self._render_blit(observations)
+        return np.asarray(self.fig.canvas.buffer_rgba())[..., :3].copy()
+
+
+class OffscreenVisualiser(object):
+    """Visualises observations without a display, writing the rendered
+    panels to a video or image sequence (e.g. for debugging agents on
+    headless nodes).
+
+    Calls to 'visualise()' only queue observations, which a background thread
+    renders & writes. At most 'max_queue' observations wait to be rendered;
+    when rendering falls behind, the oldest are dropped (& counted in
+    'dropped'), so the control loop is never slowed down.
+
+    Panels are rendered either directly with NumPy & OpenCV ('numpy', the
+    fastest), or as the same Matplotlib plots as 'ObservationVisualiser' on
+    an offscreen Agg canvas ('agg'). Call 'close()' (or use as a context
+    manager) to finish writing the queued observations.
+
+    Parameters
+    ----------
+    output :
+        Where frames are written: a video file if it ends in one of
+        VIDEO_CODECS, a printf-style pattern for an image sequence (e.g.
+        'frames/%06d.png'), or otherwise a directory to write an image
+        sequence into
+
+    vis_list :
+        List of observation types to visualise (see SUPPORTED_OBSERVATIONS)
+
+    renderer :
+        Either 'numpy' or 'agg'
+
+    fps :
+        Frame rate of written videos
+
+    tile_size :
+        Size (height, width) in pixels of each panel
+
+    max_queue :
+        Maximum number of observations waiting to be rendered
+    """
+    def __init__(self,
+                 output,
+                 vis_list=['image_rgb', 'image_depth', 'laser', 'poses'],
+                 renderer='numpy',
+                 fps=DEFAULT_FPS,
+                 tile_size=DEFAULT_TILE_SIZE,
+                 max_queue=DEFAULT_MAX_QUEUE):
+        for vis_type in vis_list:
+            if vis_type not in _VIS_FUNCTIONS:
                 raise ValueError(
                     "\'{0}\' is not supported for visualization. Supported: {1}"
                     .format(vis_type, SUPPORTED_OBSERVATIONS))
+        if renderer not in ('agg', 'numpy'):
+            raise ValueError("Renderer '%s' is not one of 'agg' or 'numpy'" %
+                             renderer)
+        self.output = output
+        self.vis_list = list(vis_list)
+        self.renderer = renderer
+        self.fps = fps
+        self.tile_size = tuple(tile_size)
+        self.dropped = 0
+        self.written = 0
+
+        self._pattern = None
+        if os.path.splitext(output)[1].lower() not in VIDEO_CODECS:
+            self._pattern = (output if '%' in output else os.path.join(
+                output, '%06d.png'))
+        d = os.path.dirname(self._pattern if self._pattern else output)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._video = None
+
+        self._closed = False
+        self._cond = threading.Condition()
+        self._error = None
+        self._frames = deque(maxlen=max_queue)
+        self._keys = {_VIS_FUNCTIONS[v][0] for v in self.vis_list}
+
+        self._writer = threading.Thread(target=self._run)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _run(self):
+        agg = (_AggRenderer(self.vis_list, self.tile_size)
+               if self.renderer == 'agg' else None)
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._frames or self._closed)
+                    if not self._frames:
+                        return
+                    observations, step_count = self._frames.popleft()
+                frame = (agg.render(observations) if agg else render_panels(
+                    observations, self.vis_list, self.tile_size))
+                if step_count is not None:
+                    _put_label(frame, "step # %d" % step_count,
+                               (4, frame.shape[0] - 6))
+                self._write(frame)
+        except Exception as e:
+            self._error = e
+        finally:
+            if self._video is not None:
+                self._video.release()
+
+    def _write(self, frame):
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        if self._pattern is not None:
+            if not cv2.imwrite(self._pattern % self.written, frame):
+                raise IOError("Failed to write frame to '%s'" %
+                              (self._pattern % self.written))
+        else:
+            if self._video is None:
+                self._video = cv2.VideoWriter(
+                    self.output,
+                    cv2.VideoWriter_fourcc(*VIDEO_CODECS[os.path.splitext(
+                        self.output)[1].lower()]), self.fps,
+                    (frame.shape[1], frame.shape[0]))
+                if not self._video.isOpened():
+                    raise IOError("Failed to open video '%s' for writing" %
+                                  self.output)
+            self._video.write(frame)
+        self.written += 1
+
+    def close(self):
+        """Finishes rendering & writing all queued observations, & closes the
+        output
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        if self._error is not None:
+            raise self._error
 
-        # Handle empty plot
-        if len(self.vis_list) < self.axs.shape[0] * self.axs.shape[1]:
-            # Currently assume there will only ever be one empty plot
-            subplt = (self.axs.shape[0] - 1, self.axs.shape[1] - 1)
-            self.axs[subplt].axis("off")
-
-        self.update()
+    def visualise(self, observations, step_count=None):
+        """Queues observations to be rendered & written in the background.
+        Only the observations being visualised are kept (lazily loaded
+        observations are loaded now, in the calling thread).
+        """
+        if self._error is not None:
+            raise self._error
+        data = {k: observations[k] for k in self._keys}
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Cannot visualise with a closed "
+                                   "OffscreenVisualiser")
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append((data, step_count))
+            self._cond.notify_all()
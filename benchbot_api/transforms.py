@@ -0,0 +1,279 @@
+import numpy as np
+
+from .observations import PoseSet
+
+# Maximum number of distinct frame layouts whose resolution order is cached
+_MAX_CACHED_ORDERS = 64
+
+_ORDERS = {}
+
+
+def euler_to_matrices(rpy, out=None):
+    """Converts roll, pitch, & yaw angles (extrinsic 'xyz', as in the
+    'rotation_rpy' field of poses) to rotation matrices
+
+    Parameters
+    ----------
+    rpy :
+        Array of angles with shape (..., 3)
+
+    out :
+        Optional array of shape (..., 3, 3) to write the matrices into
+
+    Returns
+    -------
+    ndarray
+        Array of rotation matrices with shape (..., 3, 3)
+    """
+    rpy = np.asarray(rpy, dtype=float)
+    cr, cp, cy = np.moveaxis(np.cos(rpy), -1, 0)
+    sr, sp, sy = np.moveaxis(np.sin(rpy), -1, 0)
+    if out is None:
+        out = np.empty(rpy.shape[:-1] + (3, 3))
+    out[..., 0, 0] = cy * cp
+    out[..., 0, 1] = cy * sp * sr - sy * cr
+    out[..., 0, 2] = cy * sp * cr + sy * sr
+    out[..., 1, 0] = sy * cp
+    out[..., 1, 1] = sy * sp * sr + cy * cr
+    out[..., 1, 2] = sy * sp * cr - cy * sr
+    out[..., 2, 0] = -sp
+    out[..., 2, 1] = cp * sr
+    out[..., 2, 2] = cp * cr
+    return out
+
+
+def quaternions_to_matrices(xyzw, out=None):
+    """Converts quaternions (as in the 'rotation_xyzw' field of poses) to
+    rotation matrices. Quaternions do not need to be normalised.
+
+    Parameters
+    ----------
+    xyzw :
+        Array of quaternions with shape (..., 4)
+
+    out :
+        Optional array of shape (..., 3, 3) to write the matrices into
+
+    Returns
+    -------
+    ndarray
+        Array of rotation matrices with shape (..., 3, 3)
+    """
+    xyzw = np.asarray(xyzw, dtype=float)
+    x, y, z, w = np.moveaxis(xyzw, -1, 0)
+    s = 2.0 / np.maximum(np.sum(xyzw * xyzw, axis=-1), np.finfo(float).tiny)
+    if out is None:
+        out = np.empty(xyzw.shape[:-1] + (3, 3))
+    out[..., 0, 0] = 1 - s * (y * y + z * z)
+    out[..., 0, 1] = s * (x * y - z * w)
+    out[..., 0, 2] = s * (x * z + y * w)
+    out[..., 1, 0] = s * (x * y + z * w)
+    out[..., 1, 1] = 1 - s * (x * x + z * z)
+    out[..., 1, 2] = s * (y * z - x * w)
+    out[..., 2, 0] = s * (x * z - y * w)
+    out[..., 2, 1] = s * (y * z + x * w)
+    out[..., 2, 2] = 1 - s * (x * x + y * y)
+    return out
+
+
+def poses_to_matrices(poses):
+    """Converts every pose in a 'poses' observation to a homogeneous
+    transform, in a single vectorised call. Each transform maps points in a
+    frame to its parent frame. Rotations are taken from 'rotation_xyzw'
+    where available, then 'rotation_rpy', & are otherwise the identity.
+
+    Parameters
+    ----------
+    poses :
+        A 'poses' observation (either a dict, or a 'PoseSet')
+
+    Returns
+    -------
+    tuple
+        The tuple of frame names, the tuple of their parent frame names, & an
+        array of transforms with shape (N, 4, 4) in the order of the frames
+    """
+    if isinstance(poses, PoseSet):
+        frames, parents = poses.frames, poses.parent_frames
+        translations, xyzw = poses.translation_xyz, poses.rotation_xyzw
+        rpy = None
+    else:
+        frames = tuple(poses.keys())
+        parents = tuple(p.get('parent_frame', None) for p in poses.values())
+        translations = np.array([p['translation_xyz'] for p in poses.values()],
+                                dtype=float).reshape(-1, 3)
+        xyzw = rpy = None
+        if all('rotation_xyzw' in p for p in poses.values()):
+            xyzw = [p['rotation_xyzw'] for p in poses.values()]
+        elif all('rotation_rpy' in p for p in poses.values()):
+            rpy = [p['rotation_rpy'] for p in poses.values()]
+
+    out = np.zeros((len(frames), 4, 4))
+    out[:, 3, 3] = 1
+    out[:, :3, 3] = translations
+    if xyzw is not None:
+        quaternions_to_matrices(np.reshape(xyzw, (-1, 4)), out[:, :3, :3])
+    elif rpy is not None:
+        euler_to_matrices(np.reshape(rpy, (-1, 3)), out[:, :3, :3])
+    else:
+        # Frames are handled individually only when rotations are missing
+        # from some of them (e.g. some Supervisors omit them for 'map')
+        out[:, :3, :3] = np.eye(3)
+        for i, p in enumerate(poses.values()):
+            if 'rotation_xyzw' in p:
+                quaternions_to_matrices(p['rotation_xyzw'], out[i, :3, :3])
+            elif 'rotation_rpy' in p:
+                euler_to_matrices(p['rotation_rpy'], out[i, :3, :3])
+    return frames, parents, out
+
+
+def transform_points(transform, points, out=None):
+    """Applies homogeneous transforms to arrays of 3D points
+
+    Parameters
+    ----------
+    transform :
+        A transform with shape (4, 4), or a batch of them with shape
+        (..., 4, 4)
+
+    points :
+        Points with shape (M, 3), or a batch with shape (..., M, 3) matching
+        the batch of transforms
+
+    out :
+        Optional array to write the transformed points into (may be
+        'points' itself)
+
+    Returns
+    -------
+    ndarray
+        The transformed points, with the same shape as 'points' (& the same
+        dtype, for floating point 'points')
+    """
+    # Floating point points keep their precision (e.g. float32 clouds from
+    # depth images aren't promoted to float64)
+    points = np.asarray(points)
+    if points.dtype.kind != 'f':
+        points = points.astype(float)
+    transform = np.asarray(transform, dtype=points.dtype)
+
+    # A single transform is applied by OpenCV in one pass over the points
+    # (imported here, as OpenCV isn't needed for anything else in frame
+    # handling)
+    if (transform.ndim == 2 and points.ndim == 2
+            and points.flags.c_contiguous and
+        (out is None or
+         (out.dtype == points.dtype and out.flags.c_contiguous))):
+        import cv2
+        return cv2.transform(
+            points.reshape(-1, 1, 3), transform[:3],
+            None if out is None else out.reshape(-1, 1, 3)).reshape(-1, 3)
+
+    r = np.swapaxes(transform[..., :3, :3], -1, -2)
+    t = transform[..., None, :3, 3]
+    if out is None:
+        return np.matmul(points, r) + t
+    np.matmul(points, r, out=out)
+    out += t
+    return out
+
+
+def _resolution_order(frames, parents):
+    # Groups frames by depth in the tree, so each level is resolved with a
+    # single batched multiply against the already resolved level above
+    key = (frames, parents)
+    order = _ORDERS.get(key, None)
+    if order is not None:
+        return order
+
+    index = {f: i for i, f in enumerate(frames)}
+    depths = [None] * len(frames)
+
+    def depth(i, seen):
+        if depths[i] is None:
+            p = index.get(parents[i], None)
+            if p is None:
+                depths[i] = 0
+            elif p in seen:
+                raise ValueError("Frames %s form a cycle" %
+                                 [frames[j] for j in seen])
+            else:
+                depths[i] = depth(p, seen | {i}) + 1
+        return depths[i]
+
+    for i in range(len(frames)):
+        depth(i, {i})
+    levels = [[] for _ in range(max(depths) + 1 if depths else 0)]
+    for i, d in enumerate(depths):
+        levels[d].append(i)
+    order = (index, [(np.array(l), np.array([index[parents[i]] for i in l]))
+                     for l in levels[1:]], levels[0] if levels else [])
+    if len(_ORDERS) < _MAX_CACHED_ORDERS:
+        _ORDERS[key] = order
+    return order
+
+
+class FrameTree(object):
+    """Resolves the frames of a 'poses' observation through their
+    'parent_frame' chains, so transforms between any two frames are
+    available (e.g. from 'camera' to 'map', even when 'camera' is given
+    relative to 'robot').
+
+    Every frame is resolved to its root frame (the parent outside of the
+    observation, typically 'map') up front with one batched multiply per
+    level of the tree. The order frames are resolved in is cached per set of
+    frames, & transforms between pairs of frames are cached per tree.
+
+    Parameters
+    ----------
+    poses :
+        A 'poses' observation (either a dict, or a 'PoseSet')
+    """
+    def __init__(self, poses):
+        self.frames, self.parent_frames, local = poses_to_matrices(poses)
+        self._index, levels, roots = _resolution_order(self.frames,
+                                                       self.parent_frames)
+        self._roots = {self.parent_frames[i] for i in roots}
+        self._cache = {}
+
+        # Resolve every frame relative to its root in place, a level at a time
+        m = self.root_matrices = local
+        for idx, parent_idx in levels:
+            m[idx] = np.matmul(m[parent_idx], m[idx])
+
+    def _root_matrix(self, frame):
+        if frame in self._index:
+            return self.root_matrices[self._index[frame]]
+        elif frame in self._roots:
+            return np.eye(4)
+        raise KeyError("Frame '%s' is not in the frame tree" % frame)
+
+    def _root_of(self, frame):
+        while frame in self._index:
+            frame = self.parent_frames[self._index[frame]]
+        return frame
+
+    def matrix(self, frame, relative_to='map'):
+        """Returns the transform mapping points in 'frame' to points in frame
+        'relative_to'
+
+        Returns
+        -------
+        ndarray
+            The (4, 4) homogeneous transform
+        """
+        key = (frame, relative_to)
+        m = self._cache.get(key, None)
+        if m is None:
+            if self._root_of(frame) != self._root_of(relative_to):
+                raise ValueError("Frames '%s' & '%s' are not connected" %
+                                 (frame, relative_to))
+            m = self._cache[key] = np.linalg.solve(
+                self._root_matrix(relative_to), self._root_matrix(frame))
+        return m
+
+    def transform_points(self, points, frame, relative_to='map', out=None):
+        """Transforms points from 'frame' to frame 'relative_to' (see
+        'transform_points()' for details of the arguments)
+        """
+        return transform_points(self.matrix(frame, relative_to), points, out)
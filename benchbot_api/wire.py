@@ -0,0 +1,237 @@
+"""Binary wire format for sending observations between a BenchBot Supervisor
+and the API, without the base64 & JSON overheads of jsonpickle.
+
+A message is laid out as follows (all integers little-endian):
+
+    MAGIC | uint32 header length | header | padding | array buffers
+
+The header is the jsonpickle encoding of the message, with every numeric
+NumPy array replaced by a placeholder describing where its raw buffer sits
+(relative to the start of the array buffers), its dtype, & its shape. Every
+buffer is aligned to ALIGNMENT bytes, so arrays are decoded as 'np.frombuffer'
+views of the received message rather than copies.
+
+The API requests this format by listing CONTENT_TYPE in its 'Accept' header.
+Supervisors without support simply respond with JSON, which is decoded with
+jsonpickle as before.
+"""
+from collections.abc import Mapping
+import json
+import jsonpickle
+import jsonpickle.ext.numpy as jet
+import numpy as np
+import struct
+
+jet.register_handlers()
+
+CONTENT_TYPE = 'application/x-benchbot-ndarray'
+
+MAGIC = b'BBND'
+ALIGNMENT = 64
+
+_ARRAY_KEY = '__ndarray__'
+_HEADER_LENGTH = struct.Struct('<I')
+
+
+def _pad(n):
+    return -n % ALIGNMENT
+
+
+def strip_arrays(obj, buffers, offset=0):
+    """Replaces every numeric array in an object with a placeholder
+    describing where its buffer will be stored (this is how headers are
+    built, but is also useful for other array storage)
+
+    Parameters
+    ----------
+    obj :
+        The object containing arrays (nested in dicts, lists, or tuples).
+        Any other mappings (e.g. the compact observation types) are replaced
+        by plain dicts
+
+    buffers :
+        A list, which (offset, array) tuples are appended to for each array
+        replaced. Each array is C-contiguous, & each offset is aligned
+
+    offset :
+        The offset the first array buffer will be stored at
+
+    Returns
+    -------
+    tuple
+        The object with arrays replaced, & the offset after the last buffer
+    """
+    if isinstance(obj, np.ndarray) and not obj.dtype.hasobject:
+        a = np.require(obj, requirements='C')
+        buffers.append((offset, a))
+        return ({
+            _ARRAY_KEY: [offset, a.dtype.str, list(a.shape)]
+        }, offset + a.nbytes + _pad(a.nbytes))
+    elif isinstance(obj, Mapping):
+        out = {}
+        for k, v in obj.items():
+            out[k], offset = strip_arrays(v, buffers, offset)
+        return out, offset
+    elif isinstance(obj, (list, tuple)):
+        out = []
+        for v in obj:
+            v, offset = strip_arrays(v, buffers, offset)
+            out.append(v)
+        return (tuple(out) if isinstance(obj, tuple) else out), offset
+    return obj, offset
+
+
+def restore_arrays(obj, data):
+    """Replaces every placeholder created by 'strip_arrays()' with a view of
+    the array's buffer in 'data'
+
+    Parameters
+    ----------
+    obj :
+        The object containing placeholders
+
+    data :
+        A bytes-like object (e.g. a bytearray, or a memory map) holding the
+        array buffers at the offsets described by the placeholders
+
+    Returns
+    -------
+    object
+        The object with arrays restored
+    """
+    if isinstance(obj, dict):
+        if _ARRAY_KEY in obj and len(obj) == 1:
+            offset, dtype, shape = obj[_ARRAY_KEY]
+            return np.frombuffer(data,
+                                 dtype=np.dtype(dtype),
+                                 count=int(np.prod(shape)),
+                                 offset=offset).reshape(shape)
+        return {k: restore_arrays(v, data) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [restore_arrays(v, data) for v in obj]
+    elif isinstance(obj, tuple):
+        return tuple(restore_arrays(v, data) for v in obj)
+    return obj
+
+
+def buffer_size(obj):
+    """Returns the total size in bytes of the array buffers described by the
+    placeholders in an object (see 'strip_arrays()')
+    """
+    if isinstance(obj, dict):
+        if _ARRAY_KEY in obj and len(obj) == 1:
+            _, dtype, shape = obj[_ARRAY_KEY]
+            return np.dtype(dtype).itemsize * int(np.prod(shape))
+        return sum(buffer_size(v) for v in obj.values())
+    elif isinstance(obj, (list, tuple)):
+        return sum(buffer_size(v) for v in obj)
+    return 0
+
+
+def split(buf):
+    """Splits a message in the binary wire format into its header, parsed as
+    JSON but not yet restored by jsonpickle, & a view of its array buffers.
+    This allows parts of a message to be decoded separately (see
+    'decode()').
+
+    Parameters
+    ----------
+    buf :
+        A bytes-like object holding the entire message
+
+    Returns
+    -------
+    tuple
+        The parsed header, & the view of the array buffers
+    """
+    view = memoryview(buf)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Received data is not in the BenchBot binary wire "
+                         "format (bad magic bytes)")
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    header_length, = _HEADER_LENGTH.unpack_from(view, len(MAGIC))
+    header = json.loads(bytes(view[start:start + header_length]))
+    start += header_length
+    return header, view[start + _pad(start):]
+
+
+def decode(buf):
+    """Decodes a message in the binary wire format. Arrays in the returned
+    object are views of 'buf' (so they are writable if 'buf' is writable,
+    e.g. a bytearray)
+
+    Parameters
+    ----------
+    buf :
+        A bytes-like object holding the entire message
+
+    Returns
+    -------
+    object
+        The decoded message
+    """
+    header, data = split(buf)
+    return restore_arrays(jsonpickle.Unpickler().restore(header), data)
+
+
+def encode(obj):
+    """Encodes an object in the binary wire format
+
+    Parameters
+    ----------
+    obj :
+        The object to encode (anything supported by jsonpickle)
+
+    Returns
+    -------
+    bytes
+        The encoded message
+    """
+    buffers = []
+    header, _ = strip_arrays(obj, buffers)
+    header = jsonpickle.encode(header).encode('utf-8')
+    start = len(MAGIC) + _HEADER_LENGTH.size + len(header)
+    return b''.join([
+        MAGIC,
+        _HEADER_LENGTH.pack(len(header)), header, b'\0' * _pad(start)
+    ] + buffer_parts(buffers))
+
+
+def buffer_parts(buffers):
+    """Returns the list of bytes-like parts that lay out the buffers from
+    'strip_arrays()' contiguously (including alignment padding)
+    """
+    parts = []
+    for _, a in buffers:
+        parts.extend([a.reshape(-1).view(np.uint8), b'\0' * _pad(a.nbytes)])
+    return parts
+
+
+def read_response(resp):
+    """Reads the body of a streamed requests response into a single writable
+    buffer, without the intermediate copies made by 'resp.content'
+
+    Parameters
+    ----------
+    resp :
+        A requests Response, made with 'stream=True'
+
+    Returns
+    -------
+    bytearray
+        The body of the response
+    """
+    length = resp.headers.get('Content-Length', None)
+    if length is None or resp.headers.get('Content-Encoding', None):
+        return bytearray(resp.content)
+    buf = bytearray(int(length))
+    view = memoryview(buf)
+    n = 0
+    while n < len(buf):
+        r = resp.raw.readinto(view[n:])
+        if not r:
+            raise IOError("Response ended after %d of %d bytes" %
+                          (n, len(buf)))
+        n += r
+    resp.raw.release_conn()
+    return buf
@@ -0,0 +1,129 @@
+"""Microbenchmark of the image callbacks in 'benchbot_api.api_callbacks', for
+every supported image encoding. Each callback is timed as it was before
+frames were converted in place (allocating a new frame for every call),
+converting in place, & decoding into a reused caller buffer ('out='), with
+the peak memory allocated per call.
+
+Run from the root of the repository:
+    python benchmarks/api_callbacks.py [--calls N] [--width W] [--height H]
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchbot_api import api_callbacks
+
+# Encodings of raw frames, as (encoding, channels, dtype)
+RAW_ENCODINGS = [('rgb8', 3, np.uint8), ('bgr8', 3, np.uint8),
+                 ('mono8', 1, np.uint8), ('16UC1', 1, np.uint16),
+                 ('32FC1', 1, np.float32)]
+
+# Encodings of compressed frames
+COMPRESSED_ENCODINGS = ['rgb8', 'bgr8']
+
+
+def old_convert_to_rgb(data):
+    # Before frames were converted in place
+    cvt = api_callbacks.ENCODING_TO_CONVERSION.get(data['encoding'], None)
+    return data['data'] if cvt is None else cv2.cvtColor(data['data'], cvt)
+
+
+def old_decode_color_image(data):
+    # Before frames were converted in place (with the copy 'np.fromstring'
+    # made, as it no longer decodes binary data in NumPy 2)
+    return old_convert_to_rgb({
+        'encoding':
+            data['encoding'],
+        'data':
+            cv2.imdecode(
+                np.frombuffer(base64.b64decode(data['data']),
+                              np.uint8).copy(), cv2.IMREAD_COLOR)
+    })
+
+
+def raw_frame(encoding, channels, dtype, size):
+    rng = np.random.default_rng(0)
+    shape = size + ((channels, ) if channels > 1 else ())
+    if np.issubdtype(dtype, np.floating):
+        return {'encoding': encoding, 'data': rng.random(shape, dtype=dtype)}
+    return {
+        'encoding': encoding,
+        'data': rng.integers(0, np.iinfo(dtype).max, shape, dtype=dtype)
+    }
+
+
+def compressed_frame(encoding, size):
+    # A smooth frame, as random noise would barely compress
+    rows, cols = np.mgrid[0:size[0], 0:size[1]]
+    frame = np.stack([rows % 256, cols % 256, (rows + cols) // 8 % 256],
+                     axis=2).astype(np.uint8)
+    return {
+        'encoding': encoding,
+        'data': base64.b64encode(cv2.imencode('.png', frame)[1].tobytes())
+    }
+
+
+def measure(fn, make_data, calls):
+    # Data is created outside the timed region, as each call may convert its
+    # input in place
+    data = [make_data() for _ in range(calls)]
+    t = time.perf_counter()
+    for d in data:
+        fn(d)
+    t = (time.perf_counter() - t) / calls
+
+    d = make_data()
+    tracemalloc.start()
+    fn(d)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return t, peak
+
+
+def report(name, fns, make_data, calls):
+    print("%s:" % name)
+    for description, fn in fns:
+        t, peak = measure(fn, make_data, calls)
+        print("\t%-10s %8.3f ms/call, %6.2f MB peak/call" %
+              (description + ':', t * 1e3, peak / 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=50)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    args = parser.parse_args()
+    size = (args.height, args.width)
+
+    for encoding, channels, dtype in RAW_ENCODINGS:
+        frame = raw_frame(encoding, channels, dtype, size)
+        out = np.empty_like(frame['data'])
+        report(
+            "convert_to_rgb %s" % encoding,
+            [('old', old_convert_to_rgb),
+             ('in place', api_callbacks.convert_to_rgb),
+             ('out=', lambda d: api_callbacks.convert_to_rgb(d, out=out))],
+            lambda: dict(frame, data=frame['data'].copy()), args.calls)
+
+    for encoding in COMPRESSED_ENCODINGS:
+        frame = compressed_frame(encoding, size)
+        out = np.empty(size + (3, ), dtype=np.uint8)
+        report("decode_color_image %s" % encoding,
+               [('old', old_decode_color_image),
+                ('in place', api_callbacks.decode_color_image),
+                ('out=',
+                 lambda d: api_callbacks.decode_color_image(d, out=out))],
+               lambda: frame, max(args.calls // 5, 1))
+
+
+if __name__ == '__main__':
+    main()
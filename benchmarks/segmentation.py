@@ -0,0 +1,125 @@
+"""Compares colouring instance segmentation images for visualisation (the
+striped class & instance layers drawn by 'benchbot_api.tools') against the
+per-instance loop it replaced, for synthetic 1280x720 segment images with
+increasing numbers of instances.
+
+Run from the root of the repository:
+    python benchmarks/segmentation.py [--repeats N] [--width W] [--height H]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchbot_api import tools
+
+# Numbers of instances in the segment images compared, as (rows, columns) of
+# rectangular instances tiling the image
+INSTANCE_GRIDS = [(4, 5), (10, 16), (24, 40)]
+
+# Number of object classes instances are drawn from
+NUM_CLASSES = 30
+
+
+def old_create_diag_mask(mask_img, num_lines=7):
+    diag_mask = np.zeros(mask_img.shape, bool)
+    img_width = diag_mask.shape[1]
+    line_width = max([np.min(diag_mask.shape) // num_lines, 1])
+    bool_line = np.tile(
+        np.append(np.ones(line_width, bool), np.zeros(line_width, bool)),
+        (img_width * 2 // (line_width * 2)) + 2)
+    for row_id in np.arange(diag_mask.shape[0]):
+        start_idx = img_width - row_id % img_width
+        if (row_id // img_width) > 0 and (row_id // img_width) % 2 == 1:
+            start_idx += line_width
+        diag_mask[row_id, :] = bool_line[start_idx:(start_idx + img_width)]
+    return np.logical_and(mask_img, diag_mask)
+
+
+def old_get_roi(img_mask):
+    a = np.where(img_mask != 0)
+    return np.min(a[0]), np.max(a[0]) + 1, np.min(a[1]), np.max(a[1]) + 1
+
+
+def old_inst_segment_layers(segment_data):
+    # Before the diagonal masks were made for every instance at once
+    inst_segment_img = segment_data['instance_segment_img']
+    diagonal_mask_img = np.zeros(inst_segment_img.shape, bool)
+    for inst_id in np.unique(inst_segment_img):
+        inst_mask_img = inst_segment_img == inst_id
+        y0, y1, x0, x1 = old_get_roi(inst_mask_img)
+        inst_diag_mask = old_create_diag_mask(inst_mask_img[y0:y1, x0:x1])
+        diagonal_mask_img[y0:y1, x0:x1] = np.logical_or(
+            diagonal_mask_img[y0:y1, x0:x1], inst_diag_mask)
+
+    class_segment_img = segment_data['class_segment_img']
+    num_class_colours = len(segment_data['class_ids']) + 1
+    masked_inst_class = np.ma.masked_where(
+        np.logical_or(class_segment_img == 0,
+                      np.logical_not(diagonal_mask_img)), class_segment_img)
+    inst_id_img = inst_segment_img % 1000
+    masked_inst_segment = np.ma.masked_where(
+        np.logical_or(inst_id_img == 0, diagonal_mask_img), inst_id_img)
+    return ((masked_inst_class, (1, num_class_colours)),
+            (masked_inst_segment, (1, max(np.amax(inst_id_img), 1))))
+
+
+def segment_data(grid, size):
+    # Rectangular instances tiling the image (with roughly a tenth left
+    # unlabelled), with IDs in the Supervisor's CCIII format
+    rng = np.random.default_rng(0)
+    n = grid[0] * grid[1]
+    classes = rng.integers(1, NUM_CLASSES + 1, n)
+    classes[rng.random(n) < 0.1] = 0
+    ids = np.where(classes > 0, classes * 1000 + np.arange(1, n + 1) % 1000,
+                   0).reshape(grid)
+    rows = np.arange(size[0]) * grid[0] // size[0]
+    cols = np.arange(size[1]) * grid[1] // size[1]
+    inst = ids[rows[:, None], cols[None, :]].astype(np.uint16)
+    return {
+        'class_segment_img': (inst // 1000).astype(np.uint8),
+        'instance_segment_img': inst,
+        'class_ids': {'class_%d' % i: i for i in range(1, NUM_CLASSES + 1)}
+    }
+
+
+def timed(fn, repeats, *args):
+    fn(*args)
+    t = time.perf_counter()
+    for _ in range(repeats):
+        fn(*args)
+    return (time.perf_counter() - t) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    args = parser.parse_args()
+    size = (args.height, args.width)
+
+    print("Colouring %dx%d instance segment images:" % (size[1], size[0]))
+    for grid in INSTANCE_GRIDS:
+        data = segment_data(grid, size)
+        count = len(np.unique(data['instance_segment_img']))
+
+        # Both colour every labelled pixel identically, as instances here
+        # never share bounding boxes
+        old = old_inst_segment_layers(data)
+        new = tools._inst_segment_layers(data)
+        same = all(
+            np.array_equal(np.ma.getmaskarray(a[0]), np.ma.getmaskarray(b[0]))
+            for a, b in zip(old, new))
+        print("\t%4d instances: loop %8.2f ms, vectorised %7.2f ms%s" %
+              (count, timed(old_inst_segment_layers, args.repeats, data) * 1e3,
+               timed(tools._inst_segment_layers, args.repeats, data) * 1e3,
+               "" if same else " (LAYERS DIFFER)"))
+
+
+if __name__ == '__main__':
+    main()
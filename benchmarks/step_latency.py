@@ -0,0 +1,100 @@
+"""Measures the per-step latency of 'BenchBot.step()' against a local
+stand-in Supervisor (see 'tests/supervisor.py'), comparing a new connection
+per query (as before queries shared a pooled session) with the pooled
+keep-alive session, & checking per-route timeouts are honoured.
+
+Run from the root of the repository:
+    python benchmarks/step_latency.py [--steps N] [--latency SECONDS]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchbot_api import BenchBot
+from supervisor import StandInSupervisor
+
+# Configurations compared, as (description, BenchBot arguments, whether each
+# query opens a new connection, whether the Supervisor has a batch route)
+CONFIGURATIONS = [
+    ("new connection per query", {
+        'batch_queries': False,
+        'binary_transport': False
+    }, True, False),
+    ("pooled session", {
+        'batch_queries': False,
+        'binary_transport': False
+    }, False, False),
+    ("pooled session, default settings", {}, False, True),
+]
+
+
+def _benchbot(supervisor, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return BenchBot(supervisor_address=supervisor.address, **kwargs)
+
+
+def step_latency(supervisor, steps, kwargs, close_connections):
+    bb = _benchbot(supervisor, **kwargs)
+    if close_connections:
+        # The Supervisor closes the connection after every response
+        bb._session.headers['Connection'] = 'close'
+    with contextlib.redirect_stdout(io.StringIO()):
+        bb.reset()
+        bb.step('move_next')
+        supervisor.counts.clear()
+        t = time.perf_counter()
+        for _ in range(steps):
+            bb.step('move_next')
+        t = time.perf_counter() - t
+    return t / steps, sum(supervisor.counts.values()) / steps
+
+
+def timeout_latency(supervisor, timeout):
+    # Time for a query of a slow route to fail, given a per-route timeout
+    bb = _benchbot(supervisor,
+                   retries=0,
+                   route_timeouts={'robot/is_collided': timeout})
+    supervisor.latency = 4 * timeout
+    t = time.perf_counter()
+    try:
+        bb._query('is_collided', BenchBot.RouteType.ROBOT)
+        raise AssertionError("Query didn't time out")
+    except requests.ConnectionError:
+        return time.perf_counter() - t
+    finally:
+        supervisor.latency = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--latency',
+                        type=float,
+                        default=0,
+                        help="Seconds the Supervisor delays each response")
+    args = parser.parse_args()
+
+    with StandInSupervisor(max_steps=10**9) as supervisor:
+        supervisor.latency = args.latency
+        for description, kwargs, close_connections, batch in CONFIGURATIONS:
+            supervisor.features['batch'] = batch
+            t, n = step_latency(supervisor, args.steps, kwargs,
+                                close_connections)
+            print("%-36s %7.2f ms/step, %4.1f queries/step" %
+                  (description + ':', t * 1e3, n))
+        supervisor.latency = 0
+        print("%-36s %7.2f s (route timeout 0.25 s)" %
+              ("slow route failed after:", timeout_latency(supervisor,
+                                                           0.25)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Compares 'benchbot_api.transforms' against the per-frame scipy path it
+replaced (a 'Rotation' built per frame, with '.apply()' called for each of
+the frame's three axes, as the pose visualiser did), for resolving every
+frame of a 'poses' observation & for transforming point clouds between
+frames.
+
+Run from the root of the repository:
+    python benchmarks/transforms.py [--repeats N] [--points N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchbot_api.observations import PoseSet
+from benchbot_api.transforms import FrameTree
+
+# Numbers of frames in the 'poses' observations compared
+FRAME_COUNTS = [2, 10, 100]
+
+
+def random_poses(n):
+    # A chain of frames, each given relative to the one before it
+    rng = np.random.default_rng(0)
+    r = Rotation.random(n, random_state=0)
+    return {
+        'frame_%d' % i: {
+            'parent_frame': 'map' if i == 0 else 'frame_%d' % (i - 1),
+            'translation_xyz': rng.uniform(-1, 1, 3),
+            'rotation_rpy': rpy,
+            'rotation_xyzw': xyzw
+        }
+        for i, (rpy, xyzw) in enumerate(zip(r.as_euler('xyz'), r.as_quat()))
+    }
+
+
+def scipy_axes(poses):
+    # The axes of every frame in the map frame, a frame at a time with scipy
+    axes, rotations, origins = {}, {}, {}
+    for f, p in poses.items():
+        r = Rotation.from_euler('xyz', p['rotation_rpy'])
+        o = np.asarray(p['translation_xyz'])
+        if p['parent_frame'] in rotations:
+            o = (rotations[p['parent_frame']].apply(o) +
+                 origins[p['parent_frame']])
+            r = rotations[p['parent_frame']] * r
+        rotations[f], origins[f] = r, o
+        axes[f] = (o, r.apply([1, 0, 0]), r.apply([0, 1, 0]),
+                   r.apply([0, 0, 1]))
+    return axes
+
+
+def tree_axes(poses):
+    tree = FrameTree(poses)
+    m = tree.root_matrices
+    return m[:, :3, 3], m[:, :3, :3]
+
+
+def timed(fn, repeats, *args):
+    fn(*args)
+    t = time.perf_counter()
+    for _ in range(repeats):
+        fn(*args)
+    return (time.perf_counter() - t) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--points', type=int, default=100000)
+    args = parser.parse_args()
+
+    print("Resolving every frame to the map frame:")
+    for n in FRAME_COUNTS:
+        poses = random_poses(n)
+        compact = PoseSet.from_dict(poses)
+        print("\t%3d frames: scipy %8.1f us, FrameTree %6.1f us (dict), "
+              "%6.1f us (PoseSet)" %
+              (n, timed(scipy_axes, args.repeats, poses) * 1e6,
+               timed(tree_axes, args.repeats, poses) * 1e6,
+               timed(tree_axes, args.repeats, compact) * 1e6))
+
+    poses = random_poses(FRAME_COUNTS[-1])
+    points = np.random.default_rng(1).uniform(-5, 5, (args.points, 3))
+    frame = 'frame_%d' % (FRAME_COUNTS[-1] - 1)
+    axes = scipy_axes(poses)[frame]
+    r = Rotation.from_matrix(np.stack(axes[1:], axis=1))
+    tree = FrameTree(poses)
+    out = np.empty_like(points)
+    repeats = max(args.repeats // 10, 1)
+    print("Transforming %d points from '%s' to the map frame:" %
+          (args.points, frame))
+    print("\tscipy %.2f ms, transform_points %.2f ms (%.2f ms with out=)" %
+          (timed(lambda: r.apply(points) + axes[0], repeats) * 1e3,
+           timed(tree.transform_points, repeats, points, frame) * 1e3,
+           timed(lambda: tree.transform_points(points, frame, out=out),
+                 repeats) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
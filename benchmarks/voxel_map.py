@@ -0,0 +1,142 @@
+"""Measures the time 'mapping.VoxelMap' takes to fuse each frame of a long
+synthetic trajectory (depth images from a camera on a robot driving loops
+of a room), & how that time & the map's size grow over the trajectory.
+For comparison it also times fusing the same points (hits only, without
+raycasting) into a plain dict of voxels & into a VoxelMap, over the start
+of the trajectory.
+
+Run from the root of the repository:
+    python benchmarks/voxel_map.py [--frames N] [--resolution METRES]
+        [--stride N] [--max-voxels N] [--no-raycast]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchbot_api import geometry
+from benchbot_api.mapping import LOG_ODDS_HIT, LOG_ODDS_LIMITS, VoxelMap
+from benchbot_api.transforms import FrameTree
+
+IMAGE_SIZE = (480, 640)
+
+INTRINSICS = [[320., 0., 320.], [0., 320., 240.], [0., 0., 1.]]
+
+# Radius of the loop the robot drives, & the distance it moves per frame
+LOOP_RADIUS = 3.0
+STEP_DISTANCE = 0.05
+
+# Frames the dict of voxels is timed over
+REFERENCE_FRAMES = 20
+
+# Frames each row of the report covers
+REPORT_PERIOD = 100
+
+
+def trajectory(frames, stride):
+    """Yields (depth image, poses) for each frame of the trajectory"""
+    rng = np.random.default_rng(0)
+    rows, cols = np.mgrid[0:IMAGE_SIZE[0]:stride, 0:IMAGE_SIZE[1]:stride]
+    for f in range(frames):
+        a = f * STEP_DISTANCE / LOOP_RADIUS
+        # A smooth surface 1-4 m from the camera, varying along the loop
+        depth = (2.5 + np.sin(cols / 90. + a) + 0.5 * np.cos(rows / 70. - a) +
+                 rng.normal(0, 0.01, rows.shape)).astype(np.float32)
+        yield depth, {
+            'robot': {
+                'parent_frame': 'map',
+                'translation_xyz': [
+                    LOOP_RADIUS * np.cos(a), LOOP_RADIUS * np.sin(a), 0.
+                ],
+                'rotation_rpy': [0., 0., a + np.pi / 2]
+            },
+            'camera': {
+                'parent_frame': 'robot',
+                'translation_xyz': [0., 0., 1.],
+                'rotation_rpy': [0., 0., 0.]
+            }
+        }
+
+
+def intrinsics(stride):
+    # Intrinsics of the depth images, which are sampled every 'stride' pixels
+    k = np.array(INTRINSICS)
+    k[:2] /= stride
+    return k
+
+
+def hits_only(frames, stride, resolution):
+    # Fuses hits one voxel at a time into a dict (as an agent without the
+    # map would), & into a VoxelMap without raycasting
+    voxels = {}
+    m = VoxelMap(resolution=resolution, raycast=False)
+    k = intrinsics(stride)
+    t_dict = 0
+    t_map = 0
+    for depth, poses in trajectory(frames, stride):
+        points = geometry.depth_to_map_points(depth, k, FrameTree(poses),
+                                              'camera').reshape(-1, 3)
+        t = time.perf_counter()
+        for c in set(
+                map(tuple,
+                    np.floor(points / resolution).astype(int).tolist())):
+            voxels[c] = min(voxels.get(c, 0) + LOG_ODDS_HIT,
+                            LOG_ODDS_LIMITS[1])
+        t_dict += time.perf_counter() - t
+        t = time.perf_counter()
+        m.integrate_points(points, poses['robot']['translation_xyz'])
+        t_map += time.perf_counter() - t
+    assert len(m) == len(voxels)
+    return t_dict / frames, t_map / frames, len(voxels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--resolution', type=float, default=0.05)
+    parser.add_argument('--stride',
+                        type=int,
+                        default=4,
+                        help="Only every N-th pixel of each axis is fused")
+    parser.add_argument('--max-voxels', type=int, default=None)
+    parser.add_argument('--no-raycast', action='store_true')
+    args = parser.parse_args()
+
+    m = VoxelMap(resolution=args.resolution,
+                 max_voxels=args.max_voxels,
+                 raycast=not args.no_raycast)
+    print("%d frames of %d points, %g m voxels, raycast %s:" %
+          (args.frames, (IMAGE_SIZE[0] // args.stride) *
+           (IMAGE_SIZE[1] // args.stride), args.resolution, m.raycast))
+    k = intrinsics(args.stride)
+    total = 0
+    period = 0
+    for f, (depth, poses) in enumerate(trajectory(args.frames, args.stride)):
+        t = time.perf_counter()
+        m.integrate_depth(depth, k, poses, 'camera')
+        period += time.perf_counter() - t
+        if (f + 1) % REPORT_PERIOD == 0 or f + 1 == args.frames:
+            n = (f % REPORT_PERIOD) + 1
+            print("\tframes %5d-%5d: %8.2f ms/frame, %9d voxels, "
+                  "%7.1f MB table" %
+                  (f + 2 - n, f + 1, period / n * 1e3, len(m),
+                   (m._index.keys.nbytes + m._log_odds.nbytes +
+                    m._updated.nbytes) / 1e6))
+            total += period
+            period = 0
+    print("\tTotal: %.2f s (%.2f ms/frame)" %
+          (total, total / args.frames * 1e3))
+
+    frames = min(REFERENCE_FRAMES, args.frames)
+    t_dict, t_map, n = hits_only(frames, args.stride, args.resolution)
+    print("Hits only, first %d frames (%d voxels):" % (frames, n))
+    print("\tdict of voxels: %8.2f ms/frame" % (t_dict * 1e3))
+    print("\tVoxelMap:       %8.2f ms/frame" % (t_map * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Compares decoding observations sent with jsonpickle against the binary
+wire format (see 'benchbot_api.wire'), for 640x480 & 1280x720 frames served
+by a local stand-in Supervisor (see 'tests/supervisor.py'). For each, it
+reports the time spent decoding responses per step, the whole step time, &
+the peak memory allocated while taking a step.
+
+Run from the root of the repository:
+    python benchmarks/wire_decode.py [--steps N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchbot_api import BenchBot
+from supervisor import StandInSupervisor
+
+# Image sizes compared, as (height, width)
+IMAGE_SIZES = [(480, 640), (720, 1280)]
+
+# Transports compared, as (description, whether the binary format is used)
+TRANSPORTS = [("jsonpickle", False), ("binary", True)]
+
+
+def decode_stats(size, binary, steps):
+    with StandInSupervisor(binary=binary,
+                           max_steps=10**9,
+                           image_size=size) as supervisor, \
+            contextlib.redirect_stdout(io.StringIO()):
+        bb = BenchBot(supervisor_address=supervisor.address,
+                      binary_transport=binary,
+                      batch_queries=False,
+                      instrument=True)
+        bb.reset()
+        bb.step('move_next')
+        bb.stats.reset()
+        t = time.perf_counter()
+        for _ in range(steps):
+            bb.step('move_next')
+        t = time.perf_counter() - t
+        routes = bb.stats.summary()['routes']
+        decode = sum(r['decode']['total'] for r in routes.values())
+        nbytes = sum(r['bytes'] for r in routes.values())
+
+        # Peak memory is measured separately, as tracing slows everything
+        tracemalloc.start()
+        bb.step('move_next')
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return decode / steps, t / steps, nbytes / steps, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--steps', type=int, default=50)
+    args = parser.parse_args()
+
+    for size in IMAGE_SIZES:
+        print("%dx%d frames:" % (size[1], size[0]))
+        for description, binary in TRANSPORTS:
+            decode, step, nbytes, peak = decode_stats(size, binary,
+                                                      args.steps)
+            print("\t%-12s %7.2f ms decode/step, %7.2f ms/step, "
+                  "%6.1f MB received/step, %6.1f MB peak/step" %
+                  (description + ':', decode * 1e3, step * 1e3,
+                   nbytes / 1e6, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
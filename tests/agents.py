@@ -0,0 +1,77 @@
+import copy
+import json
+from collections.abc import Mapping
+
+import numpy as np
+
+from benchbot_api import Agent
+
+
+class SaveObjectsAgent(Agent):
+    """Takes the first available action until each scene is done, adding an
+    object to the results for every step taken
+    """
+    def __init__(self):
+        self.steps = 0
+
+    def is_done(self, action_result):
+        return action_result.name != 'SUCCESS'
+
+    def pick_action(self, observations, action_list):
+        self.steps += 1
+        return action_list[0], {}
+
+    def save_result(self, filename, empty_results, results_format_fns):
+        empty_results['results']['objects'] = [
+            results_format_fns['create_object'](centroid=[i, 0, 0])
+            for i in range(self.steps)
+        ]
+        with open(filename, 'w') as f:
+            json.dump(empty_results, f)
+
+    def save_result_chunk(self, results_writer, scene, results_format_fns):
+        results_writer.write_chunk(
+            scene,
+            append={
+                'objects': [
+                    results_format_fns['create_object'](centroid=[scene, 0, 0])
+                ]
+            })
+
+
+class RecordingAgent(SaveObjectsAgent):
+    """Keeps a copy of every set of observations & available actions it is
+    given, reading only the observations in 'reads' (all if None)
+    """
+    def __init__(self, reads=None):
+        super(RecordingAgent, self).__init__()
+        self.reads = reads
+        self.seen = []
+
+    def pick_action(self, observations, action_list):
+        self.seen.append(({
+            k: copy.deepcopy(observations[k])
+            for k in (observations if self.reads is None else self.reads)
+        }, list(action_list)))
+        return super(RecordingAgent, self).pick_action(observations,
+                                                       action_list)
+
+    def save_result(self, filename, empty_results, results_format_fns):
+        # Results functions are unavailable in a replay
+        with open(filename, 'w') as f:
+            json.dump(empty_results, f)
+
+
+def assert_same(a, b):
+    """Asserts observations are the same, down to array dtypes & shapes"""
+    if isinstance(a, np.ndarray):
+        assert isinstance(b, np.ndarray)
+        assert a.dtype == b.dtype and a.shape == b.shape
+        assert np.array_equal(a, b)
+    elif isinstance(a, Mapping):
+        assert isinstance(b, Mapping)
+        assert sorted(a) == sorted(b)
+        for k in a:
+            assert_same(a[k], b[k])
+    else:
+        assert a == b
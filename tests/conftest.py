@@ -0,0 +1,9 @@
+import pytest
+
+from supervisor import StandInSupervisor
+
+
+@pytest.fixture
+def supervisor():
+    with StandInSupervisor() as s:
+        yield s
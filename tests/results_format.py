@@ -0,0 +1,16 @@
+# Results format functions importable by tests, matching those the stand-in
+# Supervisor runs remotely
+
+
+def create():
+    return {'objects': [], 'class_list': ['bottle']}
+
+
+def create_object(*args, **kwargs):
+    o = {'class': 'bottle', 'extent': [1, 1, 1], 'centroid': [0, 0, 0]}
+    o.update(kwargs)
+    return o
+
+
+def scored(score=1.0):
+    return {'score': score}
@@ -0,0 +1,301 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jsonpickle
+import jsonpickle.ext.numpy as jet
+import numpy as np
+
+jet.register_handlers()
+
+IMAGE_SIZE = (48, 64)
+
+OBSERVATIONS = ['image_rgb', 'image_depth', 'laser', 'poses']
+
+CONNECTIONS = {
+    'image_rgb': {
+        'callback_api': 'api_callbacks.convert_to_rgb'
+    },
+    'image_depth': {},
+    'laser': {},
+    'poses': {},
+    'move_next': {}
+}
+
+
+def results_create():
+    return {'objects': [], 'class_list': ['bottle']}
+
+
+def results_create_object(*args, **kwargs):
+    o = {'class': 'bottle', 'extent': [1, 1, 1], 'centroid': [0, 0, 0]}
+    o.update(kwargs)
+    return o
+
+
+class StandInSupervisor(object):
+    """A minimal BenchBot Supervisor served locally over HTTP, for testing &
+    benchmarking the API without a simulator. It runs 'scenes' scenes of
+    'max_steps' steps each, with the single action 'move_next'.
+
+    Parameters
+    ----------
+    batch :
+        Whether the batch route is available
+
+    binary :
+        Whether observations are sent in the binary wire format when asked
+
+    stream :
+        Whether the Server-Sent Events stream route is available
+
+    latency :
+        Seconds every request is delayed by before being answered
+
+    scenes :
+        Number of scenes in the run
+
+    max_steps :
+        Number of steps before a scene is finished
+
+    image_size :
+        (height, width) of the images observed
+    """
+    def __init__(self,
+                 batch=False,
+                 binary=False,
+                 stream=False,
+                 latency=0,
+                 scenes=2,
+                 max_steps=5,
+                 image_size=IMAGE_SIZE):
+        self.features = {'batch': batch, 'binary': binary, 'stream': stream}
+        self.latency = latency
+        self.scenes = scenes
+        self.max_steps = max_steps
+        self.counts = {}
+        self.state = {
+            'collided': False,
+            'dirty': False,
+            'finished': False,
+            'scene': 0,
+            'steps': 0
+        }
+
+        # Results format functions the Supervisor runs, & the results format
+        # definition it publishes
+        self.results = {
+            'create': results_create,
+            'create_object': results_create_object
+        }
+        self.results_format = {'format': 'object_map'}
+
+        # Frames sent on a stream before it is closed, & the delay between
+        # them
+        self.stream_frames = 20
+        self.stream_period = 0.01
+
+        rng = np.random.default_rng(0)
+        self._rgb = rng.integers(0,
+                                 255,
+                                 tuple(image_size) + (3, ),
+                                 dtype=np.uint8)
+        self._depth = rng.random(tuple(image_size), dtype=np.float32)
+        self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def address(self):
+        return 'http://127.0.0.1:%d/' % self._server.server_address[1]
+
+    def observation(self, name):
+        if name == 'image_rgb':
+            return {'encoding': 'bgr8', 'data': self._rgb}
+        elif name == 'image_depth':
+            return self._depth
+        elif name == 'laser':
+            return {
+                'range_max':
+                    10.0,
+                'range_min':
+                    0.1,
+                'scans':
+                    np.stack([np.ones(360),
+                              np.linspace(-np.pi, np.pi, 360)], 1)
+            }
+        elif name == 'poses':
+            return {
+                'robot': {
+                    'parent_frame': 'map',
+                    'translation_xyz': np.array([self.state['steps'], 0.,
+                                                 0.]),
+                    'rotation_rpy': np.array([0., 0., 0.1]),
+                    'rotation_xyzw': np.array([0., 0.,
+                                               np.sin(.05),
+                                               np.cos(.05)])
+                },
+                'camera': {
+                    'parent_frame': 'robot',
+                    'translation_xyz': np.array([0., 0., 1.]),
+                    'rotation_rpy': np.array([0., 0., 0.]),
+                    'rotation_xyzw': np.array([0., 0., 0., 1.])
+                }
+            }
+        raise KeyError(name)
+
+    def route(self, path, data):
+        """Answers a single query, raising KeyError for unknown routes"""
+        self.counts[path] = self.counts.get(path, 0) + 1
+        p = path.strip('/')
+        s = self.state
+        if p == '':
+            return {'supervisor': 'stand-in'}
+        elif p == 'robot/is_running':
+            return {'is_running': True}
+        elif p in ('robot/is_collided', 'robot/is_dirty',
+                   'robot/is_finished'):
+            return {p[6:]: s[p[9:]]}
+        elif p == 'robot/selected_environment':
+            return {'number': s['scene']}
+        elif p in ('robot/reset', 'robot/restart'):
+            s.update(steps=0, finished=False, dirty=False)
+            if p == 'robot/restart':
+                s['scene'] = 0
+            return {'reset_success': True}
+        elif p == 'robot/next':
+            if s['scene'] + 1 >= self.scenes:
+                return {'next_success': False}
+            s.update(scene=s['scene'] + 1, steps=0, finished=False)
+            return {'next_success': True}
+        elif p == 'connections/move_next':
+            s['steps'] += 1
+            s['dirty'] = True
+            s['finished'] = s['steps'] >= self.max_steps
+            return {}
+        elif p.startswith('connections/'):
+            return self.observation(p.split('/', 1)[1])
+        elif p == 'results_functions':
+            return list(self.results)
+        elif p.startswith('results_functions/'):
+            fn = self.results[p.split('/', 1)[1].strip('/')]
+            return fn(*data.get('args', []), **data.get('kwargs', {}))
+        elif p == 'config' or p.startswith('config/'):
+            c = {
+                'environments': [{
+                    'name': 'miniroom'
+                }],
+                'results': self.results_format,
+                'robot': {
+                    'connections': CONNECTIONS
+                },
+                'task': {
+                    'actions': ['move_next'],
+                    'observations': OBSERVATIONS
+                }
+            }
+            for k in p.split('/')[1:]:
+                c = c[k]
+            return c
+        raise KeyError(p)
+
+    def start(self):
+        """Starts serving on a free local port, in a background thread"""
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.supervisor = self
+        t = threading.Thread(target=self._server.serve_forever)
+        t.daemon = True
+        t.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _body(self):
+        n = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(n) if n else b''
+        return json.loads(raw) if raw else {}
+
+    def _encode(self, result):
+        if (self.server.supervisor.features['binary'] and
+                'application/x-benchbot-ndarray' in self.headers.get(
+                    'Accept', '')):
+            from benchbot_api import wire
+            return wire.encode(result), wire.CONTENT_TYPE
+        return jsonpickle.encode(result).encode(), 'application/json'
+
+    def _handle(self):
+        sup = self.server.supervisor
+        data = self._body()
+        path = self.path.split('?')[0]
+        if path.strip('/') == 'stream':
+            return self._stream(data)
+        if sup.latency:
+            time.sleep(sup.latency)
+        try:
+            if path.strip('/') == 'batch':
+                if not sup.features['batch']:
+                    return self._reply(b'', code=404)
+                result = [
+                    sup.route(q['route'],
+                              q.get('data') or {}) for q in data['queries']
+                ]
+            else:
+                result = sup.route(path, data)
+        except KeyError:
+            return self._reply(b'', code=404)
+        self._reply(*self._encode(result))
+
+    def _reply(self, payload, content_type='application/json', code=200):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, data):
+        # Sends 'stream_frames' Server-Sent Events, then closes the stream
+        sup = self.server.supervisor
+        if not sup.features['stream']:
+            return self._reply(b'', code=404)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for i in range(sup.stream_frames):
+                self.wfile.write(
+                    ('id: %d\ndata: %s\n\n' %
+                     (i,
+                      jsonpickle.encode({
+                          c: sup.observation(c) for c in data['channels']
+                      }))).encode())
+                self.wfile.flush()
+                time.sleep(sup.stream_period)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+    do_GET = _handle
+    do_POST = _handle
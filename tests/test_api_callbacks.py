@@ -0,0 +1,106 @@
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+from benchbot_api import api_callbacks
+
+SIZE = (12, 16)
+
+
+def _frame(seed, channels=3, dtype=np.uint8):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 255, SIZE +
+                        ((channels, ) if channels > 1 else ())).astype(dtype)
+
+
+def _compressed(frame, encoding):
+    return {
+        'encoding': encoding,
+        'data': base64.b64encode(cv2.imencode('.png', frame)[1].tobytes())
+    }
+
+
+@pytest.mark.parametrize('encoding', ['bgr8', 'rgb8'])
+def test_convert_into_caller_buffer(encoding):
+    bgr = encoding == 'bgr8'
+    first, second = _frame(0), _frame(1)
+    out = np.empty_like(first)
+    data = first.copy()
+    r = api_callbacks.convert_to_rgb({'encoding': encoding, 'data': data},
+                                     out=out)
+    assert r is out
+    assert np.array_equal(out, first[..., ::-1] if bgr else first)
+    assert not np.shares_memory(out, data)
+    assert np.array_equal(data, first)
+
+    # A later decode (without 'out=') doesn't write into the caller buffer
+    later = api_callbacks.convert_to_rgb({
+        'encoding': encoding,
+        'data': second.copy()
+    })
+    assert not np.shares_memory(later, out)
+    assert np.array_equal(out, first[..., ::-1] if bgr else first)
+    assert np.array_equal(later, second[..., ::-1] if bgr else second)
+
+
+@pytest.mark.parametrize('encoding, dtype', [('mono8', np.uint8),
+                                             ('16UC1', np.uint16),
+                                             ('32FC1', np.float32)])
+def test_unconverted_encodings_into_caller_buffer(encoding, dtype):
+    frame = _frame(2, 1, dtype)
+    out = np.empty_like(frame)
+    data = {'encoding': encoding, 'data': frame}
+    assert api_callbacks.convert_to_rgb(data) is frame
+    assert api_callbacks.convert_to_rgb(data, out=out) is out
+    assert not np.shares_memory(out, frame)
+    frame[:] = 0
+    assert np.array_equal(out, _frame(2, 1, dtype))
+
+
+def test_converts_in_place_only_when_writable():
+    frame = _frame(3)
+    data = frame.copy()
+    r = api_callbacks.convert_to_rgb({'encoding': 'bgr8', 'data': data})
+    assert np.shares_memory(r, data)
+    assert np.array_equal(r, frame[..., ::-1])
+
+    data = frame.copy()
+    data.flags.writeable = False
+    r = api_callbacks.convert_to_rgb({'encoding': 'bgr8', 'data': data})
+    assert not np.shares_memory(r, data)
+    assert np.array_equal(r, frame[..., ::-1])
+    assert np.array_equal(data, frame)
+
+
+@pytest.mark.parametrize('encoding', ['bgr8', 'rgb8'])
+def test_decode_into_caller_buffer(encoding):
+    first, second = _frame(4), _frame(5)
+    expected = [f[..., ::-1] if encoding == 'bgr8' else f
+                for f in (first, second)]
+    out = np.empty_like(first)
+    r = api_callbacks.decode_color_image(_compressed(first, encoding),
+                                         out=out)
+    assert r is out
+    assert np.array_equal(out, expected[0])
+
+    later = api_callbacks.decode_color_image(_compressed(second, encoding))
+    assert not np.shares_memory(later, out)
+    assert np.array_equal(out, expected[0])
+    assert np.array_equal(later, expected[1])
+
+    # Reusing the buffer overwrites it, & nothing else
+    assert api_callbacks.decode_color_image(_compressed(second, encoding),
+                                            out=out) is out
+    assert np.array_equal(out, expected[1])
+    assert np.array_equal(r, expected[1])
+    assert np.array_equal(later, expected[1])
+
+
+def test_decode_rejects_unsupported_encodings():
+    with pytest.raises(ValueError, match='mono8'):
+        api_callbacks.decode_color_image({
+            'encoding': 'mono8',
+            'data': b''
+        })
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from agents import RecordingAgent, assert_same
+from benchbot_api import AsyncBenchBot, BenchBot
+
+
+def test_run_matches_sync_steps(supervisor, tmp_path):
+    async def run():
+        bot = AsyncBenchBot(supervisor_address=supervisor.address,
+                            result_location=str(tmp_path / 'async.json'))
+        await bot.start()
+        agent = RecordingAgent()
+        await bot.run(agent)
+        bot.close()
+        return agent
+
+    agent = asyncio.run(run())
+    assert agent.steps == 10
+
+    # The same steps taken synchronously, one at a time
+    bb = BenchBot(supervisor_address=supervisor.address)
+    seen = []
+    for scene in range(supervisor.scenes):
+        if scene:
+            assert bb.next_scene()
+        observations, result = bb.reset()
+        while result.name == 'SUCCESS':
+            seen.append((observations, bb.actions))
+            observations, result = bb.step('move_next')
+    assert len(agent.seen) == len(seen)
+    for (observations, actions), (sync_observations, sync_actions) in zip(
+            agent.seen, seen):
+        assert actions == sync_actions
+        assert_same(observations, sync_observations)
+    with open(tmp_path / 'async.json') as f:
+        assert json.load(f) == bb.empty_results()
+
+
+def test_observations_are_fetched_concurrently(supervisor):
+    supervisor.latency = 0.05
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0.005)
+
+    async def step():
+        bot = AsyncBenchBot(supervisor_address=supervisor.address)
+        await bot.start()
+        supervisor.counts.clear()
+        t = asyncio.get_running_loop().time()
+        tick = asyncio.ensure_future(ticker())
+        observations, _ = await bot.step('move_next')
+        t = asyncio.get_running_loop().time() - t
+        tick.cancel()
+        bot.close()
+        return observations, t
+
+    observations, t = asyncio.run(step())
+    assert sorted(observations) == sorted(
+        ['image_rgb', 'image_depth', 'laser', 'poses', 'scene_number'])
+    # The action, then the state & every channel at once, rather than a
+    # round trip per channel
+    assert t < 0.05 * 4
+    assert sum(supervisor.counts.values()) >= len(observations) + 1
+    assert len(ticks) > 5
@@ -0,0 +1,139 @@
+import json
+
+import pytest
+import requests
+
+from agents import SaveObjectsAgent
+from benchbot_api import ActionResult, BenchBot
+from benchbot_api.benchbot import CACHED_CONFIG_ROUTES
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_steps_reuse_the_previous_steps_actions(supervisor, batch):
+    supervisor.features['batch'] = batch
+    bb = BenchBot(supervisor_address=supervisor.address)
+    bb.reset()
+    bb.step('move_next')
+    supervisor.counts.clear()
+    bb.step('move_next')
+    assert sum(n for r, n in supervisor.counts.items()
+               if r.strip('/') == 'robot/is_collided') == 1
+
+
+def test_unavailable_actions_raise(supervisor):
+    supervisor.max_steps = 2
+    bb = BenchBot(supervisor_address=supervisor.address)
+    observations, result = bb.reset()
+    assert result == ActionResult.SUCCESS
+    assert bb.step('move_next')[1] == ActionResult.SUCCESS
+    assert bb.step('move_next')[1] == ActionResult.FINISHED
+    with pytest.raises(ValueError, match='FINISHED'):
+        bb.step('move_next')
+
+    # The actions are available again after moving to the next scene
+    assert bb.next_scene()
+    assert bb.step('move_next')[1] == ActionResult.SUCCESS
+
+
+def test_results_written_to_a_bare_filename(supervisor, tmp_path,
+                                            monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bb = BenchBot(supervisor_address=supervisor.address,
+                  result_location='out.json')
+    assert bb.result_filename == 'out.json'
+    bb.run(SaveObjectsAgent())
+    with open(tmp_path / 'out.json') as f:
+        assert len(json.load(f)['results']['objects']) == 10
+
+
+def _config_queries(supervisor):
+    return sum(n for r, n in supervisor.counts.items()
+               if r.strip('/').split('/')[0] == 'config')
+
+
+def test_config_cache_hits_and_misses(supervisor):
+    bb = BenchBot(supervisor_address=supervisor.address)
+    stats = bb.config_cache_stats
+    assert stats['cached'] == len(CACHED_CONFIG_ROUTES)
+    supervisor.counts.clear()
+    bb.config
+    bb.observations
+    bb.actions
+    for _ in range(3):
+        bb.step('move_next')
+    assert _config_queries(supervisor) == 0
+    assert bb.config_cache_stats['misses'] == stats['misses']
+    assert bb.config_cache_stats['hits'] >= stats['hits'] + 6
+
+    uncached = BenchBot(supervisor_address=supervisor.address,
+                        cache_config=False)
+    supervisor.counts.clear()
+    uncached.step('move_next')
+    uncached.step('move_next')
+    assert _config_queries(supervisor) >= 2
+    assert uncached.config_cache_stats == {
+        'hits': 0,
+        'misses': 0,
+        'cached': 0
+    }
+
+
+def test_cached_config_is_copied(supervisor):
+    bb = BenchBot(supervisor_address=supervisor.address)
+    config = bb.config
+    config['task']['actions'].append('fly')
+    bb.observations.append('image_segment')
+    bb.actions.clear()
+    assert bb.config['task']['actions'] == ['move_next']
+    assert bb.observations == ['image_rgb', 'image_depth', 'laser', 'poses']
+    assert bb.actions == ['move_next']
+
+
+@pytest.mark.parametrize('change', ['reset', 'next_scene', 'start'])
+def test_config_cache_is_invalidated(supervisor, change):
+    bb = BenchBot(supervisor_address=supervisor.address)
+    bb.step('move_next')
+    supervisor.results_format['format'] = 'changed'
+    assert bb.config['results']['format'] == 'object_map'
+
+    misses = bb.config_cache_stats['misses']
+    getattr(bb, change)()
+    assert bb.config['results']['format'] == 'changed'
+    assert bb.config_cache_stats['misses'] > misses
+
+
+@pytest.mark.parametrize(
+    'error', [requests.Timeout(), IOError('truncated'),
+              ValueError('bad data')])
+def test_batch_failures_raise_connection_errors(supervisor, monkeypatch,
+                                                error):
+    supervisor.features['batch'] = True
+    bb = BenchBot(supervisor_address=supervisor.address)
+    bb.reset()
+
+    def fail(queries):
+        raise error
+
+    monkeypatch.setattr(bb, '_fetch_batch', fail)
+    with pytest.raises(requests.ConnectionError, match='/batch'):
+        bb._query_batch([('is_collided', BenchBot.RouteType.ROBOT),
+                         ('is_dirty', BenchBot.RouteType.ROBOT)])
+
+
+def test_batch_falls_back_only_when_unsupported(supervisor):
+    queries = [('is_collided', BenchBot.RouteType.ROBOT),
+               ('is_dirty', BenchBot.RouteType.ROBOT)]
+    expected = [{'is_collided': False}, {'is_dirty': False}]
+    bb = BenchBot(supervisor_address=supervisor.address)
+    bb.reset()
+    assert bb._query_batch(queries) == expected
+    assert bb._batch_supported is False
+
+    # Once the batch route has worked, losing it is an error
+    supervisor.features['batch'] = True
+    bb = BenchBot(supervisor_address=supervisor.address)
+    assert bb._query_batch(queries) == expected
+    assert bb._batch_supported is True
+    supervisor.features['batch'] = False
+    with pytest.raises(requests.ConnectionError, match='/batch'):
+        bb._query_batch(queries)
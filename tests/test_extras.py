@@ -0,0 +1,36 @@
+from matplotlib.colors import to_rgba_array
+import numpy as np
+
+from benchbot_api import tools
+from benchbot_api import extras
+
+
+def test_get_bbox3d_batches():
+    extents = np.array([[1, 2, 3], [2, 2, 2]], dtype=float)
+    centroids = np.array([[0, 0, 0], [1, 1, 1]], dtype=float)
+    batch = extras.get_bbox3d(extents, centroids)
+    assert batch.shape == (2, 8, 3)
+    for b, e, c in zip(batch, extents, centroids):
+        assert np.allclose(b, extras.get_bbox3d(e, c))
+        assert np.allclose(b.min(axis=0), c - e / 2)
+        assert np.allclose(b.max(axis=0), c + e / 2)
+
+
+def test_semantic_map_has_a_legend_entry_per_class():
+    objects = [{
+        'class': c,
+        'extent': [1, 1, 1],
+        'centroid': [i, 0, 0]
+    } for i, c in enumerate(['bottle', 'cup', 'bottle', 'chair'])]
+    fig = tools.plt.figure()
+    ax = fig.add_subplot(projection='3d')
+    extras.vis_semantic_map3d(ax, objects, extras.CLASS_TO_COLOR_MAP, 'k')
+    assert [t.get_text() for t in ax.get_legend().get_texts()
+            ] == ['bottle', 'cup', 'chair']
+    assert len(ax.collections) == 2
+    colors = ax.collections[0].get_facecolor().reshape(4, -1, 4)
+    for o, c in zip(objects, colors):
+        assert np.allclose(
+            c[:, :3],
+            to_rgba_array(extras.CLASS_TO_COLOR_MAP[o['class']])[:, :3])
+    tools.plt.close(fig)
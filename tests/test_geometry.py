@@ -0,0 +1,32 @@
+import numpy as np
+
+from benchbot_api import geometry
+
+POSES = {
+    'robot': {
+        'parent_frame': 'map',
+        'translation_xyz': [1, 2, 0],
+        'rotation_rpy': [0, 0, np.pi / 2]
+    }
+}
+
+
+def test_laser_to_points():
+    laser = {
+        'range_max': 10.0,
+        'range_min': 0.5,
+        'scans': [[1, 0], [2, np.pi / 2], [0.1, 0]]
+    }
+    assert np.allclose(geometry.laser_to_points(laser),
+                       [[1, 0], [0, 2], [0.1, 0]])
+    assert np.allclose(geometry.laser_to_points(laser, valid_only=True),
+                       [[1, 0], [0, 2]])
+    assert np.allclose(geometry.laser_to_map_points(laser, POSES),
+                       [[1, 3, 0], [-1, 2, 0], [1, 2.1, 0]])
+
+
+def test_empty_laser_scans():
+    laser = {'range_max': 10.0, 'range_min': 0.1, 'scans': []}
+    assert geometry.laser_to_points(laser).shape == (0, 2)
+    assert geometry.laser_to_points(laser, valid_only=True).shape == (0, 2)
+    assert geometry.laser_to_map_points(laser, POSES).shape == (0, 3)
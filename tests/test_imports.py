@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+import pytest
+
+# Modules that are slow to import, & only needed by some of the API
+HEAVY_MODULES = ['cv2', 'matplotlib', 'scipy']
+
+
+def _imported(statement):
+    # Heavy modules imported by a statement, run in a fresh interpreter so
+    # nothing imported by the tests themselves is counted
+    code = ("import sys\n%s\n"
+            "print(' '.join(m for m in %r if m in sys.modules))" %
+            (statement, HEAVY_MODULES))
+    r = subprocess.run([sys.executable, '-c', code],
+                       capture_output=True,
+                       text=True,
+                       check=True)
+    return r.stdout.split()
+
+
+@pytest.mark.parametrize('statement', [
+    'import benchbot_api',
+    'from benchbot_api import Agent, BenchBot',
+    'from benchbot_api import AsyncBenchBot, ResultsWriter, StepPipeline'
+])
+def test_importing_the_api_skips_heavy_modules(statement):
+    assert _imported(statement) == []
+
+
+def test_heavy_modules_are_imported_when_used():
+    assert 'matplotlib' in _imported('import benchbot_api.tools')
@@ -0,0 +1,36 @@
+import pytest
+
+from benchbot_api import BenchBot
+
+OBSERVATIONS = ['image_rgb', 'image_depth', 'laser', 'poses']
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_batched_queries_are_recorded_per_route(supervisor, binary):
+    supervisor.features.update(batch=True, binary=binary)
+    bb = BenchBot(supervisor_address=supervisor.address, instrument=True)
+    bb.reset()
+    bb.stats.reset()
+    observations, _ = bb.step('move_next')
+    routes = bb.stats.summary()['routes']
+
+    assert routes['batch']['latency']['count'] > 0
+    for c in OBSERVATIONS:
+        r = routes['connections/' + c]
+        assert r['latency']['count'] == 1
+        assert r['bytes'] > 0
+        assert r['decode']['count'] == 1
+    assert routes['connections/image_rgb']['bytes'] > (
+        routes['connections/laser']['bytes'])
+    assert 'image_rgb' in bb.stats.summary()['callbacks']
+    assert observations['image_rgb'].shape == (48, 64, 3)
+
+
+def test_batched_results_match_unbatched(supervisor):
+    supervisor.features.update(batch=True)
+    bb = BenchBot(supervisor_address=supervisor.address, instrument=True)
+    fns = bb.results_functions()
+    calls = [('create_object', [], {'centroid': [i, 0, 0]}) for i in range(5)]
+    assert bb.call_results_functions(calls) == [
+        fns['create_object'](centroid=[i, 0, 0]) for i in range(5)
+    ]
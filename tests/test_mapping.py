@@ -0,0 +1,178 @@
+import numpy as np
+
+from benchbot_api import mapping
+from benchbot_api.mapping import VoxelMap
+
+RESOLUTION = 0.1
+
+
+class DictVoxelMap(object):
+    """Reference occupancy map, storing each voxel in a plain dict keyed by
+    its integer coordinates, & updating voxels one at a time
+    """
+    def __init__(self, resolution=RESOLUTION, raycast=True):
+        self.resolution = resolution
+        self.raycast = raycast
+        self.frames = 0
+        self.voxels = {}
+
+    def _inside(self, points):
+        coords = np.floor(points / self.resolution).astype(np.int64)
+        return points[np.all(np.abs(coords) < mapping._KEY_BIAS, axis=1)]
+
+    def _update(self, voxel, delta):
+        l, _ = self.voxels.get(voxel, (np.float32(0), 0))
+        self.voxels[voxel] = (np.clip(np.float32(l + delta),
+                                      *mapping.LOG_ODDS_LIMITS), self.frames)
+
+    def integrate_points(self, points, origin):
+        points = self._inside(np.asarray(points, dtype=float))
+        self.frames += 1
+        hits = set(
+            tuple(c)
+            for c in np.floor(points / self.resolution).astype(int).tolist())
+        misses = set()
+        if self.raycast and hits:
+            o = np.asarray(origin, dtype=float) / self.resolution
+            for p in points:
+                d = (p - origin) / self.resolution
+                n = int(np.floor(np.linalg.norm(d)))
+                inc = d / max(n, 1)
+                for k in range(n):
+                    c = np.floor(inc * float(k) + o).astype(int)
+                    misses.add(tuple(c.tolist()))
+        for v in misses - hits:
+            self._update(v, mapping.LOG_ODDS_MISS)
+        for v in hits:
+            self._update(v, mapping.LOG_ODDS_HIT)
+
+
+def _assert_matches(voxel_map, reference):
+    centres, log_odds = voxel_map.voxels()
+    coords = np.floor(centres / voxel_map.resolution).astype(int)
+    assert len(voxel_map) == len(coords) == len(reference.voxels)
+    assert set(map(tuple, coords.tolist())) == set(reference.voxels)
+    expected = [reference.voxels[tuple(c)][0] for c in coords.tolist()]
+    assert np.allclose(log_odds, expected, atol=1e-5)
+    assert np.allclose(voxel_map.log_odds(centres), expected, atol=1e-5)
+
+
+def test_key_packing_round_trip():
+    limit = mapping._KEY_BIAS - 1
+    rng = np.random.default_rng(0)
+    coords = np.concatenate([
+        rng.integers(-limit, limit + 1, (1000, 3)),
+        [[0, 0, 0], [-1, -1, -1], [limit, limit, limit],
+         [-limit, -limit, -limit], [limit, -limit, 0], [-mapping._KEY_BIAS,
+                                                         0, limit]]
+    ]).astype(np.int64)
+    keys = mapping._pack(coords)
+    assert np.array_equal(mapping._unpack(keys), coords)
+    assert len(np.unique(keys)) == len(np.unique(coords, axis=0))
+    assert not np.any(keys == mapping._EMPTY)
+
+
+def test_hits_match_dict_reference():
+    rng = np.random.default_rng(1)
+    m = VoxelMap(resolution=RESOLUTION, raycast=False)
+    reference = DictVoxelMap(raycast=False)
+    for _ in range(10):
+        # Points either side of the origin, many on voxel boundaries
+        points = np.concatenate([
+            rng.uniform(-3, 3, (200, 3)),
+            rng.integers(-30, 30, (100, 3)) * RESOLUTION
+        ])
+        m.integrate_points(points, [0, 0, 0])
+        reference.integrate_points(points, np.zeros(3))
+        _assert_matches(m, reference)
+
+
+def test_raycasts_match_dict_reference():
+    rng = np.random.default_rng(2)
+    m = VoxelMap(resolution=RESOLUTION)
+    reference = DictVoxelMap()
+    for _ in range(5):
+        origin = rng.uniform(-1, 1, 3)
+        points = origin + rng.uniform(-2, 2, (50, 3))
+        m.integrate_points(points, origin)
+        reference.integrate_points(points, origin)
+        _assert_matches(m, reference)
+    assert np.any(m.voxels()[1] < 0)
+
+
+def test_boundary_coordinates():
+    limit = mapping._KEY_BIAS - 1
+    inside = np.array([[limit, -limit, 0], [-limit, limit, limit],
+                       [-limit, -limit, -limit]]) * RESOLUTION
+    outside = np.array([[limit + 1, 0, 0], [0, -limit - 1, 0],
+                        [0, 0, 2 * limit]]) * RESOLUTION
+    # Nudged inside each voxel, so they don't round into a neighbour
+    inside += RESOLUTION / 2
+    m = VoxelMap(resolution=RESOLUTION, raycast=False)
+    reference = DictVoxelMap(raycast=False)
+    m.integrate_points(np.concatenate([inside, outside]), [0, 0, 0])
+    reference.integrate_points(np.concatenate([inside, outside]), np.zeros(3))
+    _assert_matches(m, reference)
+    assert len(m) == 3
+    assert np.all(np.isnan(m.log_odds(outside)))
+
+
+def test_log_odds_are_clamped():
+    m = VoxelMap(resolution=RESOLUTION)
+    for _ in range(20):
+        m.integrate_points([[1.05, 0.05, 0.05]], [0.05, 0.05, 0.05])
+    lo, hi = mapping.LOG_ODDS_LIMITS
+    assert np.allclose(m.log_odds([[1.05, 0.05, 0.05]]), hi)
+    assert np.allclose(m.log_odds([[0.55, 0.05, 0.05]]), lo)
+    assert np.all((m.voxels()[1] >= lo) & (m.voxels()[1] <= hi))
+    assert np.isnan(m.log_odds([[-5, -5, -5]]))[0]
+
+
+def test_table_grows_past_load_factor():
+    n = int(mapping._INITIAL_CAPACITY * mapping._MAX_LOAD) + 1000
+    rng = np.random.default_rng(3)
+    m = VoxelMap(resolution=RESOLUTION, raycast=False)
+    reference = DictVoxelMap(raycast=False)
+    coords = rng.choice(200**3, n, replace=False)
+    coords = np.stack(np.unravel_index(coords, (200, ) * 3), 1) - 100
+    points = (coords + 0.5) * RESOLUTION
+    # Split over frames, so the table grows with voxels already in it
+    for chunk in np.array_split(points, 4):
+        m.integrate_points(chunk, [0, 0, 0])
+        reference.integrate_points(chunk, np.zeros(3))
+    assert len(m._index.keys) > mapping._INITIAL_CAPACITY
+    assert len(m) <= len(m._index.keys) * mapping._MAX_LOAD
+    _assert_matches(m, reference)
+
+
+def test_eviction_keeps_most_recent_voxels():
+    m = VoxelMap(resolution=RESOLUTION, max_voxels=100, raycast=False)
+    reference = DictVoxelMap(raycast=False)
+    for f in range(12):
+        # A new row of 30 voxels every frame, & one voxel seen every frame
+        points = np.concatenate([[[0.05, 0.05, 0.05]],
+                                 (np.stack([
+                                     np.arange(1, 31),
+                                     np.full(30, f + 1),
+                                     np.zeros(30)
+                                 ], 1) + 0.5) * RESOLUTION])
+        m.integrate_points(points, [0, 0, 0])
+        reference.integrate_points(points, np.zeros(3))
+        assert len(m) <= m.max_voxels
+
+    centres, log_odds = m.voxels()
+    kept = set(
+        map(tuple,
+            np.floor(centres / RESOLUTION).astype(int).tolist()))
+    evicted = set(reference.voxels) - kept
+    assert evicted
+    assert (min(reference.voxels[v][1] for v in kept) >= max(
+        reference.voxels[v][1] for v in evicted))
+    assert all(v in kept for v, (_, f) in reference.voxels.items()
+               if f == reference.frames)
+    for v, l in zip(map(tuple,
+                        np.floor(centres / RESOLUTION).astype(int).tolist()),
+                    log_odds):
+        assert np.isclose(l, reference.voxels[v][0])
+    assert np.allclose(m.log_odds([[0.05, 0.05, 0.05]]),
+                       mapping.LOG_ODDS_LIMITS[1])
@@ -0,0 +1,157 @@
+import numpy as np
+
+from benchbot_api.mapping import ObjectMap, box_iou
+
+CLASSES = ['bottle', 'chair', 'cup']
+
+
+def _random_boxes(rng, n, size=10.0):
+    return ([CLASSES[i] for i in rng.integers(0, len(CLASSES), n)],
+            rng.uniform(0.2, 1.5, (n, 3)), rng.uniform(-size, size, (n, 3)))
+
+
+def _brute_force_iou(extent_a, centroid_a, extent_b, centroid_b):
+    # Intersection over union of two boxes, one axis at a time
+    intersection = 1.0
+    for ea, ca, eb, cb in zip(extent_a, centroid_a, extent_b, centroid_b):
+        intersection *= max(
+            min(ca + ea / 2, cb + eb / 2) - max(ca - ea / 2, cb - eb / 2), 0)
+    return intersection / (np.prod(extent_a) + np.prod(extent_b) -
+                           intersection)
+
+
+def _brute_force_merge(objects, classes, extents, centroids, merge_iou,
+                       match_class):
+    # Compares every detection against every object, returning the merged
+    # objects as [class, extent, centroid, count] lists & where each
+    # detection went
+    n = len(objects)
+    merged = [[] for _ in range(n)]
+    out = []
+    for c, e, p in zip(classes, extents, centroids):
+        best, best_iou = -1, 0
+        for i in range(n):
+            iou = _brute_force_iou(e, p, objects[i][1], objects[i][2])
+            if ((not match_class or objects[i][0] == c) and iou > best_iou
+                    and iou >= merge_iou):
+                best, best_iou = i, iou
+        if best < 0:
+            out.append(len(objects))
+            objects.append([c, e, p, 1])
+        else:
+            out.append(best)
+            merged[best].append((e, p))
+    for o, m in zip(objects, merged):
+        if m:
+            total = o[3] + len(m)
+            o[1] = (o[1] * o[3] + sum(e for e, _ in m)) / total
+            o[2] = (o[2] * o[3] + sum(p for _, p in m)) / total
+            o[3] = total
+    return out
+
+
+def _assert_objects_equal(object_map, objects):
+    assert len(object_map) == len(objects)
+    assert object_map.classes == [o[0] for o in objects]
+    assert np.allclose(object_map.extents, [o[1] for o in objects])
+    assert np.allclose(object_map.centroids, [o[2] for o in objects])
+    assert np.array_equal(object_map.counts, [o[3] for o in objects])
+
+
+def test_box_iou_matches_brute_force():
+    rng = np.random.default_rng(0)
+    _, ea, ca = _random_boxes(rng, 500, size=1.0)
+    _, eb, cb = _random_boxes(rng, 500, size=1.0)
+    iou = box_iou(ea, ca, eb, cb)
+    assert np.allclose(
+        iou, [_brute_force_iou(*b) for b in zip(ea, ca, eb, cb)])
+    assert np.any(iou > 0) and np.any(iou == 0)
+    assert np.allclose(box_iou(ea, ca, ea, ca), 1)
+
+
+def test_queries_match_brute_force():
+    rng = np.random.default_rng(1)
+    classes, extents, centroids = _random_boxes(rng, 300)
+    m = ObjectMap()
+    m.add(classes, extents, centroids)
+
+    points = rng.uniform(-12, 12, (50, 3))
+    distances = np.linalg.norm(points[:, None] - centroids[None], axis=2)
+    d, i = m.nearest(points)
+    assert np.array_equal(i, np.argmin(distances, axis=1))
+    assert np.allclose(d, np.amin(distances, axis=1))
+    d, i = m.nearest(points, k=4)
+    assert np.array_equal(i, np.argsort(distances, axis=1)[:, :4])
+    assert np.allclose(d, np.sort(distances, axis=1)[:, :4])
+    d, i = m.nearest(points, k=3, max_distance=2.0)
+    expected = np.argsort(distances, axis=1)[:, :3]
+    near = np.take_along_axis(distances, expected, axis=1) <= 2.0
+    assert np.array_equal(i, np.where(near, expected, -1))
+    assert np.all(np.isinf(d[~near]))
+
+    for p, radius in zip(points, rng.uniform(0.5, 4, len(points))):
+        assert np.array_equal(
+            m.within_radius(p, radius),
+            np.flatnonzero(np.linalg.norm(centroids - p, axis=1) <= radius))
+
+    for e, c, min_iou in zip(*_random_boxes(rng, 50)[1:],
+                             [0.0, 0.05, 0.2] * 17):
+        iou = np.array(
+            [_brute_force_iou(e, c, *b) for b in zip(extents, centroids)])
+        assert np.array_equal(m.overlapping(e, c, min_iou),
+                              np.flatnonzero((iou > 0) & (iou >= min_iou)))
+
+
+def test_merge_matches_brute_force():
+    rng = np.random.default_rng(2)
+    m = ObjectMap()
+    objects = []
+    for _ in range(5):
+        # Half the detections are noisy views of objects already seen
+        classes, extents, centroids = _random_boxes(rng, 60)
+        if len(objects):
+            seen = rng.integers(0, len(objects), 30)
+            classes[:30] = [objects[i][0] for i in seen]
+            extents[:30] = (np.array([objects[i][1] for i in seen]) +
+                            rng.normal(0, 0.05, (30, 3)))
+            centroids[:30] = (np.array([objects[i][2] for i in seen]) +
+                              rng.normal(0, 0.1, (30, 3)))
+        expected = _brute_force_merge(objects, classes, extents, centroids,
+                                      m.merge_iou, m.match_class)
+        assert np.array_equal(m.merge(classes, extents, centroids), expected)
+        _assert_objects_equal(m, objects)
+    assert np.any(m.counts > 1)
+
+
+def test_merge_into_empty_map():
+    rng = np.random.default_rng(3)
+    m = ObjectMap()
+    d, i = m.nearest([[0, 0, 0], [1, 1, 1]], k=2)
+    assert d.shape == i.shape == (2, 2)
+    assert np.all(np.isinf(d)) and np.all(i == -1)
+    assert len(m.within_radius([0, 0, 0], 100)) == 0
+    assert len(m.overlapping([1, 1, 1], [0, 0, 0])) == 0
+
+    classes, extents, centroids = _random_boxes(rng, 20)
+    assert np.array_equal(m.merge(classes, extents, centroids),
+                          np.arange(20))
+    assert np.array_equal(m.merge([], np.zeros((0, 3)), np.zeros((0, 3))),
+                          [])
+    _assert_objects_equal(m, [[c, e, p, 1]
+                              for c, e, p in zip(classes, extents, centroids)])
+
+
+def test_merge_does_not_cross_classes():
+    box = ([1, 1, 1], [0, 0, 0])
+    m = ObjectMap()
+    m.merge(['bottle'], *box)
+    assert np.array_equal(m.merge(['cup', 'bottle'], [box[0]] * 2,
+                                  [box[1]] * 2), [1, 0])
+    assert m.classes == ['bottle', 'cup']
+    assert np.array_equal(m.counts, [2, 1])
+
+    m = ObjectMap(match_class=False)
+    m.merge(['bottle'], *box)
+    assert np.array_equal(m.merge(['cup'], *box), [0])
+    assert m.classes == ['bottle']
+    assert np.array_equal(m.counts, [2])
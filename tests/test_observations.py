@@ -0,0 +1,183 @@
+import copy
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from benchbot_api import BenchBot, geometry
+from benchbot_api.observations import (LaserScan, LazyObservations, PoseSet,
+                                       _Loader, compact_observation)
+
+
+def _lazy_step(supervisor):
+    bb = BenchBot(supervisor_address=supervisor.address,
+                  lazy_observations=True)
+    bb.reset()
+    observations, _ = bb.step('move_next')
+    supervisor.counts.clear()
+    return bb, observations
+
+
+def _fetches(supervisor, channel):
+    return sum(n for r, n in supervisor.counts.items()
+               if r.strip('/') == 'connections/' + channel)
+
+
+def test_reading_after_a_later_step_raises(supervisor):
+    bb, observations = _lazy_step(supervisor)
+    poses = observations['poses']
+    bb.step('move_next')
+    with pytest.raises(RuntimeError, match='image_rgb'):
+        observations['image_rgb']
+    assert observations['poses'] is poses
+    assert not observations.is_loaded('image_rgb')
+
+
+def test_each_channel_is_fetched_once(supervisor):
+    bb, observations = _lazy_step(supervisor)
+    assert sum(supervisor.counts.values()) == 0
+    for _ in range(3):
+        observations['poses']
+        observations.get('poses')
+    assert _fetches(supervisor, 'poses') == 1
+    assert _fetches(supervisor, 'image_rgb') == 0
+    assert observations.is_loaded('poses')
+    assert not observations.is_loaded('image_rgb')
+
+    list(observations.values())
+    dict(observations)
+    for c in ('image_rgb', 'image_depth', 'laser', 'poses'):
+        assert _fetches(supervisor, c) == 1, c
+
+
+def test_prefetch(supervisor):
+    bb, observations = _lazy_step(supervisor)
+    assert observations.prefetch('laser', 'poses') is observations
+    assert _fetches(supervisor, 'laser') == _fetches(supervisor, 'poses') == 1
+    assert _fetches(supervisor, 'image_rgb') == 0
+    observations.prefetch()
+    assert all(observations.is_loaded(k) for k in observations)
+
+    # Prefetched observations outlive the step
+    bb.step('move_next')
+    assert observations['image_rgb'].shape == (48, 64, 3)
+    for c in ('image_rgb', 'image_depth', 'laser', 'poses'):
+        assert _fetches(supervisor, c) == 1, c
+
+
+def test_dict_compatibility(supervisor):
+    _, observations = _lazy_step(supervisor)
+    assert isinstance(observations, dict)
+    assert 'image_rgb' in observations and 'nope' not in observations
+    assert sorted(observations) == sorted(
+        ['image_rgb', 'image_depth', 'laser', 'poses', 'scene_number'])
+    eager = dict(observations)
+    assert not any(isinstance(v, _Loader) for v in eager.values())
+    for copied in ({**observations}, observations.copy(),
+                   dict(observations.items()),
+                   copy.deepcopy(observations),
+                   pickle.loads(pickle.dumps(observations))):
+        assert sorted(copied) == sorted(eager)
+        assert np.array_equal(copied['image_rgb'], eager['image_rgb'])
+        assert np.array_equal(copied['laser']['scans'],
+                              eager['laser']['scans'])
+    assert observations == eager
+    assert observations.pop('image_depth') is eager['image_depth']
+    assert 'image_depth' not in observations
+
+
+def test_json_compatibility():
+    calls = []
+
+    def load():
+        calls.append(None)
+        return [1, 2, 3]
+
+    observations = LazyObservations(a=LazyObservations.loader(load), b='b')
+    assert json.loads(json.dumps(observations)) == {'a': [1, 2, 3], 'b': 'b'}
+    assert json.dumps(observations) == json.dumps({'a': [1, 2, 3], 'b': 'b'})
+    assert len(calls) == 1
+
+
+POSES = {
+    'robot': {
+        'parent_frame': 'map',
+        'translation_xyz': np.array([1., 2., 0.]),
+        'rotation_rpy': np.array([0., 0., 0.1]),
+        'rotation_xyzw': np.array([0., 0., np.sin(.05),
+                                   np.cos(.05)])
+    },
+    'camera': {
+        'parent_frame': 'robot',
+        'translation_xyz': np.array([0., 0., 1.]),
+        'rotation_rpy': np.array([-np.pi / 2, 0., -np.pi / 2]),
+        'rotation_xyzw': np.array([-.5, .5, -.5, .5])
+    }
+}
+
+
+def test_pose_set_round_trip():
+    poses = PoseSet.from_dict(POSES)
+    assert poses._data.shape == (2, 10)
+    assert poses._data.flags['C_CONTIGUOUS']
+    assert poses.frames == ('robot', 'camera')
+    assert poses.parent_frames == ('map', 'robot')
+    assert np.array_equal(poses.translation_xyz, [[1, 2, 0], [0, 0, 1]])
+    assert np.array_equal(poses.rotation_xyzw[1], [-.5, .5, -.5, .5])
+
+    # The legacy dict form, both directly & after pickling
+    for p in (poses, pickle.loads(pickle.dumps(poses))):
+        d = p.to_dict()
+        assert sorted(d) == sorted(POSES)
+        for f in POSES:
+            assert sorted(d[f]) == sorted(POSES[f])
+            assert d[f]['parent_frame'] == POSES[f]['parent_frame']
+            for k in ('translation_xyz', 'rotation_rpy', 'rotation_xyzw'):
+                assert np.array_equal(d[f][k], POSES[f][k])
+                assert np.array_equal(p[f][k], POSES[f][k])
+        assert PoseSet.from_dict(d).to_dict().keys() == d.keys()
+
+    # Frames are views of the rows of the array
+    assert np.shares_memory(poses['camera']['translation_xyz'], poses._data)
+    with pytest.raises(KeyError):
+        poses['nope']
+    with pytest.raises(ValueError):
+        PoseSet.from_dict({'robot': {'translation_xyz': [0, 0, 0]}})
+
+
+def test_pose_layouts_are_shared_between_steps(supervisor):
+    bb = BenchBot(supervisor_address=supervisor.address,
+                  compact_observations=True)
+    history = [bb.reset()[0]['poses']]
+    for _ in range(3):
+        history.append(bb.step('move_next')[0]['poses'])
+    assert all(isinstance(p, PoseSet) for p in history)
+    assert all(p._layout is history[0]._layout for p in history)
+    assert [p['robot']['translation_xyz'][0] for p in history] == [0, 1, 2, 3]
+
+    # A different set of frames gets its own layout
+    other = PoseSet.from_dict({'robot': POSES['robot']})
+    assert other._layout is not history[0]._layout
+    assert PoseSet.from_dict(POSES)._layout is PoseSet.from_dict(
+        dict(POSES))._layout
+
+
+@pytest.mark.parametrize('scans', [
+    np.zeros((0, 2)), [],
+    [[0.05, 0.], [20., np.pi / 2], [np.inf, 0.], [np.nan, 1.], [1., 2.]]
+])
+def test_laser_scans_empty_or_out_of_range(scans):
+    laser = {'range_max': 10.0, 'range_min': 0.1, 'scans': scans}
+    compact = compact_observation('laser', laser)
+    assert isinstance(compact, LaserScan)
+    assert compact.to_dict() == laser
+    assert pickle.loads(pickle.dumps(compact))['scans'] is not None
+    expected = geometry.laser_to_points(laser, valid_only=True)
+    assert np.array_equal(
+        geometry.laser_to_points(compact, valid_only=True), expected)
+    assert len(expected) == (1 if len(scans) else 0)
+
+    # Anything other than exactly the laser keys is left alone
+    for bad in (dict(laser, extra=1), {'scans': scans}, scans):
+        assert compact_observation('laser', bad) is bad
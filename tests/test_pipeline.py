@@ -0,0 +1,76 @@
+from concurrent.futures import CancelledError
+
+import pytest
+
+from agents import RecordingAgent, assert_same
+from benchbot_api import BenchBot
+from benchbot_api.pipeline import StepPipeline
+
+
+def _steps(bb, n):
+    # Observations & results of a reset, then 'n' steps, taken synchronously
+    return [bb.reset()] + [bb.step('move_next') for _ in range(n)]
+
+
+def test_steps_match_sync_steps(supervisor):
+    bb = BenchBot(supervisor_address=supervisor.address)
+    expected = _steps(bb, 4)
+
+    bb.start()
+    with StepPipeline(bb, max_pending=3) as pipeline:
+        futures = [pipeline.submit(None)] + [
+            pipeline.submit('move_next') for _ in range(4)
+        ]
+        steps = [f.result() for f in futures]
+    for (observations, result), (expected_observations,
+                                 expected_result) in zip(steps, expected):
+        assert result == expected_result
+        assert_same(observations, expected_observations)
+
+
+def test_pipelined_run_matches_sync_run(supervisor, tmp_path):
+    agent = RecordingAgent()
+    BenchBot(supervisor_address=supervisor.address,
+             result_location=str(tmp_path / 'results.json')).run(agent)
+    pipelined = RecordingAgent()
+    BenchBot(supervisor_address=supervisor.address,
+             result_location=str(tmp_path / 'results.json')).run(
+                 pipelined, pipelined=True)
+    assert len(pipelined.seen) == len(agent.seen) == 10
+    for a, b in zip(pipelined.seen, agent.seen):
+        assert_same(a[0], b[0])
+        assert a[1] == b[1]
+
+
+def test_worker_exceptions_propagate(supervisor):
+    bb = BenchBot(supervisor_address=supervisor.address)
+    with StepPipeline(bb, max_pending=2) as pipeline:
+        # A slow step holds the worker while the rest are queued
+        supervisor.latency = 0.2
+        slow = pipeline.submit('move_next')
+        failed = pipeline.submit('fly')
+        queued = pipeline.submit('move_next')
+        assert slow.result()[1].name == 'SUCCESS'
+        with pytest.raises(ValueError, match='fly'):
+            failed.result()
+        with pytest.raises(CancelledError):
+            queued.result()
+
+        # The pipeline keeps working afterwards
+        supervisor.latency = 0
+        assert pipeline.submit('move_next').result()[1].name == 'SUCCESS'
+
+
+def test_close_stops_worker_and_decoders(supervisor):
+    bb = BenchBot(supervisor_address=supervisor.address)
+    pipeline = StepPipeline(bb, max_pending=2)
+    futures = [pipeline.submit('move_next') for _ in range(2)]
+    pipeline.close()
+    assert all(f.done() for f in futures)
+    assert not pipeline._worker.is_alive()
+    with pytest.raises(RuntimeError):
+        pipeline._decoder.submit(lambda: None)
+
+    # Decoding finished before the pool was shut down
+    observations, _ = futures[-1].result()
+    assert observations['image_rgb'].shape == (48, 64, 3)
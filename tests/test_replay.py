@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from agents import RecordingAgent, assert_same
+from benchbot_api import BenchBot, Recorder, ReplayBenchBot
+
+
+def _record(supervisor, path, tmp_path, **benchbot_kwargs):
+    recorder = Recorder(str(path))
+    agent = RecordingAgent(**benchbot_kwargs.pop('agent_kwargs', {}))
+    bb = BenchBot(supervisor_address=supervisor.address,
+                  recorder=recorder,
+                  result_location=str(tmp_path / 'live.json'),
+                  **benchbot_kwargs)
+    bb.run(agent)
+    recorder.close()
+    return bb, agent
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_replay_matches_recorded_run(supervisor, tmp_path, lazy):
+    path = tmp_path / 'recording'
+    live, live_agent = _record(supervisor,
+                               path,
+                               tmp_path,
+                               lazy_observations=lazy)
+
+    replay = ReplayBenchBot(str(path),
+                            result_location=str(tmp_path / 'replay.json'))
+    assert replay.config == live.config
+    assert replay.observations == live.observations
+    assert replay.empty_results() == live.empty_results()
+    assert (sorted(replay.results_functions()) == sorted(
+        live.results_functions()))
+
+    agent = RecordingAgent()
+    replay.run(agent)
+    assert agent.steps == live_agent.steps == 10
+    assert len(agent.seen) == len(live_agent.seen)
+    for (observations, actions), (live_observations, live_actions) in zip(
+            agent.seen, live_agent.seen):
+        assert actions == live_actions
+        assert_same(observations, live_observations)
+    with open(tmp_path / 'live.json') as f, open(tmp_path /
+                                                 'replay.json') as g:
+        assert json.load(f) == json.load(g)
+    replay.close()
+
+
+def test_recording_includes_observations_the_agent_did_not_read(
+        supervisor, tmp_path):
+    path = tmp_path / 'recording'
+    _, live_agent = _record(supervisor,
+                            path,
+                            tmp_path,
+                            lazy_observations=True,
+                            agent_kwargs={'reads': ['poses']})
+
+    replay = ReplayBenchBot(str(path),
+                            result_location=str(tmp_path / 'replay.json'))
+    agent = RecordingAgent()
+    replay.run(agent)
+    assert len(agent.seen) == len(live_agent.seen)
+    for (observations, _), (live_observations, _) in zip(
+            agent.seen, live_agent.seen):
+        assert sorted(observations) == sorted(replay.observations +
+                                              ['scene_number'])
+        assert_same(observations['poses'], live_observations['poses'])
+        assert_same(observations['image_rgb'],
+                     supervisor.observation('image_rgb')['data'][..., ::-1])
+    replay.close()
@@ -0,0 +1,126 @@
+import warnings
+
+import pytest
+
+import results_format
+from benchbot_api import BenchBot
+
+FUNCTIONS = {
+    'create': 'results_format.create',
+    'create_object': 'results_format.create_object',
+    'scored': 'results_format.scored',
+    'missing_attribute': 'results_format.nope',
+    'missing_module': 'results_format_missing.fn',
+    'outside_allowlist': 'json.loads'
+}
+
+CALLS = [('create', [], {}),
+         ('create_object', [], {
+             'centroid': [1, 2, 3],
+             'extent': [2, 2, 2]
+         }), ('scored', [0.5], {}), ('scored', [], {
+             'score': 0.25
+         }), ('missing_attribute', [3], {}), ('missing_module', [], {
+             'x': 1
+         }), ('outside_allowlist', ['[1, 2]'], {})]
+
+
+@pytest.fixture
+def supervisor(supervisor):
+    supervisor.results.update(scored=results_format.scored,
+                              missing_attribute=lambda x=0: {'remote': x},
+                              missing_module=lambda **kw: kw,
+                              outside_allowlist=lambda s: 'remote ' + s)
+    supervisor.results_format['functions'] = FUNCTIONS
+    return supervisor
+
+
+def _benchbot(supervisor, **kwargs):
+    return BenchBot(supervisor_address=supervisor.address, **kwargs)
+
+
+def _remote_counts(supervisor):
+    return {
+        k.rsplit('/', 1)[1]: v
+        for k, v in supervisor.counts.items()
+        if k.strip('/').startswith('results_functions/')
+    }
+
+
+def test_only_allowed_functions_are_imported(supervisor):
+    bb = _benchbot(supervisor, local_results_functions=['results_format'])
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        fns = bb.results_functions()
+    assert fns['create'] is results_format.create
+    assert fns['scored'] is results_format.scored
+    assert fns['outside_allowlist'] is not __import__('json').loads
+    assert sorted(bb._local_results()) == ['create', 'create_object', 'scored']
+    messages = '\n'.join(str(x.message) for x in w)
+    for name in ('missing_attribute', 'missing_module', 'outside_allowlist'):
+        assert "'%s'" % name in messages
+
+
+def test_nothing_is_imported_by_default(supervisor):
+    bb = _benchbot(supervisor)
+    assert bb._local_results() == {}
+    assert bb.results_functions()['create']() == results_format.create()
+    assert _remote_counts(supervisor) == {'create': 1}
+
+
+def test_local_functions_match_remote(supervisor):
+    remote = _benchbot(supervisor)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        local = _benchbot(supervisor,
+                          local_results_functions=['results_format'])
+        lf = local.results_functions()
+    rf = remote.results_functions()
+    assert set(lf) == set(rf)
+    for n, a, k in CALLS:
+        assert lf[n](*a, **k) == rf[n](*a, **k), n
+
+
+def test_only_unimportable_functions_are_remote(supervisor):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        bb = _benchbot(supervisor, local_results_functions=['results_format'])
+        fns = bb.results_functions()
+    supervisor.counts.clear()
+    for n, a, k in CALLS:
+        fns[n](*a, **k)
+    assert _remote_counts(supervisor) == {
+        'missing_attribute': 1,
+        'missing_module': 1,
+        'outside_allowlist': 1
+    }
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_batched_calls_match_remote(supervisor, batch):
+    supervisor.features['batch'] = batch
+    remote = _benchbot(supervisor)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        local = _benchbot(supervisor,
+                          local_results_functions=['results_format'])
+        local.results_functions()
+    calls = CALLS * 3
+    expected = remote.call_results_functions(calls)
+    supervisor.counts.clear()
+    assert local.call_results_functions(calls) == expected
+    assert _remote_counts(supervisor) == {
+        'missing_attribute': 3,
+        'missing_module': 3,
+        'outside_allowlist': 3
+    }
+
+
+def test_definition_is_reloaded_on_start(supervisor):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        bb = _benchbot(supervisor, local_results_functions=['results_format'])
+        assert 'scored' in bb._local_results()
+        del supervisor.results_format['functions']['scored']
+        bb.start()
+        assert 'scored' not in bb._local_results()
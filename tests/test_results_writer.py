@@ -0,0 +1,162 @@
+import json
+import os
+
+import pytest
+
+from agents import SaveObjectsAgent
+from benchbot_api import BenchBot
+from benchbot_api.results import PARTIAL_SUFFIX, ResultsWriter
+
+EMPTY_RESULTS = {
+    'environment_details': [{
+        'name': 'miniroom'
+    }],
+    'results': {
+        'class_list': ['bottle'],
+        'objects': []
+    }
+}
+
+CHUNKS = [
+    (0, {
+        'objects': [{
+            'class': 'bottle',
+            'centroid': [0, 0, 0]
+        }]
+    }, None),
+    (1, {
+        'objects': [{
+            'class': 'cup',
+            'centroid': [1, 0, 0]
+        }, {
+            'class': 'bottle',
+            'centroid': [1, 1, 0]
+        }]
+    }, {
+        'class_list': ['bottle', 'cup']
+    }),
+    (2, {}, {
+        'note': 'nothing new'
+    }),
+    (3, {
+        'objects': [{
+            'class': 'chair',
+            'centroid': [3, 0, 0]
+        }],
+        'extra': [1, 2]
+    }, {
+        'class_list': ['bottle', 'cup', 'chair']
+    }),
+]
+
+
+def _expected():
+    # The results as written all at once, without streaming
+    results = json.loads(json.dumps(EMPTY_RESULTS))
+    for _, append, update in CHUNKS:
+        for k, v in append.items():
+            results['results'].setdefault(k, []).extend(v)
+        results['results'].update(update or {})
+    return results
+
+
+def _crash(filename, cut):
+    # Leaves a partial file as a process dying part way through writing a
+    # chunk would: complete lines, then a line cut off 'cut' bytes in
+    with open(filename + PARTIAL_SUFFIX, 'a') as f:
+        f.write(json.dumps({'chunk': 99, 'append': {'objects': [1]}})[:cut])
+
+
+def _assert_finalised(filename):
+    assert not os.path.exists(filename + PARTIAL_SUFFIX)
+    assert not os.path.exists(filename + '.tmp')
+    with open(filename) as f:
+        assert json.load(f) == _expected()
+
+
+def test_streamed_results_match_unstreamed(tmp_path):
+    filename = str(tmp_path / 'results.json')
+    with ResultsWriter(filename, EMPTY_RESULTS, max_pending=1) as w:
+        for c in CHUNKS:
+            w.write_chunk(*c)
+    _assert_finalised(filename)
+
+
+@pytest.mark.parametrize('cut', [0, 1, 20])
+def test_resume_after_crash(tmp_path, cut):
+    filename = str(tmp_path / 'results.json')
+    w = ResultsWriter(filename, EMPTY_RESULTS)
+    for c in CHUNKS[:2]:
+        w.write_chunk(*c)
+    w.close()
+    _crash(filename, cut)
+
+    w = ResultsWriter(filename, resume=True)
+    assert w.chunks == [0, 1]
+    assert not w.is_complete(99)
+    for c in CHUNKS[2:]:
+        w.write_chunk(*c)
+    w.finalise()
+    _assert_finalised(filename)
+
+
+def test_resume_after_crash_while_writing_header(tmp_path):
+    filename = str(tmp_path / 'results.json')
+    with open(filename + PARTIAL_SUFFIX, 'w') as f:
+        f.write(json.dumps({'header': EMPTY_RESULTS})[:10])
+
+    w = ResultsWriter(filename, EMPTY_RESULTS, resume=True)
+    assert w.chunks == []
+    for c in CHUNKS:
+        w.write_chunk(*c)
+    w.finalise()
+    _assert_finalised(filename)
+
+
+class SceneObjectsAgent(SaveObjectsAgent):
+    """Adds an object per scene, either as results chunks or all at once,
+    optionally failing part way through the second scene
+    """
+    def __init__(self, fail=False):
+        super(SceneObjectsAgent, self).__init__()
+        self.fail = fail
+        self.scenes = []
+
+    def pick_action(self, observations, action_list):
+        if observations['scene_number'] not in self.scenes:
+            self.scenes.append(observations['scene_number'])
+        if self.fail and observations['scene_number'] == 1:
+            raise RuntimeError("Agent failed")
+        return super(SceneObjectsAgent, self).pick_action(
+            observations, action_list)
+
+    def save_result(self, filename, empty_results, results_format_fns):
+        empty_results['results']['objects'] = [
+            results_format_fns['create_object'](centroid=[s, 0, 0])
+            for s in self.scenes
+        ]
+        with open(filename, 'w') as f:
+            json.dump(empty_results, f)
+
+
+def test_resumed_run_matches_unstreamed_run(supervisor, tmp_path):
+    unstreamed = str(tmp_path / 'unstreamed.json')
+    BenchBot(supervisor_address=supervisor.address,
+             result_location=unstreamed).run(SceneObjectsAgent())
+
+    streamed = str(tmp_path / 'streamed.json')
+    bb = BenchBot(supervisor_address=supervisor.address,
+                  result_location=streamed,
+                  stream_results=True)
+    with pytest.raises(RuntimeError, match='Agent failed'):
+        bb.run(SceneObjectsAgent(fail=True))
+    assert not os.path.exists(streamed)
+    _crash(streamed, 15)
+
+    bb.start()
+    agent = SceneObjectsAgent()
+    bb.run(agent)
+    assert agent.scenes == [1]
+    assert not os.path.exists(streamed + PARTIAL_SUFFIX)
+    with open(streamed) as f, open(unstreamed) as g:
+        assert json.load(f) == json.load(g)
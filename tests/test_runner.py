@@ -0,0 +1,35 @@
+import json
+
+from agents import SaveObjectsAgent
+from benchbot_api import run_parallel
+from supervisor import StandInSupervisor
+
+
+def test_run_parallel_across_supervisors(tmp_path, capsys):
+    result_location = str(tmp_path / 'results.json')
+    with StandInSupervisor(max_steps=3) as a, StandInSupervisor(
+            scenes=3, max_steps=4) as b:
+        summaries = run_parallel(SaveObjectsAgent(), [a.address, b.address],
+                                 result_location)
+
+    assert [s['supervisor_address'] for s in summaries] == [
+        a.address, b.address
+    ]
+    assert [(s['scenes'], s['steps']) for s in summaries] == [(2, 6),
+                                                              (3, 12)]
+    for s in summaries:
+        # Startup (at least 3 seconds waiting for the Supervisor) is excluded
+        assert 0 < s['duration'] < 3
+        assert s['steps_per_second'] == s['steps'] / s['duration']
+
+    # Workers run concurrently, so their throughputs add up
+    total = sum(s['steps_per_second'] for s in summaries)
+    assert ("Total: 5 scenes, 18 steps (%.2f steps/s)" %
+            total) in capsys.readouterr().out
+
+    with open(result_location) as f:
+        merged = json.load(f)
+    assert [len(r['results']['objects']) for r in merged] == [6, 12]
+    for s, r in zip(summaries, merged):
+        with open(s['result_filename']) as f:
+            assert json.load(f) == r
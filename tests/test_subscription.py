@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from benchbot_api import BenchBot
+
+
+@pytest.fixture
+def benchbot(supervisor):
+    supervisor.features['stream'] = True
+    return BenchBot(supervisor_address=supervisor.address)
+
+
+def test_frames_arrive_in_order(benchbot, supervisor):
+    with benchbot.subscribe(['image_rgb', 'poses']) as sub:
+        frames = list(sub)
+    assert [f.sequence for f in frames] == list(range(20))
+    assert sub.dropped == 0
+    assert frames[0].observations['image_rgb'].shape == (48, 64, 3)
+    assert set(frames[-1].observations['poses']) == {'robot', 'camera'}
+
+
+def test_slow_consumers_drop_the_oldest_frames(benchbot, supervisor):
+    supervisor.stream_period = 0
+    sub = benchbot.subscribe(['laser'], max_queue=2)
+    sub._reader.join(5)
+    assert [f.sequence for f in sub] == [18, 19]
+    assert sub.dropped == 18
+
+
+def test_stream_end_ends_iteration(benchbot, supervisor):
+    supervisor.stream_frames = 3
+    sub = benchbot.subscribe(['poses'])
+    assert [f.sequence for f in sub] == [0, 1, 2]
+    assert sub.get(timeout=0) is None
+    assert sub.get() is None
+
+
+def test_close_ends_iteration(benchbot, supervisor):
+    supervisor.stream_frames = 10**6
+    sub = benchbot.subscribe(['poses'])
+    assert next(iter(sub)).sequence == 0
+    t = time.time()
+    sub.close()
+    assert time.time() - t < 1
+    assert sub._finished
+    sequences = [f.sequence for f in sub]
+    assert sequences == sorted(sequences)
+    assert len(sequences) <= 4
+    assert sub.get(timeout=0) is None
+
+
+def test_async_iteration(benchbot, supervisor):
+    supervisor.stream_frames = 5
+
+    async def consume():
+        return [f.sequence async for f in benchbot.subscribe(['laser'])]
+
+    assert asyncio.run(consume()) == list(range(5))
+
+
+def test_unavailable_stream_raises(benchbot, supervisor):
+    supervisor.features['stream'] = False
+    with pytest.raises(requests.ConnectionError):
+        benchbot.subscribe(['poses'])
+
+
+def test_unknown_channels_raise(benchbot):
+    with pytest.raises(ValueError):
+        benchbot.subscribe(['not_a_channel'])
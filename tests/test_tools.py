@@ -0,0 +1,90 @@
+import numpy as np
+
+from benchbot_api import tools
+
+
+def _poses(step, extra=False):
+    p = {
+        'robot': {
+            'parent_frame': 'map',
+            'translation_xyz': [0.01 * step, 0, 0],
+            'rotation_rpy': [0, 0, 0.05 * step]
+        },
+        'camera': {
+            'parent_frame': 'robot',
+            'translation_xyz': [0.1, 0, 0.3],
+            'rotation_rpy': [0, 0.1 * step, 0]
+        }
+    }
+    if extra:
+        p['lidar'] = {
+            'parent_frame': 'robot',
+            'translation_xyz': [0, 0, 0.2],
+            'rotation_rpy': [0, 0, 0]
+        }
+    return {'poses': p}
+
+
+def test_blitted_poses_are_updated_in_place():
+    v = tools.ObservationVisualiser(['poses'], blit=True)
+    v.visualise(_poses(0))
+    artists = list(v._artists[0])
+    for i in range(1, 5):
+        v.visualise(_poses(i))
+    assert v._artists[0] == artists
+
+    names, transforms = tools._pose_frames(_poses(4)['poses'])
+    for a, segments in zip(artists, tools._frame_segments(transforms)):
+        assert np.allclose(a._segments3d, segments)
+    for a, o in zip(artists[3:], transforms[:, :3, 3]):
+        assert np.allclose(a.get_position_3d(), o)
+
+    # A new frame means the plot is rebuilt
+    v.visualise(_poses(5, extra=True))
+    assert [a.get_text() for a in v._artists[0][3:]] == [
+        'map', 'robot', 'camera', 'lidar'
+    ]
+
+
+def test_diag_masks_handle_labels_at_dtype_maximum():
+    for dtype in (np.uint8, np.uint16, np.int8):
+        top = np.iinfo(dtype).max
+        img = np.array([[0, top], [5, top]], dtype)
+        assert tools._create_diag_masks(img).shape == img.shape
+        assert np.array_equal(tools._create_diag_masks(img),
+                              tools._create_diag_masks(img.astype(np.int64)))
+
+
+def test_pose_frames_not_connected_to_the_map():
+    poses = {
+        'robot': {
+            'parent_frame': 'odom',
+            'translation_xyz': [1, 0, 0],
+            'rotation_rpy': [0, 0, 0]
+        },
+        'camera': {
+            'parent_frame': 'robot',
+            'translation_xyz': [0, 0, 1],
+            'rotation_rpy': [0, 0, 0]
+        },
+        'beacon': {
+            'translation_xyz': [0, 2, 0],
+            'rotation_rpy': [0, 0, 0]
+        }
+    }
+    names, transforms = tools._pose_frames(poses)
+    assert names == ['map', 'robot', 'camera', 'beacon']
+    assert np.allclose(transforms[:, :3, 3],
+                       [[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 2, 0]])
+
+    v = tools.ObservationVisualiser(['poses'], blit=True)
+    v.visualise({'poses': poses})
+    v.visualise({'poses': poses})
+
+
+def test_empty_laser_scans():
+    laser = {'range_max': 10.0, 'range_min': 0.1, 'scans': []}
+    v = tools.ObservationVisualiser(['laser'], blit=True)
+    v.visualise({'laser': laser})
+    v.visualise({'laser': laser})
+    assert tools.render_panels({'laser': laser}, ['laser']).ndim == 3
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from scipy.spatial.transform import Rotation
+
+from benchbot_api.observations import PoseSet
+from benchbot_api.transforms import (FrameTree, euler_to_matrices,
+                                     poses_to_matrices,
+                                     quaternions_to_matrices)
+
+
+def _random_poses(rng, n):
+    # A random tree of frames rooted at 'map', where each frame's parent is
+    # 'map' or an earlier frame
+    poses = {}
+    for i in range(n):
+        r = Rotation.random(random_state=rng.integers(1 << 31))
+        parent = 'map' if i == 0 else rng.choice(['map'] + list(poses))
+        poses['frame_%d' % i] = {
+            'parent_frame': str(parent),
+            'translation_xyz': rng.uniform(-5, 5, 3),
+            'rotation_rpy': r.as_euler('xyz'),
+            'rotation_xyzw': r.as_quat()
+        }
+    return poses
+
+
+def _scipy_root_matrices(poses):
+    # Each frame relative to 'map', composed one frame at a time with scipy
+    out = {'map': np.eye(4)}
+
+    def resolve(f):
+        if f not in out:
+            p = poses[f]
+            m = np.eye(4)
+            m[:3, :3] = Rotation.from_euler('xyz',
+                                            p['rotation_rpy']).as_matrix()
+            m[:3, 3] = p['translation_xyz']
+            out[f] = resolve(p['parent_frame']) @ m
+        return out[f]
+
+    for f in poses:
+        resolve(f)
+    return out
+
+
+def test_euler_matches_scipy():
+    rng = np.random.default_rng(0)
+    rpy = rng.uniform(-np.pi, np.pi, (2, 50, 3))
+    expected = Rotation.from_euler('xyz', rpy.reshape(-1, 3)).as_matrix()
+    assert np.allclose(euler_to_matrices(rpy), expected.reshape(2, 50, 3, 3))
+    assert np.allclose(euler_to_matrices(rpy[0, 0]), expected[0])
+
+    # Gimbal lock
+    for pitch in (np.pi / 2, -np.pi / 2):
+        rpy = [0.3, pitch, -1.2]
+        assert np.allclose(euler_to_matrices(rpy),
+                           Rotation.from_euler('xyz', rpy).as_matrix())
+
+
+def test_quaternions_match_scipy():
+    rng = np.random.default_rng(1)
+    xyzw = rng.normal(size=(100, 4)) * rng.uniform(0.1, 10, (100, 1))
+    expected = Rotation.from_quat(xyzw).as_matrix()
+    assert np.allclose(quaternions_to_matrices(xyzw), expected)
+    out = np.empty((100, 3, 3))
+    assert quaternions_to_matrices(xyzw, out=out) is out
+    assert np.allclose(out, expected)
+    assert np.allclose(quaternions_to_matrices([0, 0, 0, 1]), np.eye(3))
+
+
+@pytest.mark.parametrize('form', ['dict', 'rpy', 'compact'])
+def test_frame_tree_matches_scipy(form):
+    rng = np.random.default_rng(2)
+    poses = _random_poses(rng, 12)
+    expected = _scipy_root_matrices(poses)
+    if form == 'rpy':
+        tree = FrameTree({
+            f: {k: v
+                for k, v in p.items() if k != 'rotation_xyzw'}
+            for f, p in poses.items()
+        })
+    else:
+        tree = FrameTree(
+            PoseSet.from_dict(poses) if form == 'compact' else poses)
+    for f in poses:
+        assert np.allclose(tree.matrix(f), expected[f]), f
+    assert np.allclose(tree.matrix('map'), np.eye(4))
+
+    points = rng.uniform(-1, 1, (200, 3))
+    for a, b in (('frame_3', 'frame_7'), ('frame_11', 'frame_0'),
+                 ('map', 'frame_5')):
+        m = np.linalg.solve(expected[b], expected[a])
+        assert np.allclose(tree.matrix(a, relative_to=b), m)
+        assert np.allclose(tree.transform_points(points, a, relative_to=b),
+                           points @ m[:3, :3].T + m[:3, 3])
+
+    # The rotations in the poses match those from scipy, whichever field
+    # they are taken from
+    _, _, local = poses_to_matrices(poses)
+    for m, p in zip(local, poses.values()):
+        assert np.allclose(
+            m[:3, :3],
+            Rotation.from_quat(p['rotation_xyzw']).as_matrix())
+
+
+def test_frame_tree_errors():
+    poses = {
+        'a': {
+            'parent_frame': 'b',
+            'translation_xyz': [0, 0, 0],
+            'rotation_rpy': [0, 0, 0]
+        },
+        'b': {
+            'parent_frame': 'a',
+            'translation_xyz': [0, 0, 0],
+            'rotation_rpy': [0, 0, 0]
+        }
+    }
+    with pytest.raises(ValueError, match='cycle'):
+        FrameTree(poses)
+
+    poses['b']['parent_frame'] = 'odom'
+    tree = FrameTree(poses)
+    with pytest.raises(ValueError, match='not connected'):
+        tree.matrix('a')
+    assert np.allclose(tree.matrix('a', relative_to='odom'), np.eye(4))
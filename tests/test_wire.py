@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from benchbot_api import wire
+
+
+def _address(a):
+    return a.__array_interface__['data'][0]
+
+
+def _round_trip(obj, writable=True):
+    buf = wire.encode(obj)
+    return wire.decode(bytearray(buf) if writable else buf)
+
+
+def test_buffers_are_aligned():
+    rng = np.random.default_rng(0)
+    obj = {
+        'odd': rng.integers(0, 255, 7, dtype=np.uint8),
+        'image': rng.integers(0, 255, (5, 3, 3), dtype=np.uint8),
+        'depth': rng.random((3, 5), dtype=np.float32),
+        'scans': [rng.random((13, 2)), rng.random(1)]
+    }
+    buf = bytearray(wire.encode(obj))
+    header, data = wire.split(buf)
+    start = _address(np.frombuffer(buf, dtype=np.uint8))
+    assert (_address(np.frombuffer(data, dtype=np.uint8)) -
+            start) % wire.ALIGNMENT == 0
+
+    out = wire.decode(buf)
+    arrays = [out['odd'], out['image'], out['depth']] + out['scans']
+    for a, b in zip(arrays, [obj['odd'], obj['image'], obj['depth']] +
+                    obj['scans']):
+        assert (_address(a) - start) % wire.ALIGNMENT == 0
+        assert np.shares_memory(a, np.frombuffer(buf, dtype=np.uint8))
+        assert a.dtype == b.dtype and np.array_equal(a, b)
+    assert wire.buffer_size(header) == sum(a.nbytes for a in arrays)
+
+
+def test_non_contiguous_arrays():
+    a = np.arange(240, dtype=np.int16).reshape(12, 20)
+    obj = {
+        'strided': a[::2, ::3],
+        'transposed': a.T,
+        'fortran': np.asfortranarray(a),
+        'reversed': a[::-1],
+        'channel': np.arange(60, dtype=np.uint8).reshape(4, 5, 3)[..., 1]
+    }
+    out = _round_trip(obj)
+    for k, v in obj.items():
+        assert out[k].dtype == v.dtype, k
+        assert out[k].shape == v.shape, k
+        assert np.array_equal(out[k], v), k
+
+
+def test_zero_size_arrays():
+    obj = {
+        'points': np.zeros((0, 3)),
+        'image': np.empty((4, 0, 3), dtype=np.uint8),
+        'scalar': np.array(2.5, dtype=np.float32),
+        'after': np.arange(3)
+    }
+    out = _round_trip(obj)
+    for k, v in obj.items():
+        assert out[k].dtype == v.dtype and out[k].shape == v.shape, k
+        assert np.array_equal(out[k], v), k
+
+
+def test_arrays_referenced_twice():
+    a = np.arange(10, dtype=np.float64)
+    obj = {'a': a, 'b': a, 'pair': (a, a[2:5]), 'list': [a]}
+    out = _round_trip(obj)
+    for v in (out['a'], out['b'], out['pair'][0], out['list'][0]):
+        assert np.array_equal(v, a)
+    assert isinstance(out['pair'], tuple)
+    assert np.array_equal(out['pair'][1], a[2:5])
+
+    # Each reference is a separate view, so changing one copy in place
+    # doesn't change the others
+    out['a'][0] = -1
+    assert out['b'][0] == 0
+
+
+def test_other_values_round_trip():
+    obj = {
+        'name': 'camera',
+        'numbers': [1, 2.5, None, True],
+        'nested': {
+            'frame': ('map', 'robot')
+        },
+        'objects': np.array(['a', None], dtype=object)
+    }
+    out = _round_trip(obj)
+    assert out['name'] == 'camera'
+    assert out['numbers'] == [1, 2.5, None, True]
+    assert out['nested'] == {'frame': ('map', 'robot')}
+    assert list(out['objects']) == ['a', None]
+
+
+def test_writable_only_if_buffer_is():
+    a = np.arange(4)
+    assert _round_trip(a).flags.writeable
+    assert not _round_trip(a, writable=False).flags.writeable
+
+
+@pytest.mark.parametrize(
+    'buf', [b'', b'BBN', b'{"a": 1}', b'XXXX' + wire.encode(1)[4:]])
+def test_bad_magic(buf):
+    with pytest.raises(ValueError, match='magic'):
+        wire.decode(buf)
+    with pytest.raises(ValueError, match='magic'):
+        wire.split(bytearray(buf))